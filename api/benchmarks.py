@@ -0,0 +1,113 @@
+import platform
+from datetime import date
+
+import django
+from django.core.cache import cache
+from django.db import connection
+
+from shared.benchmark import api_client, measure
+from .routes import router
+
+API_ROOT = '/api/v1/'
+
+
+def get_cases():
+    """
+    Returns `{name: url}` for the list and detail endpoint of every viewset
+    registered on the router, plus the trip search and paging variants,
+    and the same over trip summaries.
+    """
+    cases = {}
+    for prefix, viewset, basename in router.registry:
+        cases[f'{basename}-list'] = f'{API_ROOT}{prefix}/'
+        instance = viewset.queryset.model._default_manager.order_by(
+            'pk').first()
+        if instance is not None:
+            cases[f'{basename}-detail'] = \
+                f'{API_ROOT}{prefix}/{instance.pk}/'
+
+    today = date.today()
+    cases.update({
+        'trip-search': f'{API_ROOT}trips/?trip_date={today}&num_seats=2',
+        'trip-page': f'{API_ROOT}trips/?page_size=25',
+        'place-autocomplete': f'{API_ROOT}places/?prefix=place%201',
+        'trip-routes':
+            f'{API_ROOT}trips/routes/?origin=place%201&destination=place%202',
+        'trip-summaries': f'{API_ROOT}trips/summaries/',
+        'trip-summary-search':
+            f'{API_ROOT}trips/summaries/?trip_date={today}&num_seats=2',
+        'trip-summary-page': f'{API_ROOT}trips/summaries/?page_size=25',
+    })
+    return cases
+
+
+def run_case(client, url, iterations, warm_cache=False):
+    def request():
+        if not warm_cache:
+            cache.clear()
+        return client.get(url)
+
+    # every request resets the query log, so count through a wrapper instead
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        response = request()
+    content = b''.join(response.streaming_content) \
+        if response.streaming else response.content
+    timing = measure(request, repeat=iterations)
+
+    return {
+        'url': url,
+        'status': response.status_code,
+        'queries': len(queries),
+        'bytes': len(content),
+        'p50_ms': round(timing['p50'], 3),
+        'p99_ms': round(timing['p99'], 3),
+        'mean_ms': round(timing['mean'], 3),
+    }
+
+
+def run_benchmarks(iterations=50, names=None, warm_cache=False, user=None):
+    """
+    Requests every case `iterations` times and returns the results in the
+    JSON layout written by `manage.py benchmark_api`.
+
+    The response cache is cleared before every request unless
+    `warm_cache` is set, so the numbers include queries and serialization.
+    """
+    client = api_client(user)
+    results = {}
+    for name, url in sorted(get_cases().items()):
+        if names and name not in names:
+            continue
+        results[name] = run_case(client, url, iterations, warm_cache)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'warm_cache': warm_cache,
+            'authenticated': user is not None,
+        },
+        'endpoints': results,
+    }
+
+
+def compare(baseline, current):
+    """
+    Yields `(name, metric, before, after, change)` for every metric of the
+    endpoints present in both result sets.
+    """
+    for name, result in sorted(current['endpoints'].items()):
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        for metric in ['p50_ms', 'p99_ms', 'queries', 'bytes']:
+            before, after = previous[metric], result[metric]
+            change = (after - before) / before if before else 0.0
+            yield name, metric, before, after, change
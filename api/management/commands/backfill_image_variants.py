@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from shared.images import schedule_variants, variants_field_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Queues the generation of the resized variants of every uploaded '
+        'image that has none recorded yet, e.g. images uploaded before '
+        'variants existed, and records those already in the storage. The '
+        'variants are written by run_workers.'
+    )
+
+    def handle(self, *args, **options):
+        queued = 0
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, models.ImageField):
+                    continue
+                variants_field = variants_field_name(field.name)
+                try:
+                    model._meta.get_field(variants_field)
+                except FieldDoesNotExist:
+                    continue
+                instances = model._base_manager \
+                    .exclude(**{field.name: ''}) \
+                    .exclude(**{f'{field.name}__isnull': True}) \
+                    .exclude(**{variants_field: models.F(field.name)}) \
+                    .only('pk', field.name, variants_field)
+                for instance in instances.iterator():
+                    if schedule_variants(getattr(instance, field.name)):
+                        queued += 1
+        self.stdout.write(f'Queued variants of {queued} images')
@@ -0,0 +1,80 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import compare, run_benchmarks
+from shared.benchmark import scratch_database
+from shared.synthetic import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a synthetic data set in a scratch database and measures '
+        'latency, query count and response size of every API endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--places', type=int, default=200)
+        parser.add_argument('--vehicles', type=int, default=1000)
+        parser.add_argument('--trips', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help='Only run this endpoint, may be repeated')
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Keep the response cache between requests')
+        parser.add_argument(
+            '--authenticated', action='store_true',
+            help='Send the requests as a logged in user')
+        parser.add_argument('--output', help='Write the results as JSON')
+        parser.add_argument(
+            '--compare', help='Results JSON of an earlier run to diff with')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            scale = seed(
+                users=options['users'],
+                places=options['places'],
+                vehicles=options['vehicles'],
+                trips=options['trips'],
+            )
+            user = None
+            if options['authenticated']:
+                user = get_user_model().objects.order_by('pk').first()
+            results = run_benchmarks(
+                iterations=options['iterations'],
+                names=options['endpoints'],
+                warm_cache=options['warm_cache'],
+                user=user,
+            )
+        results['meta']['scale'] = scale
+
+        self.write_table(results)
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                json.dump(results, out, indent=2, sort_keys=True)
+                out.write('\n')
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                self.write_comparison(json.load(baseline), results)
+
+    def write_table(self, results):
+        self.stdout.write(
+            f'{"endpoint":<24} {"status":>6} {"p50 ms":>10} {"p99 ms":>10} '
+            f'{"queries":>8} {"bytes":>10}')
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f'{name:<24} {result["status"]:>6} {result["p50_ms"]:>10.3f} '
+                f'{result["p99_ms"]:>10.3f} {result["queries"]:>8} '
+                f'{result["bytes"]:>10}')
+
+    def write_comparison(self, baseline, results):
+        self.stdout.write('')
+        for name, metric, before, after, change in compare(baseline, results):
+            if before != after:
+                self.stdout.write(
+                    f'{name:<24} {metric:<8} {before:>12} -> {after:<12} '
+                    f'{change:+.1%}')
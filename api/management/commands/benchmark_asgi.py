@@ -0,0 +1,198 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from shared.asgi import ASGIHandler, wsgi_environ
+from shared.benchmark import percentile, scratch_database
+from shared.synthetic import seed
+
+
+def search_paths(count, rng):
+    today = date.today()
+    paths = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            day = today + timedelta(days=rng.randrange(30))
+            seats = rng.randint(1, 4)
+            paths.append(
+                ('/api/v1/trips/', f'trip_date={day}&num_seats={seats}'))
+        else:
+            paths.append(
+                ('/api/v1/places/', f'prefix=place%20{rng.randrange(50)}'))
+    return paths
+
+
+def scope(path, query, headers=()):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver'), *headers],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Load tests trip search and place autocomplete in-process, with '
+        'the WSGI handler on a threaded server and with the ASGI handler, '
+        'while other clients wait for changes: by polling under WSGI and '
+        'by long-polling under ASGI. Network and HTTP parsing are not '
+        'included.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=20000)
+        parser.add_argument(
+            '--clients', type=int, default=50,
+            help='Clients sending searches back to back')
+        parser.add_argument(
+            '--pollers', type=int, default=1000,
+            help='Clients waiting for the trip list to change')
+        parser.add_argument('--threads', type=int, default=20)
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Seconds each handler runs')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["trips"]} trips...')
+            seed(users=1000, places=50, trips=options['trips'])
+            self.stdout.write(
+                f'{options["clients"]} searching clients, '
+                f'{options["pollers"]} waiting clients, '
+                f'{options["threads"]} threads')
+            for label, run in [('WSGI', self.run_wsgi),
+                               ('ASGI', self.run_asgi)]:
+                latencies, handled = run(options)
+                self.report(label, latencies, handled, options['duration'])
+
+    def report(self, label, latencies, handled, duration):
+        self.stdout.write(
+            f'{label}  searches {len(latencies) / duration:8,.0f}/s   '
+            f'p50 {percentile(latencies, 0.5):7.1f} ms   '
+            f'p99 {percentile(latencies, 0.99):7.1f} ms   '
+            f'requests handled {handled / duration:8,.0f}/s'
+        )
+
+    def run_wsgi(self, options):
+        # a threaded WSGI server: requests queue for `threads` workers, and
+        # waiting clients have to poll, here every `LONG_POLL_INTERVAL`
+        app = WSGIHandler()
+        server = ThreadPoolExecutor(max_workers=options['threads'])
+        stop = threading.Event()
+        lock = threading.Lock()
+        latencies = []
+        handled = [0]
+
+        def call(path, query, headers=()):
+            environ = wsgi_environ(scope(path, query, headers), b'')
+            response = app(environ, lambda status, headers: None)
+            b''.join(response)
+            response.close()
+            with lock:
+                handled[0] += 1
+            return response
+
+        def searcher(seed):
+            rng = random.Random(seed)
+            paths = search_paths(100, rng)
+            while not stop.is_set():
+                start = time.perf_counter()
+                server.submit(call, *rng.choice(paths)).result()
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+        etag = call('/api/v1/trips/', '')['ETag'].encode()
+
+        def poll_all():
+            while not stop.wait(settings.LONG_POLL_INTERVAL):
+                for _ in range(options['pollers']):
+                    server.submit(
+                        call, '/api/v1/trips/', '',
+                        [(b'if-none-match', etag)])
+
+        threads = [
+            threading.Thread(target=searcher, args=(index,))
+            for index in range(options['clients'])
+        ] + [threading.Thread(target=poll_all)]
+        handled[0] = 0
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        server.submit(connections.close_all).result()
+        server.shutdown()
+        return latencies[:], handled[0]
+
+    def run_asgi(self, options):
+        app = ASGIHandler(threads=options['threads'])
+        wsgi_handler = app.wsgi_handler
+        latencies = []
+        handled = [0]
+
+        def counting_handler(environ, start_response):
+            handled[0] += 1
+            return wsgi_handler(environ, start_response)
+        app.wsgi_handler = counting_handler
+
+        async def call(request_scope):
+            sent = []
+            queue = [{'type': 'http.request', 'body': b''}]
+
+            async def receive():
+                if queue:
+                    return queue.pop(0)
+                await asyncio.Event().wait()
+
+            async def send(message):
+                sent.append(message)
+
+            await app(request_scope, receive, send)
+            return dict(sent[0]['headers'])
+
+        async def searcher(seed, deadline):
+            rng = random.Random(seed)
+            paths = search_paths(100, rng)
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                await call(scope(*rng.choice(paths)))
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        async def poller(etag, deadline):
+            while time.monotonic() < deadline:
+                await call(scope('/api/v1/trips/', '', [
+                    (b'if-none-match', etag),
+                    (b'prefer', b'wait=30'),
+                ]))
+
+        async def main():
+            headers = await call(scope('/api/v1/trips/', ''))
+            handled[0] = 0
+            deadline = time.monotonic() + options['duration']
+            searchers = [
+                asyncio.ensure_future(searcher(index, deadline))
+                for index in range(options['clients'])
+            ]
+            pollers = [
+                asyncio.ensure_future(poller(headers[b'etag'], deadline))
+                for _ in range(options['pollers'])
+            ]
+            await asyncio.gather(*searchers)
+            for task in pollers:
+                task.cancel()
+            await asyncio.gather(*pollers, return_exceptions=True)
+            app.shutdown()
+
+        asyncio.run(main())
+        return latencies, handled[0]
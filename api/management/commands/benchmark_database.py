@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from shared.benchmark import percentile, scratch_database
+from shared.db.sqlite3.base import DatabaseWrapper
+from shared.synthetic import seed
+from trips.models import Booking, Trip
+
+# (label, pragmas, keep connections open)
+CONFIGURATIONS = [
+    ('rollback journal', {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'mmap_size': 0,
+        'cache_size': -2000,
+        'temp_store': 'DEFAULT',
+    }, False),
+    ('WAL, persistent', DatabaseWrapper.default_pragmas, True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures read and write throughput of concurrent threads against '
+        'SQLite with its default rollback journal and a new connection per '
+        'operation, and with the WAL pragmas and persistent connections '
+        'used in production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=10000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument(
+            '--duration', type=float, default=3,
+            help='Seconds each configuration runs')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('This benchmark only applies to SQLite.')
+            return
+        with scratch_database():
+            seed(users=500, places=50, trips=options['trips'])
+            self.run(options)
+
+    def run(self, options):
+        trip_ids = list(Trip.objects.values_list('id', flat=True))
+        user_ids = list(get_user_model().objects.values_list('id', flat=True))
+        settings_dict = connection.settings_dict
+        options_before = settings_dict['OPTIONS']
+
+        self.stdout.write(
+            f'{"configuration":<20} {"reads/s":>10} {"writes/s":>10} '
+            f'{"write p99 ms":>13} {"errors":>7}')
+        try:
+            for label, pragmas, persistent in CONFIGURATIONS:
+                # the journal mode is stored in the database file and can
+                # only change while no other connection is open, so set it
+                # once here rather than from every worker connection
+                connection.close()
+                settings_dict['OPTIONS'] = {
+                    **options_before, 'pragmas': pragmas}
+                connection.ensure_connection()
+                connection.close()
+                settings_dict['OPTIONS'] = {
+                    **options_before,
+                    'pragmas': {
+                        name: value for name, value in pragmas.items()
+                        if name != 'journal_mode'
+                    },
+                }
+                result = self.run_configuration(
+                    options, persistent, trip_ids, user_ids)
+                self.stdout.write(
+                    f'{label:<20} {result["reads"]:10.0f} '
+                    f'{result["writes"]:10.0f} {result["write_p99"]:13.2f} '
+                    f'{result["errors"]:7}')
+        finally:
+            settings_dict['OPTIONS'] = options_before
+            connection.close()
+
+    def run_configuration(self, options, persistent, trip_ids, user_ids):
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        write_timings = []
+        deadline = time.perf_counter() + options['duration']
+        today = date.today()
+
+        def read(rng):
+            offset = rng.randrange(0, 1000)
+            list(
+                Trip.objects
+                .filter(trip_date__gte=today)
+                .select_related('origin', 'destination', 'user', 'vehicle')
+                .order_by('trip_date', 'id')[offset:offset + 25]
+            )
+
+        def write(rng):
+            trip = Trip.objects.get(pk=rng.choice(trip_ids))
+            user = get_user_model()(pk=rng.choice(user_ids))
+            try:
+                Booking.objects.book(trip, user)
+            except ValidationError:
+                pass
+
+        def worker(operation, counter, seed):
+            rng = random.Random(seed)
+            count, errors, timings = 0, 0, []
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        operation(rng)
+                    except OperationalError:
+                        errors += 1
+                    else:
+                        count += 1
+                        timings.append(time.perf_counter() - start)
+                    if not persistent:
+                        connection.close()
+            finally:
+                connection.close()
+            with lock:
+                totals[counter] += count
+                totals['errors'] += errors
+                if counter == 'writes':
+                    write_timings.extend(timings)
+
+        threads = [
+            threading.Thread(target=worker, args=(read, 'reads', index))
+            for index in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=(write, 'writes', -index))
+            for index in range(1, options['writers'] + 1)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return {
+            'reads': totals['reads'] / elapsed,
+            'writes': totals['writes'] / elapsed,
+            'write_p99': percentile(write_timings, 0.99) * 1000,
+            'errors': totals['errors'],
+        }
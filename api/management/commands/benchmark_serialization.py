@@ -0,0 +1,84 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from shared.benchmark import scratch_database
+from shared.renderers import FastJSONRenderer, orjson
+from shared.synthetic import seed
+from trips.models import Trip
+from trips.serializers import TripSerializer
+from users.serializers import UserSerializer
+from vehicles.models import Vehicle
+from vehicles.serializers import VehicleSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks rendering lists of trips, vehicles and users with the '
+        'compiled list serializer against the plain one, and the JSON '
+        'renderers, in a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["rows"]} trips...')
+            seed(users=1000, places=200, trips=options['rows'])
+            self.run(options)
+
+    def run(self, options):
+        rows = options['rows']
+        request = Request(APIRequestFactory().get('/api/v1/'))
+        context = {'request': request}
+        cases = [
+            ('trips', TripSerializer, Trip.objects.select_related(
+                'origin', 'destination', 'vehicle', 'user')),
+            ('vehicles', VehicleSerializer, Vehicle.objects.all()),
+            ('users', UserSerializer, get_user_model().objects.all()),
+        ]
+
+        for label, serializer_class, queryset in cases:
+            instances = list(queryset[:rows])
+
+            def plain():
+                return serializers.ListSerializer(
+                    instances,
+                    child=serializer_class(context=context),
+                    context=context
+                ).data
+
+            def compiled():
+                return serializer_class(
+                    instances, many=True, context=context).data
+
+            assert plain() == compiled()
+            for name, func in [('plain', plain), ('compiled', compiled)]:
+                rate = self.rate(func, len(instances), options['repeat'])
+                self.stdout.write(
+                    f'{label:<10} {name:<10} {rate:12,.0f} rows/s')
+
+            data = compiled()
+            renderers = [('json', JSONRenderer())]
+            if orjson is not None:
+                renderers.append(('orjson', FastJSONRenderer()))
+            for name, renderer in renderers:
+                rate = self.rate(
+                    lambda: renderer.render(data), len(data),
+                    options['repeat'])
+                self.stdout.write(
+                    f'{label:<10} {name:<10} {rate:12,.0f} rows/s rendered')
+
+    def rate(self, func, count, repeat):
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return count * repeat / (time.perf_counter() - start)
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import AnonRateThrottle
+
+from shared.benchmark import format_timing, measure
+from shared.throttling import (
+    CacheCounterStore,
+    CounterThrottle,
+    LocalCounterStore,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks checking one client's rate with DRF's throttle, which "
+        'keeps every request timestamp, against the counter stores, for '
+        'rates of increasing size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rates', type=int, nargs='+', default=[60, 1000, 10000],
+            help='Requests allowed per minute')
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Requests checked per run')
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/v1/trips/'))
+        request.user = AnonymousUser()
+        for rate in options['rates']:
+            for label, throttle in [
+                    ('drf', self.drf_throttle(rate)),
+                    ('local', self.counter_throttle(
+                        rate, LocalCounterStore())),
+                    ('cache', self.counter_throttle(
+                        rate, CacheCounterStore()))]:
+                cache.clear()
+
+                def check():
+                    for _ in range(options['requests']):
+                        throttle.allow_request(request, None)
+
+                timing = measure(check, repeat=5, warmup=1)
+                per_request = timing['mean'] * 1000 / options['requests']
+                self.stdout.write(
+                    format_timing(f'{label} {rate}/min', timing) +
+                    f'   {per_request:8.2f} us/request')
+
+    def drf_throttle(self, rate):
+        throttle_class = type(
+            'BenchmarkThrottle', (AnonRateThrottle,), {'rate': f'{rate}/min'})
+        return throttle_class()
+
+    def counter_throttle(self, rate, store):
+        class BenchmarkThrottle(CounterThrottle):
+            scope = 'benchmark'
+
+            def get_rate(self):
+                return f'{rate}/min'
+
+            def get_store(self):
+                return store
+
+        return BenchmarkThrottle()
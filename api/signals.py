@@ -0,0 +1,19 @@
+from django.dispatch import receiver
+
+from shared.caching import bump_version_on_commit, track_model_versions
+from trips.models import Trip
+from trips.signals import seats_changed
+from .routes import router
+
+# every model a cached viewset depends on invalidates its responses,
+# except for fields written on every login that no response shows
+track_model_versions(*{
+    model
+    for _, viewset, _ in router.registry
+    for model in getattr(viewset, 'cache_models', ())
+}, untracked=['last_login', 'password'])
+
+
+@receiver(seats_changed, sender=Trip)
+def bump_trip_version(sender, **kwargs):
+    bump_version_on_commit(Trip)
@@ -0,0 +1,484 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+import json
+import threading
+import time
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from rest_framework.renderers import JSONRenderer
+
+from places.models import Place
+
+from places.cache import place_cache
+from shared.asgi import ASGIHandler, wsgi_environ
+from shared.caching import get_versions
+from shared.instrumentation import QueryRecorder, metrics
+from shared.pubsub import get_broker
+from shared.renderers import FastJSONRenderer
+from shared.throttling import (
+    CacheCounterStore,
+    LocalCounterStore,
+    get_counter_store,
+)
+from shared.routers import (
+    PIN_COOKIE,
+    ReplicaPinningMiddleware,
+    ReplicaRouter,
+)
+from shared.synthetic import seed
+from .benchmarks import compare, get_cases, run_benchmarks
+from trips.feed import route_channel
+from trips.models import Trip
+from trips.views import TripViewSet
+from .routes import router
+
+
+class BenchmarkTest(TestCase):
+    # queries per request that each endpoint must not exceed, the
+    # benchmark suite doubles as a guard against N+1 regressions. The
+    # first places request fills the place cache, hence its one query.
+    max_queries = {
+        'place-autocomplete': 1,
+        'place-detail': 1,
+        'place-list': 1,
+        'trip-detail': 1,
+        'trip-list': 1,
+        'trip-page': 1,
+        # loading the route graph, then the trips found
+        'trip-routes': 2,
+        'trip-search': 1,
+        'trip-summaries': 1,
+        'trip-summary-page': 1,
+        'trip-summary-search': 1,
+        'user-detail': 1,
+        'user-list': 1,
+        'vehicle-detail': 1,
+        'vehicle-list': 1,
+    }
+
+    def setUp(self):
+        cache.clear()
+        place_cache.invalidate()
+        seed(users=5, places=5, vehicles=5, trips=30, days=3)
+
+    def test_cases_cover_router(self):
+        cases = get_cases()
+        for _, _, basename in router.registry:
+            self.assertIn(f'{basename}-list', cases)
+            self.assertIn(f'{basename}-detail', cases)
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(iterations=2)
+        self.assertEqual(
+            sorted(results['endpoints']), sorted(self.max_queries))
+        for name, result in results['endpoints'].items():
+            self.assertEqual(result['status'], 200, name)
+            self.assertGreater(result['bytes'], 0, name)
+            self.assertLessEqual(
+                result['queries'], self.max_queries[name], name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'], name)
+
+    def test_compare(self):
+        baseline = run_benchmarks(iterations=1, names=['trip-list'])
+        current = run_benchmarks(iterations=1, names=['trip-list'])
+        current['endpoints']['trip-list']['queries'] = 2
+        changes = {
+            metric: change
+            for _, metric, _, _, change in compare(baseline, current)
+        }
+        self.assertEqual(changes['queries'], 1.0)
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        metrics.reset()
+        seed(users=5, places=5, vehicles=5, trips=10, days=3)
+
+    def test_query_recorder_detects_repeated_queries(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in [1, 1, 2, 3]:
+                list(Place.objects.filter(pk=pk))
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicates, 1)
+        self.assertEqual(recorder.similar, 2)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/v1/trips/')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('1 queries, 0 duplicate, 0 similar', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_are_keyed_by_viewset_action(self):
+        self.client.get('/api/v1/trips/')
+        self.client.get('/api/v1/trips/')
+        self.client.get('/api/v1/places/1/')
+        trips = metrics.get('TripViewSet', 'list')
+        self.assertEqual(trips['count'], 2)
+        # the second request is answered from the response cache
+        self.assertEqual(trips['queries'], 1)
+        self.assertGreater(trips['response_bytes'], 0)
+        self.assertEqual(metrics.get('PlaceViewSet', 'retrieve')['count'], 1)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(
+            'kapool_requests_total{view="TripViewSet",action="list",'
+            'status="200"} 2', content)
+        self.assertIn(
+            'kapool_db_queries_total{view="TripViewSet",action="list"} 1',
+            content)
+
+    @override_settings(DEBUG=False, INTERNAL_IPS=[])
+    def test_instrumentation_hidden_from_external_requests(self):
+        response = self.client.get('/api/v1/trips/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class DatabaseBackendTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TransactionTestCase):
+    # reads inside a transaction always go to the primary, so these tests
+    # must not run inside one
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def handle(self, request, view=None, write=False):
+        """
+        Runs `request` through the middleware and returns the response
+        and the database a read inside the view was routed to.
+        """
+        used = {}
+
+        def get_response(request):
+            if view is not None:
+                middleware.process_view(request, view, (), {})
+            if write:
+                self.router.db_for_write(Trip)
+            used['read'] = self.router.db_for_read(Trip)
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(get_response)
+        response = middleware(request)
+        return response, used['read']
+
+    def test_reads_go_to_replica(self):
+        response, db = self.handle(self.factory.get('/api/v1/trips/'))
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unsafe_requests_read_from_primary(self):
+        _, db = self.handle(self.factory.post('/api/v1/trips/'))
+        self.assertEqual(db, 'default')
+
+    def test_write_pins_request_and_client(self):
+        response, db = self.handle(
+            self.factory.post('/api/v1/trips/'), write=True)
+        self.assertEqual(db, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get('/api/v1/trips/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        _, db = self.handle(request)
+        self.assertEqual(db, 'default')
+
+    def test_reads_after_write_in_same_request(self):
+        _, db = self.handle(self.factory.get('/api/v1/trips/'), write=True)
+        self.assertEqual(db, 'default')
+        # the pin ends with the request
+        _, db = self.handle(self.factory.get('/api/v1/trips/'))
+        self.assertEqual(db, 'replica')
+
+    def test_viewset_override(self):
+        view = TripViewSet.as_view({'get': 'list'})
+        TripViewSet.read_from_primary = True
+        try:
+            _, db = self.handle(self.factory.get('/api/v1/trips/'), view)
+        finally:
+            del TripViewSet.read_from_primary
+        self.assertEqual(db, 'default')
+
+    def test_transactions_read_from_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Trip), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        _, db = self.handle(self.factory.get('/api/v1/trips/'))
+        self.assertEqual(db, 'default')
+
+
+class ModelVersionTest(TransactionTestCase):
+    def test_bumped_again_on_commit(self):
+        with transaction.atomic():
+            Place.objects.create(name='Origin')
+            during = get_versions([Place])
+            Place.objects.create(name='Destination')
+            # responses cached before the commit are left behind after it
+            self.assertNotEqual(get_versions([Place]), during)
+            during = get_versions([Place])
+        self.assertNotEqual(get_versions([Place]), during)
+
+
+class FastJSONRendererTest(TestCase):
+    def test_render(self):
+        data = {'date': date(2020, 1, 2), 'amount': Decimal('1.50')}
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data))
+        )
+
+    def test_indent(self):
+        content = FastJSONRenderer().render(
+            {'id': 1}, 'application/json; indent=2')
+        self.assertEqual(content, b'{\n  "id": 1\n}')
+
+
+class CounterStoreTest(TestCase):
+    def assertRate(self, store):
+        self.assertEqual(
+            [store.hit('client', 3, 0.3)[0] for _ in range(4)],
+            [True, True, True, False]
+        )
+        allowed, wait = store.hit('client', 3, 0.3)
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0)
+        self.assertLess(wait, 0.6)
+        self.assertTrue(store.hit('other', 3, 0.3)[0])
+        time.sleep(wait + 0.05)
+        self.assertTrue(store.hit('client', 3, 0.3)[0])
+
+    def test_local_store(self):
+        self.assertRate(LocalCounterStore())
+
+    def test_local_store_forgets_idle_clients(self):
+        store = LocalCounterStore(max_keys=2)
+        for key in ['a', 'b', 'c']:
+            store.hit(key, 1, 60)
+        self.assertEqual(list(store.buckets), ['b', 'c'])
+        self.assertTrue(store.hit('a', 1, 60)[0])
+
+    def test_cache_store(self):
+        store = CacheCounterStore()
+        store.clear()
+        self.assertRate(store)
+
+    def test_cache_store_clear_keeps_other_data(self):
+        cache.set('other', 1)
+        store = CacheCounterStore()
+        store.hit('client', 1, 60)
+        store.clear()
+        self.assertEqual(cache.get('other'), 1)
+        self.assertTrue(store.hit('client', 1, 60)[0])
+
+
+@override_settings(LONG_POLL_INTERVAL=0.05)
+class ASGIHandlerTest(TransactionTestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        Place.objects.create(name='Origin')
+        self.app = ASGIHandler(threads=2)
+        self.addCleanup(self.app.shutdown)
+
+    async def request(self, path, query='', headers=(), on_wait=None):
+        messages = [{'type': 'http.request', 'body': b''}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            if on_wait is not None:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, on_wait)
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app({
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                *[(name.encode(), value.encode()) for name, value in headers]
+            ],
+        }, receive, send)
+        start = sent[0]
+        return (
+            start['status'],
+            dict(start['headers']),
+            b''.join(message.get('body', b'') for message in sent[1:])
+        )
+
+    def get(self, *args, **kwargs):
+        return asyncio.run(self.request(*args, **kwargs))
+
+    def test_request(self):
+        status_code, headers, content = self.get(
+            '/api/v1/places/', 'prefix=or')
+        self.assertEqual(status_code, 200)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        self.assertEqual(
+            [place['name'] for place in json.loads(content)], ['Origin'])
+
+    def test_not_found(self):
+        status_code, _, _ = self.get('/missing/')
+        self.assertEqual(status_code, 404)
+
+    def test_streaming_response_on_one_thread(self):
+        threads = []
+
+        def chunks():
+            for chunk in [b'a', b'b', b'c']:
+                threads.append(threading.get_ident())
+                yield chunk
+
+        response = StreamingHttpResponse(chunks())
+        response.close = lambda: threads.append(threading.get_ident())
+        self.app.get_response = lambda environ: (200, [], response)
+        _, _, content = self.get('/export/')
+        self.assertEqual(content, b'abc')
+        # iterated and closed where a database cursor would live
+        self.assertEqual(len(threads), 4)
+        self.assertEqual(len(set(threads)), 1)
+
+    def test_long_poll_timeout(self):
+        _, headers, _ = self.get('/api/v1/places/')
+        start = time.monotonic()
+        status_code, _, _ = self.get('/api/v1/places/', headers=[
+            ('if-none-match', headers[b'etag'].decode()),
+            ('prefer', 'wait=1'),
+        ])
+        self.assertEqual(status_code, 304)
+        self.assertGreaterEqual(time.monotonic() - start, 1)
+
+    def test_long_poll_change(self):
+        _, headers, _ = self.get('/api/v1/places/')
+
+        def create_place():
+            time.sleep(0.2)
+            Place.objects.create(name='Destination')
+            connection.close()
+
+        start = time.monotonic()
+        status_code, _, content = self.get(
+            '/api/v1/places/',
+            headers=[
+                ('if-none-match', headers[b'etag'].decode()),
+                ('prefer', 'wait=30'),
+            ],
+            on_wait=create_place
+        )
+        self.assertEqual(status_code, 200)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(
+            sorted(place['name'] for place in json.loads(content)),
+            ['Destination', 'Origin']
+        )
+
+    def test_environ(self):
+        environ = wsgi_environ({
+            'method': 'POST',
+            'path': '/api/v1/places/café/',
+            'query_string': b'a=1',
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'x-forwarded-for', b'10.0.0.1'),
+                (b'x-forwarded-for', b'10.0.0.2'),
+            ],
+        }, b'{}')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(
+            environ['HTTP_X_FORWARDED_FOR'], '10.0.0.1,10.0.0.2')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(),
+            '/api/v1/places/café/'
+        )
+        self.assertEqual(environ['wsgi.input'].read(), b'{}')
+
+
+@override_settings(EVENT_STREAM_TIMEOUT=30, EVENT_STREAM_HEARTBEAT=30)
+class ASGIEventStreamTest(TransactionTestCase):
+    def setUp(self):
+        place_cache.invalidate()
+        get_broker.cache_clear()
+        self.origin = Place.objects.create(name='Origin')
+        self.destination = Place.objects.create(name='Destination')
+        self.app = ASGIHandler(threads=2)
+        self.addCleanup(self.app.shutdown)
+
+    def test_stream(self):
+        disconnect = asyncio.Event()
+        received = asyncio.Event()
+        sent = []
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if b'event: created' in message.get('body', b''):
+                received.set()
+
+        def publish():
+            get_broker().publish(
+                route_channel(self.origin.id, self.destination.id),
+                {'event': 'created', 'trip': {'id': 1}}
+            )
+
+        async def main():
+            stream = asyncio.ensure_future(self.app({
+                'type': 'http',
+                'method': 'GET',
+                'path': '/api/v1/trips/feed/',
+                'query_string': b'origin=Origin&destination=Destination',
+                'headers': [
+                    (b'host', b'testserver'),
+                    (b'accept', b'text/event-stream'),
+                ],
+            }, receive, send))
+            while not sent:
+                await asyncio.sleep(0.01)
+            await asyncio.get_running_loop().run_in_executor(None, publish)
+            await asyncio.wait_for(received.wait(), 5)
+            disconnect.set()
+            await asyncio.wait_for(stream, 5)
+
+        asyncio.run(main())
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertFalse(get_broker().subscriptions)
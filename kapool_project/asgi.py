@@ -0,0 +1,20 @@
+"""
+ASGI config for kapool_project project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, to be served by an ASGI server such as uvicorn:
+
+    uvicorn kapool_project.asgi:application
+"""
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kapool_project.settings')
+
+django.setup(set_prefix=False)
+
+from shared.asgi import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
@@ -27,6 +27,10 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Addresses allowed to read /metrics and `Server-Timing` headers when
+# DEBUG is off.
+INTERNAL_IPS = ['127.0.0.1']
+
 
 # Application definition
 
@@ -47,10 +51,14 @@ INSTALLED_APPS = [
     'vehicles.apps.VehiclesConfig',
     'places.apps.PlacesConfig',
     'trips.apps.TripsConfig',
+    'search.apps.SearchConfig',
+    'taskqueue.apps.TaskqueueConfig',
     'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'shared.instrumentation.InstrumentationMiddleware',
+    'shared.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,7 +88,7 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -88,22 +96,129 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
+        'search.filters.FullTextSearchFilter',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'shared.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'shared.throttling.ScopedCounterThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'search': '120/min',
+        'writes': '60/min',
+        'bookings': '20/min',
+    },
 }
 
+# Where throttles count requests per user or IP address. The local store
+# counts per process, `shared.throttling.CacheCounterStore` counts in the
+# THROTTLE_CACHE cache, shared by every process using it, which is kept
+# apart from the other cached data.
+THROTTLE_COUNTER_STORE = 'shared.throttling.LocalCounterStore'
+THROTTLE_CACHE = 'throttle'
+
 WSGI_APPLICATION = 'kapool_project.wsgi.application'
 
+# Under ASGI (kapool_project/asgi.py), views run on a pool of this many
+# threads, which bounds the concurrent database work of a process.
+ASGI_THREADS = 20
+
+# Longest and polling interval, in seconds, of a long-polled conditional
+# request sent with `Prefer: wait=<seconds>` under ASGI.
+LONG_POLL_MAX_WAIT = 60
+LONG_POLL_INTERVAL = 1
+
+# Pub/sub broker fanning out trip changes to the route feeds. The local
+# broker only reaches subscribers of the same process, and its event ids
+# restart with it.
+PUBSUB_BROKER = 'shared.pubsub.LocalBroker'
+
+# Seconds between keep-alive comments of idle server-sent event streams,
+# after which a stream ends, and the reconnection delay in milliseconds
+# suggested to clients.
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_TIMEOUT = 300
+EVENT_STREAM_RETRY = 3000
+
+# Background tasks, run by `manage.py run_workers`: worker processes,
+# seconds between checks of an empty queue, seconds after which a task
+# whose worker died runs again, and days finished tasks are kept.
+TASK_WORKERS = 2
+TASK_POLL_INTERVAL = 1
+TASK_LOCK_TIMEOUT = 600
+TASK_RETENTION_DAYS = 7
+
+# Tasks queued once a day by `manage.py run_workers`.
+DAILY_TASKS = [
+    'taskqueue.purge_finished',
+    'trips.archive_trips',
+]
+
+# Trips are moved to the archive this many days after they took place.
+TRIP_ARCHIVE_AFTER_DAYS = 30
+
+# Seconds and number of API tokens kept by the token authentication
+# cache. Tokens deleted, or users changed, by another process are noticed
+# through the default cache, as soon as it is shared by the processes.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 10000
+
+# Passenger notifications are printed until an SMTP server is configured.
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite in WAL mode, see shared/db/sqlite3/base.py for the pragmas
+        'ENGINE': 'shared.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # keep connections open between requests instead of reconnecting
+        'CONN_MAX_AGE': 60,
+        # tests use a file rather than the shared-cache in-memory database,
+        # which reports lock contention between threads instead of waiting
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
+# Aliases in DATABASES that receive reads. A replica is declared like
+# `default` with `'TEST': {'MIRROR': 'default'}`, so tests read from the
+# test database.
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ['shared.routers.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write, which
+# should cover the replication lag.
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+#
+# The cache holds the model versions behind cached responses and their
+# ETags, so every process serving the API must share it. The local memory
+# cache is only correct with a single process; deployments running
+# several workers need a shared backend, e.g.
+# 'django.core.cache.backends.memcached.MemcachedCache' with a LOCATION.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kapool',
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kapool-throttle',
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -147,3 +262,18 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'users.User'
+
+# Seconds an in-process place index may be served before it is reloaded,
+# bounding staleness for changes made by other processes.
+PLACE_CACHE_TTL = 300
+
+# Seconds the in-process graph of upcoming trips used by route search may
+# be served before it is reloaded, for the same reason.
+ROUTE_GRAPH_TTL = 60
+
+# Longest side, in pixels, of the resized copies generated for uploaded
+# profile pictures and vehicle images, keyed by variant label.
+IMAGE_VARIANTS = {
+    'thumb': 128,
+    'medium': 480,
+}
@@ -4,4 +4,4 @@ from .models import Place
 
 @admin.register(Place)
 class PlaceAdmin(admin.ModelAdmin):
-    list_display = ('name',)
+    list_display = ('name', 'latitude', 'longitude')
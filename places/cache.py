@@ -0,0 +1,135 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .geo import GridIndex
+from .models import Place, normalize_place_name
+
+
+class PlaceIndex:
+    """
+    Immutable in-memory snapshot of the `Place` table.
+
+    Places are kept in an array sorted by their case-folded name, so exact
+    lookups and prefix searches are binary searches. Places with
+    coordinates are also kept in a `GridIndex` for proximity searches.
+    """
+    fields = ('id', 'name', 'name_key', 'latitude', 'longitude')
+
+    def __init__(self, rows):
+        places = [
+            (row[2], Place(**dict(zip(self.fields, row))))
+            for row in rows
+        ]
+        places.sort(key=lambda item: (item[0], item[1].id))
+        self.keys = [name_key for name_key, _ in places]
+        self.places = [place for _, place in places]
+        self.by_name = sorted(self.places, key=lambda place: place.name)
+        self.by_id = {place.id: place for place in self.places}
+        self.grid = GridIndex(
+            (place.latitude, place.longitude, place)
+            for place in self.places
+            if place.latitude is not None and place.longitude is not None
+        )
+
+    def resolve(self, name):
+        """
+        Returns the ids of the places whose name matches `name`
+        case-insensitively.
+        """
+        key = normalize_place_name(name)
+        index = bisect_left(self.keys, key)
+        ids = []
+        while index < len(self.keys) and self.keys[index] == key:
+            ids.append(self.places[index].id)
+            index += 1
+        return ids
+
+    def autocomplete(self, prefix, limit=10):
+        """
+        Returns up to `limit` places whose name starts with `prefix`,
+        ordered by name.
+        """
+        key = normalize_place_name(prefix)
+        index = bisect_left(self.keys, key)
+        matches = []
+        while index < len(self.keys) and len(matches) < limit:
+            if not self.keys[index].startswith(key):
+                break
+            matches.append(self.places[index])
+            index += 1
+        return matches
+
+    def near(self, lat, lng, radius_km):
+        """
+        Returns `(distance, place)` pairs for the places within
+        `radius_km` kilometres of the point, nearest first.
+        """
+        return self.grid.near(lat, lng, radius_km)
+
+
+class PlaceCache:
+    """
+    Process-wide, lazily loaded `PlaceIndex`.
+
+    The index is dropped whenever a place is saved or deleted in this
+    process and reloaded on next use. `PLACE_CACHE_TTL` bounds how long
+    changes made by other processes can go unnoticed, except by `resolve`,
+    which looks names it does not know up in the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._loaded_at = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'PLACE_CACHE_TTL', 300)
+
+    def get_index(self):
+        index = self._index
+        if index is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return index
+        with self._lock:
+            if self._index is None or \
+                    time.monotonic() - self._loaded_at >= self.ttl:
+                rows = Place.objects.values_list(*PlaceIndex.fields)
+                self._index = PlaceIndex(rows)
+                self._loaded_at = time.monotonic()
+            return self._index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    def all(self):
+        return self.get_index().by_name
+
+    def get(self, place_id):
+        return self.get_index().by_id.get(place_id)
+
+    def resolve(self, name):
+        ids = self.get_index().resolve(name)
+        if ids:
+            return ids
+        # the place may have been created by another process since the
+        # index was loaded
+        ids = list(
+            Place.objects.filter(name_key=normalize_place_name(name))
+            .order_by('id').values_list('id', flat=True)
+        )
+        if ids:
+            self.invalidate()
+        return ids
+
+    def autocomplete(self, prefix, limit=10):
+        return self.get_index().autocomplete(prefix, limit)
+
+    def near(self, lat, lng, radius_km):
+        return self.get_index().near(lat, lng, radius_km)
+
+
+place_cache = PlaceCache()
@@ -0,0 +1,99 @@
+import math
+from collections import defaultdict
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in kilometres between two points.
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_point(value):
+    """
+    Parses `'lat,lng'` into a `(lat, lng)` tuple of floats, raising
+    `ValueError` when it is malformed or out of range.
+    """
+    lat, lng = (float(part) for part in value.split(','))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(f'Coordinates out of range: {value}')
+    return lat, lng
+
+
+class GridIndex:
+    """
+    Spatial index bucketing points into cells of `cell_size` degrees.
+
+    A radius search only visits the cells overlapping the bounding box of
+    the circle, so its cost depends on the points nearby rather than on
+    the total number of points.
+    """
+
+    def __init__(self, points, cell_size=0.25):
+        """
+        `points` is an iterable of `(lat, lng, item)` tuples.
+        """
+        self.cell_size = cell_size
+        self.columns = math.ceil(360 / cell_size)
+        self.cells = defaultdict(list)
+        for lat, lng, item in points:
+            self.cells[self.cell(lat, lng)].append((lat, lng, item))
+
+    def __len__(self):
+        return sum(len(points) for points in self.cells.values())
+
+    def cell(self, lat, lng):
+        return (
+            math.floor(lat / self.cell_size),
+            math.floor((lng + 180) / self.cell_size) % self.columns,
+        )
+
+    def candidate_cells(self, lat, lng, radius_km):
+        lat_delta = radius_km / KM_PER_DEGREE
+        south = max(-90.0, lat - lat_delta)
+        north = min(90.0, lat + lat_delta)
+        rows = range(
+            math.floor(south / self.cell_size),
+            math.floor(north / self.cell_size) + 1)
+
+        # a degree of longitude shrinks towards the poles, search every
+        # column once the circle reaches a pole
+        cos_lat = min(
+            math.cos(math.radians(south)), math.cos(math.radians(north)))
+        if north >= 90 or south <= -90 or cos_lat <= 0:
+            columns = range(self.columns)
+        else:
+            lng_delta = lat_delta / cos_lat
+            if lng_delta >= 180:
+                columns = range(self.columns)
+            else:
+                first = math.floor((lng - lng_delta + 180) / self.cell_size)
+                last = math.floor((lng + lng_delta + 180) / self.cell_size)
+                columns = sorted({
+                    column % self.columns
+                    for column in range(first, last + 1)
+                })
+
+        for row in rows:
+            for column in columns:
+                yield row, column
+
+    def near(self, lat, lng, radius_km):
+        """
+        Returns `(distance, item)` pairs for the items within `radius_km`
+        of the point, nearest first.
+        """
+        matches = []
+        for cell in self.candidate_cells(lat, lng, radius_km):
+            for point_lat, point_lng, item in self.cells.get(cell, ()):
+                distance = haversine(lat, lng, point_lat, point_lng)
+                if distance <= radius_km:
+                    matches.append((distance, item))
+        matches.sort(key=lambda match: match[0])
+        return matches
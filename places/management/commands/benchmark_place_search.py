@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from places.cache import place_cache
+from places.geo import haversine
+from places.models import Place
+from shared.benchmark import format_timing, measure, scratch_database
+from shared.synthetic import LATITUDES, LONGITUDES, seed
+from trips.filters import TripFilter
+from trips.models import Trip
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks finding places and trips near a point with the grid '
+        'index of the place cache against a scan of every place, in a '
+        'scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--places', type=int, default=100000)
+        parser.add_argument('--trips', type=int, default=100000)
+        parser.add_argument('--radius', type=float, default=10)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(
+                f'Seeding {options["places"]} places and '
+                f'{options["trips"]} trips...')
+            seed(
+                users=1000,
+                places=options['places'],
+                trips=options['trips'],
+            )
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(1)
+        radius = options['radius']
+        points = [
+            (rng.uniform(*LATITUDES), rng.uniform(*LONGITUDES))
+            for _ in range(options['repeat'])
+        ]
+
+        place_cache.invalidate()
+        start = time.perf_counter()
+        place_cache.get_index()
+        self.stdout.write(
+            f'index built in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+        places = list(
+            Place.objects.values_list('id', 'latitude', 'longitude'))
+
+        def scan(lat, lng):
+            return [
+                place_id for place_id, place_lat, place_lng in places
+                if haversine(lat, lng, place_lat, place_lng) <= radius
+            ]
+
+        def grid(lat, lng):
+            return [
+                place.id for _, place in place_cache.near(lat, lng, radius)
+            ]
+
+        def trip_search(lat, lng):
+            return list(TripFilter(
+                {'near': f'{lat},{lng}', 'radius': radius},
+                queryset=Trip.objects.all()
+            ).qs.values_list('id'))
+
+        lat, lng = points[0]
+        assert sorted(scan(lat, lng)) == sorted(grid(lat, lng))
+
+        for label, search in [
+                (f'scan of {len(places)} places', scan),
+                ('grid index', grid),
+                ('trip search with near=', trip_search)]:
+            queries = iter(points * 2)
+            timing = measure(
+                lambda: search(*next(queries)), repeat=options['repeat'])
+            self.stdout.write(format_timing(label, timing))
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.8 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+def populate_name_key(apps, schema_editor):
+    Place = apps.get_model('places', 'Place')
+    for place in Place.objects.all():
+        place.name_key = ' '.join(place.name.split()).casefold()
+        place.save(update_fields=['name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='place',
+            options={'ordering': ['name'], 'verbose_name': 'Place', 'verbose_name_plural': 'Places'},
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100, verbose_name='Normalized name'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_name_key, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,55 @@
+import math
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import FloatField, Value
+from django.db.models.functions import (
+    ASin,
+    Cos,
+    Least,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
 from django.utils.translation import ugettext_lazy as _
 
+from .geo import EARTH_RADIUS_KM, KM_PER_DEGREE
+
+
+def normalize_place_name(name):
+    """
+    Case-folded, whitespace-collapsed form of a place name used for
+    case-insensitive lookups.
+    """
+    return ' '.join(name.split()).casefold()
+
+
+def _float(value):
+    return Value(value, output_field=FloatField())
+
+
+class PlaceQuerySet(models.QuerySet):
+    def within(self, lat, lng, radius_km):
+        """
+        Places within `radius_km` kilometres of the point, by the haversine
+        formula of `places.geo` computed in the database.
+
+        `place_cache.near` is faster, this is for filtering on more places
+        than a query can list the ids of.
+        """
+        lat_delta = radius_km / KM_PER_DEGREE
+        half_lat = (Radians('latitude') - _float(math.radians(lat))) / 2
+        half_lng = (Radians('longitude') - _float(math.radians(lng))) / 2
+        a = Power(Sin(half_lat), 2) + \
+            _float(math.cos(math.radians(lat))) * Cos(Radians('latitude')) * \
+            Power(Sin(half_lng), 2)
+        distance = 2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), _float(1.0)))
+        return self.filter(
+            latitude__range=(lat - lat_delta, lat + lat_delta),
+            longitude__isnull=False
+        ).annotate(distance=distance).filter(distance__lte=radius_km)
+
 
 class Place(models.Model):
     name = models.CharField(
@@ -11,6 +60,33 @@ class Place(models.Model):
         verbose_name=_('Name')
     )
 
+    name_key = models.CharField(
+        max_length=100,
+        db_index=True,
+        editable=False,
+        verbose_name=_('Normalized name')
+    )
+
+    latitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        verbose_name=_('Latitude')
+    )
+
+    longitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        verbose_name=_('Longitude')
+    )
+
+    objects = PlaceQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_place_name(self.name)
+        super(Place, self).save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -1,12 +1,17 @@
 from rest_framework import serializers
 
+from shared.compiled import CompiledListSerializer
+from shared.serializers import SparseFieldsetsMixin
 from .models import Place
 
 
-class PlaceSerializer(serializers.ModelSerializer):
+class PlaceSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Place
+        list_serializer_class = CompiledListSerializer
         fields = [
             'id',
             'name',
+            'latitude',
+            'longitude',
         ]
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import place_cache
+from .models import Place
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_place_cache(sender, **kwargs):
+    # drop the index now so this transaction sees its own change, and again
+    # on commit in case another request reloaded it in the meantime
+    place_cache.invalidate()
+    transaction.on_commit(place_cache.invalidate)
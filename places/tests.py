@@ -1,11 +1,31 @@
 import json
+import random
 from rest_framework import status
+from django.test import TestCase
 from rest_framework.test import APITestCase
 
+from shared.throttling import get_counter_store
+from .cache import place_cache
+from .geo import GridIndex, haversine, parse_point
 from .models import Place
 
 
+class PlaceTests(TestCase):
+    def test_name_key_is_case_folded(self):
+        place = Place(name='  Port  ELIZABETH ')
+        place.save()
+        self.assertEqual(place.name_key, 'port elizabeth')
+
+        place.name = 'Gqeberha'
+        place.save()
+        self.assertEqual(
+            Place.objects.get(pk=place.pk).name_key, 'gqeberha')
+
+
 class PlaceApiTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+
     def test_list_places(self):
         place = Place(name='Pretoria')
         place.save()
@@ -14,7 +34,9 @@ class PlaceApiTest(APITestCase):
         self.assertEqual(json.loads(response.content), [
             {
                 'id': 1,
-                'name': 'Pretoria'
+                'name': 'Pretoria',
+                'latitude': None,
+                'longitude': None
             }
         ])
 
@@ -24,5 +46,117 @@ class PlaceApiTest(APITestCase):
         response = self.client.get('/api/v1/places/1/')
         self.assertEqual(json.loads(response.content), {
             'id': 1,
-            'name': 'Pretoria'
+            'name': 'Pretoria',
+            'latitude': None,
+            'longitude': None
         })
+
+
+class PlaceAutocompleteTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        place_cache.invalidate()
+        for name in ['Pretoria', 'Port Elizabeth', 'Polokwane', 'Durban']:
+            Place(name=name).save()
+
+    def get_names(self, url):
+        response = self.client.get(url)
+        return [place['name'] for place in json.loads(response.content)]
+
+    def test_prefix(self):
+        self.assertEqual(
+            self.get_names('/api/v1/places/?prefix=po'),
+            ['Polokwane', 'Port Elizabeth']
+        )
+        self.assertEqual(self.get_names('/api/v1/places/?prefix=x'), [])
+
+    def test_prefix_limit(self):
+        self.assertEqual(
+            self.get_names('/api/v1/places/?prefix=p&limit=2'),
+            ['Polokwane', 'Port Elizabeth']
+        )
+
+    def test_list_served_from_cache(self):
+        self.client.get('/api/v1/places/')
+        with self.assertNumQueries(0):
+            names = self.get_names('/api/v1/places/')
+        self.assertEqual(
+            names, ['Durban', 'Polokwane', 'Port Elizabeth', 'Pretoria'])
+
+    def test_invalidated_on_save_and_delete(self):
+        self.get_names('/api/v1/places/')
+        Place(name='Pietermaritzburg').save()
+        self.assertEqual(
+            self.get_names('/api/v1/places/?prefix=pi'),
+            ['Pietermaritzburg']
+        )
+
+        Place.objects.get(name='Durban').delete()
+        self.assertEqual(self.get_names('/api/v1/places/?prefix=d'), [])
+
+    def test_resolve(self):
+        place = Place.objects.get(name='Port Elizabeth')
+        self.assertEqual(place_cache.resolve('port  elizabeth'), [place.id])
+        self.assertEqual(place_cache.resolve('port'), [])
+
+    def test_resolve_places_created_elsewhere(self):
+        place_cache.resolve('durban')
+        # saved by another process, without invalidating this one's cache
+        Place.objects.bulk_create([Place(name='Mthatha', name_key='mthatha')])
+        place = Place.objects.get(name='Mthatha')
+        self.assertEqual(place_cache.resolve('MTHATHA'), [place.id])
+        # and the index is reloaded with it
+        self.assertEqual(place_cache.get(place.id).name, 'Mthatha')
+
+
+class GridIndexTest(TestCase):
+    def test_matches_linear_scan(self):
+        rng = random.Random(0)
+        points = [
+            (rng.uniform(-89, 89), rng.uniform(-180, 180), index)
+            for index in range(2000)
+        ]
+        # points on both sides of the antimeridian and near a pole
+        points += [(0.1, 179.9, 'east'), (0.1, -179.9, 'west')]
+        points += [(89.9, 0, 'north'), (89.9, 180, 'north-opposite')]
+        grid = GridIndex(points, cell_size=1)
+
+        for lat, lng, radius in [
+                (0, 0, 500), (-33.9, 18.4, 100), (0.1, 180, 50),
+                (89.9, 90, 100), (45, -120, 2000)]:
+            expected = sorted(
+                item for point_lat, point_lng, item in points
+                if haversine(lat, lng, point_lat, point_lng) <= radius
+            )
+            found = sorted(item for _, item in grid.near(lat, lng, radius))
+            self.assertEqual(found, expected, (lat, lng, radius))
+
+    def test_nearest_first(self):
+        grid = GridIndex([(0, 0.5, 'far'), (0, 0.1, 'near')])
+        self.assertEqual(
+            [item for _, item in grid.near(0, 0, 100)], ['near', 'far'])
+
+    def test_parse_point(self):
+        self.assertEqual(parse_point('-25.7,28.2'), (-25.7, 28.2))
+        for value in ['25.7', 'a,b', '91,0', '0,181', '1,2,3']:
+            with self.assertRaises(ValueError):
+                parse_point(value)
+
+
+class PlaceNearTest(TestCase):
+    def setUp(self):
+        place_cache.invalidate()
+
+    def test_near(self):
+        Place.objects.create(
+            name='Pretoria', latitude=-25.7479, longitude=28.2293)
+        Place.objects.create(
+            name='Johannesburg', latitude=-26.2041, longitude=28.0473)
+        Place.objects.create(
+            name='Cape Town', latitude=-33.9249, longitude=18.4241)
+        Place.objects.create(name='Nowhere')
+
+        places = place_cache.near(-25.75, 28.19, 100)
+        self.assertEqual(
+            [place.name for _, place in places], ['Pretoria', 'Johannesburg'])
+        self.assertAlmostEqual(places[1][0], 52.5, delta=1)
@@ -1,9 +1,42 @@
 from rest_framework import viewsets
+from rest_framework.response import Response
 
+from shared.caching import CachedResponseMixin
+from .cache import place_cache
 from .models import Place
 from .serializers import PlaceSerializer
 
 
-class PlaceViewSet(viewsets.ReadOnlyModelViewSet):
+class PlaceViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Places are listed from the in-process `place_cache`.
+
+    `?prefix=` returns an autocomplete list of at most `?limit=` places
+    whose name starts with the prefix, ignoring case.
+    """
     queryset = Place.objects.all()
     serializer_class = PlaceSerializer
+    cache_models = (Place,)
+    cache_anonymous_only = False
+    autocomplete_limit = 10
+    max_autocomplete_limit = 50
+
+    def get_autocomplete_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return self.autocomplete_limit
+        return max(1, min(limit, self.max_autocomplete_limit))
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.list_places, request)
+
+    def list_places(self, request):
+        prefix = request.query_params.get('prefix')
+        if prefix is None:
+            places = place_cache.all()
+        else:
+            places = place_cache.autocomplete(
+                prefix, self.get_autocomplete_limit())
+        serializer = self.get_serializer(places, many=True)
+        return Response(serializer.data)
@@ -0,0 +1,179 @@
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+
+# SQLite allows at most 999 parameters per statement before 3.32
+BATCH_SIZE = 500
+
+
+def table_name(label):
+    return 'search_' + label.replace('.', '_')
+
+
+def query_terms(query):
+    """
+    Words of a user supplied query, stripped of any search syntax.
+    """
+    return re.findall(r'\w+', query.casefold())
+
+
+def _batched(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+class SearchBackend:
+    """
+    Stores one document per object of a model, in a table per model whose
+    primary key is the object id, and ranks them against queries.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create_table(self, label):
+        raise NotImplementedError
+
+    def drop_table(self, label):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {table_name(label)}')
+
+    def clear(self, label):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table_name(label)}')
+
+    def fetch(self, label, ids):
+        """
+        Returns `{id: text}` of the stored documents among `ids`.
+        """
+        documents = {}
+        with self.connection.cursor() as cursor:
+            for batch in _batched(ids):
+                cursor.execute(
+                    f'SELECT {self.id_column}, body '
+                    f'FROM {table_name(label)} '
+                    f'WHERE {self.id_column} IN '
+                    f'({", ".join(["%s"] * len(batch))})',
+                    batch
+                )
+                documents.update(cursor.fetchall())
+        return documents
+
+    def delete(self, label, ids):
+        with self.connection.cursor() as cursor:
+            for batch in _batched(ids):
+                cursor.execute(
+                    f'DELETE FROM {table_name(label)} '
+                    f'WHERE {self.id_column} IN '
+                    f'({", ".join(["%s"] * len(batch))})',
+                    batch
+                )
+
+    def insert(self, label, documents):
+        """
+        Stores `(id, text)` documents that are not in the table yet.
+        """
+        raise NotImplementedError
+
+    def search(self, label, query, limit):
+        """
+        Returns the ids of up to `limit` documents matching every word of
+        `query`, the last one as a prefix, best match first.
+        """
+        raise NotImplementedError
+
+
+class SQLiteBackend(SearchBackend):
+    """
+    FTS5 tables ranked with BM25, keyed on the `rowid`.
+    """
+    id_column = 'rowid'
+
+    def create_table(self, label):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {table_name(label)} USING fts5('
+                f"body, tokenize = 'unicode61 remove_diacritics 2', "
+                f"prefix = '2 3')"
+            )
+
+    def insert(self, label, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table_name(label)} (rowid, body) '
+                f'VALUES (%s, %s)',
+                list(documents)
+            )
+
+    def search(self, label, query, limit):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        table = table_name(label)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+                f'ORDER BY rank LIMIT %s',
+                [match, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend(SearchBackend):
+    """
+    Tables with a `tsvector` column and a GIN index, ranked with
+    `ts_rank`.
+    """
+    id_column = 'id'
+    config = 'simple'
+
+    def create_table(self, label):
+        table = table_name(label)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {table} ('
+                f'id integer PRIMARY KEY, '
+                f'body text NOT NULL, '
+                f'vector tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX {table}_vector ON {table} USING GIN (vector)')
+
+    def insert(self, label, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table_name(label)} (id, body, vector) '
+                f"VALUES (%s, %s, to_tsvector('{self.config}', %s))",
+                [(pk, text, text) for pk, text in documents]
+            )
+
+    def search(self, label, query, limit):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        tsquery = ' & '.join(terms) + ':*'
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM {table_name(label)}, '
+                f"to_tsquery('{self.config}', %s) query "
+                f'WHERE vector @@ query '
+                f'ORDER BY ts_rank(vector, query) DESC, id LIMIT %s',
+                [tsquery, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(connection):
+    try:
+        return BACKENDS[connection.vendor](connection)
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Full-text search does not support {connection.vendor}')
@@ -0,0 +1,52 @@
+from django.apps import apps as global_apps
+
+# model label -> lookups whose values make up its searchable text, a new
+# label needs a migration creating its table and documents
+DOCUMENTS = {
+    'users.user': ['first_name', 'last_name', 'username'],
+    'vehicles.vehicle': ['make', 'model'],
+    'trips.trip': [
+        'origin__name',
+        'destination__name',
+        'user__first_name',
+        'user__last_name',
+        'vehicle__make',
+        'vehicle__model',
+    ],
+}
+
+# model label -> (document label, lookup) of the documents holding its text
+DEPENDENTS = {
+    'users.user': [('trips.trip', 'user')],
+    'vehicles.vehicle': [('trips.trip', 'vehicle')],
+    'places.place': [
+        ('trips.trip', 'origin'),
+        ('trips.trip', 'destination'),
+    ],
+}
+
+# model label -> label of the documents of its objects, whose ids they share
+SHARED_DOCUMENTS = {
+    'trips.tripsummary': 'trips.trip',
+}
+
+
+def get_model(label, apps=global_apps):
+    return apps.get_model(label)
+
+
+def document_text(values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def build_documents(label, ids=None, using='default', apps=global_apps):
+    """
+    Yields `(id, text)` for the objects of `label`, only those in `ids`
+    when given.
+    """
+    queryset = get_model(label, apps)._base_manager.using(using)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    rows = queryset.order_by('pk').values_list('pk', *DOCUMENTS[label])
+    for pk, *values in rows.iterator():
+        yield pk, document_text(values)
@@ -0,0 +1,32 @@
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+from .documents import DOCUMENTS, SHARED_DOCUMENTS
+from .index import search
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Filters the models with search documents, or sharing those of another
+    model, to those matching `?q=`, best match first.
+
+    Only the best `max_results` matches are returned. Keyset paginated
+    requests are ordered by their pagination keys instead.
+    """
+    search_param = 'q'
+    max_results = 500
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        label = queryset.model._meta.label_lower
+        label = SHARED_DOCUMENTS.get(label, label)
+        if not query or label not in DOCUMENTS:
+            return queryset
+
+        ids = search(label, query, self.max_results, using=queryset.db)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)],
+            output_field=IntegerField()
+        ))
@@ -0,0 +1,92 @@
+from django.apps import apps as global_apps
+from django.db import connections, transaction
+
+from .backends import get_backend
+from .documents import DEPENDENTS, DOCUMENTS, build_documents, get_model
+
+
+def sync(label, ids, using='default', apps=global_apps):
+    """
+    Brings the documents of the `label` objects in `ids` up to date,
+    deleting those of objects that no longer exist.
+
+    Returns the ids whose document changed.
+    """
+    backend = get_backend(connections[using])
+    ids = set(ids)
+    documents = dict(build_documents(label, ids, using, apps))
+    stored = backend.fetch(label, ids)
+    changed = {
+        pk: text for pk, text in documents.items()
+        if stored.get(pk) != text
+    }
+    removed = set(stored) - set(documents)
+    backend.delete(label, set(changed) & set(stored) | removed)
+    backend.insert(label, changed.items())
+    return set(changed) | removed
+
+
+def rebuild(using='default', apps=global_apps):
+    """
+    Recreates every document from scratch.
+    """
+    backend = get_backend(connections[using])
+    for label in DOCUMENTS:
+        backend.clear(label)
+        backend.insert(label, build_documents(label, using=using, apps=apps))
+
+
+def search(label, query, limit=500, using='default'):
+    """
+    Returns the ids of the `label` objects matching `query`, best match
+    first.
+    """
+    return get_backend(connections[using]).search(label, query, limit)
+
+
+def schedule(label, ids, using='default'):
+    """
+    Updates the documents affected by changes to the `label` objects in
+    `ids` once the current transaction commits, or right away outside of
+    one.
+
+    Changes of one transaction are batched, so creating many objects at
+    once costs a handful of queries rather than a few per object.
+    """
+    connection = connections[using]
+    pending = connection.__dict__.setdefault('search_pending', {})
+    pending.setdefault(label, set()).update(ids)
+    if connection.in_atomic_block:
+        # every call registers a flush in case an earlier one was dropped
+        # with a rolled back transaction, later ones find nothing to do
+        transaction.on_commit(lambda: flush(using), using=using)
+    else:
+        flush(using)
+
+
+def flush(using='default'):
+    connection = connections[using]
+    pending = connection.__dict__.pop('search_pending', {})
+    if not pending:
+        return
+
+    with transaction.atomic(using=using):
+        # text of one model is copied into the documents of others, so
+        # sync those after their sources
+        for label in [label for label in pending if label in DEPENDENTS]:
+            ids = pending.pop(label)
+            if label in DOCUMENTS:
+                ids = sync(label, ids, using)
+            if not ids:
+                continue
+            for document_label, lookup in DEPENDENTS[label]:
+                dependent_ids = get_model(document_label)._base_manager \
+                    .using(using) \
+                    .filter(**{f'{lookup}__in': ids}) \
+                    .values_list('pk', flat=True)
+                pending.setdefault(document_label, set()).update(
+                    dependent_ids)
+
+        for label, ids in pending.items():
+            if ids:
+                sync(label, ids, using)
@@ -0,0 +1,88 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import migrations
+
+# the documents as of this migration, tables of later ones are created by
+# their own migrations
+DOCUMENTS = {
+    'users.user': ['first_name', 'last_name', 'username'],
+    'vehicles.vehicle': ['make', 'model'],
+    'trips.trip': [
+        'origin__name',
+        'destination__name',
+        'user__first_name',
+        'user__last_name',
+        'vehicle__make',
+        'vehicle__model',
+    ],
+}
+
+CREATE_TABLE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE {table} USING fts5("
+        "body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    ],
+    'postgresql': [
+        'CREATE TABLE {table} ('
+        'id integer PRIMARY KEY, '
+        'body text NOT NULL, '
+        'vector tsvector NOT NULL)',
+        'CREATE INDEX {table}_vector ON {table} USING GIN (vector)',
+    ],
+}
+
+INSERT = {
+    'sqlite': 'INSERT INTO {table} (rowid, body) VALUES (%s, %s)',
+    'postgresql': (
+        'INSERT INTO {table} (id, body, vector) '
+        "VALUES (%s, %s, to_tsvector('simple', %s))"
+    ),
+}
+
+
+def table_name(label):
+    return 'search_' + label.replace('.', '_')
+
+
+def documents(apps, label, using):
+    model = apps.get_model(label)
+    rows = model._base_manager.using(using).order_by('pk') \
+        .values_list('pk', *DOCUMENTS[label])
+    for pk, *values in rows.iterator():
+        yield pk, ' '.join(str(value) for value in values if value)
+
+
+def create_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    vendor = connection.vendor
+    if vendor not in CREATE_TABLE:
+        raise ImproperlyConfigured(
+            f'Full-text search does not support {vendor}')
+    with connection.cursor() as cursor:
+        for label in DOCUMENTS:
+            table = table_name(label)
+            for statement in CREATE_TABLE[vendor]:
+                cursor.execute(statement.format(table=table))
+            rows = documents(apps, label, connection.alias)
+            if vendor == 'postgresql':
+                rows = ((pk, text, text) for pk, text in rows)
+            cursor.executemany(INSERT[vendor].format(table=table), list(rows))
+
+
+def drop_tables(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for label in DOCUMENTS:
+            cursor.execute(f'DROP TABLE IF EXISTS {table_name(label)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_auto_20191117_1442'),
+        ('vehicles', '0001_initial'),
+        ('places', '0003_place_coordinates'),
+        ('trips', '0005_booking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_tables, drop_tables),
+    ]
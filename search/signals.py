@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+
+from .documents import DEPENDENTS, DOCUMENTS, get_model
+from .index import schedule
+
+
+def _text_fields(label):
+    # fields of `label` copied into its own or other documents
+    fields = {lookup.split('__')[0] for lookup in DOCUMENTS.get(label, [])}
+    for document_label, relation in DEPENDENTS.get(label, []):
+        for lookup in DOCUMENTS[document_label]:
+            if lookup.startswith(f'{relation}__'):
+                fields.add(lookup.split('__')[1])
+    return fields
+
+
+def update_search_index(sender, instance, using, update_fields=None,
+                        **kwargs):
+    label = sender._meta.label_lower
+    if update_fields is not None and \
+            not set(update_fields) & _text_fields(label):
+        return
+    schedule(label, [instance.pk], using)
+
+
+for label in {*DOCUMENTS, *DEPENDENTS}:
+    model = get_model(label)
+    uid = f'update_search_index:{label}'
+    post_save.connect(update_search_index, sender=model, dispatch_uid=uid)
+    post_delete.connect(update_search_index, sender=model, dispatch_uid=uid)
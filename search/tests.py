@@ -0,0 +1,146 @@
+import json
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from places.cache import place_cache
+from places.models import Place
+from shared.throttling import get_counter_store
+from trips.models import Trip
+from vehicles.models import Vehicle
+from .backends import get_backend
+from .index import rebuild, search
+
+User = get_user_model()
+
+
+class SearchTest(TransactionTestCase):
+    # documents are written when a transaction commits, which TestCase
+    # never does
+
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        place_cache.invalidate()
+        # the search tables are not flushed between tests
+        rebuild()
+        self.client = APIClient()
+        self.thandi = User.objects.create_user(
+            username='thandi', email='thandi@test.com',
+            first_name='Thandi', last_name='Nkosi')
+        self.zoe = User.objects.create_user(
+            username='zoe', email='zoe@test.com',
+            first_name='Zoë', last_name='Naidoo')
+        self.corolla = Vehicle.objects.create(
+            user=self.thandi, make='Toyota', model='Corolla',
+            reg_number='CA 1')
+        self.polo = Vehicle.objects.create(
+            user=self.zoe, make='Volkswagen', model='Polo',
+            reg_number='CA 2')
+        self.pretoria = Place.objects.create(name='Pretoria')
+        self.durban = Place.objects.create(name='Durban')
+        self.trip = self.create_trip(self.thandi, self.corolla)
+
+    def create_trip(self, user, vehicle):
+        return Trip.objects.create(
+            user=user, vehicle=vehicle, origin=self.pretoria,
+            destination=self.durban, trip_date=date.today())
+
+    def get(self, url, key='id'):
+        """
+        Returns `key` of every object listed at `url`.
+        """
+        cache.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item[key] for item in json.loads(response.content)]
+
+    def test_search_viewsets(self):
+        self.assertEqual(
+            self.get('/api/v1/users/?q=nkosi', 'username'), ['thandi'])
+        self.assertEqual(
+            self.get('/api/v1/vehicles/?q=volkswagen polo'),
+            [self.polo.id])
+        self.assertEqual(
+            self.get('/api/v1/trips/?q=durban thandi toyota'),
+            [self.trip.id])
+        self.assertEqual(self.get('/api/v1/trips/?q=polo'), [])
+        self.assertEqual(
+            self.get('/api/v1/trips/summaries/?q=durban thandi toyota'),
+            [self.trip.id])
+        self.assertEqual(self.get('/api/v1/trips/summaries/?q=polo'), [])
+
+    def test_prefix_and_diacritics(self):
+        self.assertEqual(self.get('/api/v1/users/?q=zoe', 'username'), ['zoe'])
+        self.assertEqual(
+            self.get('/api/v1/vehicles/?q=Cor'), [self.corolla.id])
+
+    def test_query_syntax_is_ignored(self):
+        for query in ['"toyota', 'toyota OR', 'NEAR(toyota', '*', '-']:
+            response = self.client.get('/api/v1/vehicles/', {'q': query})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, query)
+
+    def test_ranked(self):
+        Vehicle.objects.create(
+            user=self.zoe, make='Toyota', model='Toyota Hilux',
+            reg_number='CA 3')
+        ids = self.get('/api/v1/vehicles/?q=toyota')
+        self.assertEqual(len(ids), 2)
+        self.assertNotEqual(ids[0], self.corolla.id)
+
+    def test_related_changes_update_trips(self):
+        self.pretoria.name = 'Tshwane'
+        self.pretoria.save()
+        self.thandi.last_name = 'Dlamini'
+        self.thandi.save()
+        self.assertEqual(
+            self.get('/api/v1/trips/?q=tshwane dlamini'), [self.trip.id])
+        self.assertEqual(self.get('/api/v1/trips/?q=pretoria'), [])
+
+    def test_unrelated_changes_skip_index(self):
+        with CaptureQueriesContext(connection) as context:
+            self.thandi.save(update_fields=['last_login'])
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_delete(self):
+        self.trip.delete()
+        self.assertEqual(search('trips.trip', 'durban'), [])
+
+    def test_bulk_create_batched(self):
+        trips = [
+            Trip(user=self.zoe, vehicle=self.polo, origin=self.durban,
+                 destination=self.pretoria, trip_date=date.today())
+            for _ in range(20)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            Trip.objects.create_many(trips)
+        index_queries = [
+            query for query in context.captured_queries
+            if 'search_' in query['sql']
+        ]
+        self.assertLessEqual(len(index_queries), 3)
+        self.assertEqual(
+            sorted(search('trips.trip', 'zoe volkswagen')),
+            [trip.id for trip in trips])
+
+    def test_rolled_back_changes_not_indexed(self):
+        try:
+            with transaction.atomic():
+                self.create_trip(self.zoe, self.polo)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(search('trips.trip', 'zoe'), [])
+
+    def test_rebuild(self):
+        get_backend(connection).clear('users.user')
+        self.assertEqual(search('users.user', 'thandi'), [])
+        call_command('rebuild_search_index')
+        self.assertEqual(search('users.user', 'thandi'), [self.thandi.id])
@@ -0,0 +1,328 @@
+import asyncio
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+
+from .caching import get_tracked_versions
+
+# chunks of a streaming response read ahead of the client
+STREAM_BUFFER = 8
+
+PREFER_WAIT = re.compile(r'(?:^|[,;\s])wait\s*=\s*(\d+)', re.IGNORECASE)
+
+
+def _close_connections(barrier):
+    # holding every worker at the barrier runs this once on each thread
+    barrier.wait()
+    for connection in connections.all():
+        connection.close()
+
+
+def wsgi_environ(scope, body):
+    """
+    The WSGI environ of the HTTP request described by an ASGI `scope`.
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI strings are bytes decoded as latin-1
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+def requested_wait(environ):
+    """
+    Seconds a conditional GET asks to be held with `Prefer: wait=<seconds>`
+    until its response changes, 0 when it does not.
+    """
+    if environ['REQUEST_METHOD'] != 'GET' or \
+            'HTTP_IF_NONE_MATCH' not in environ:
+        return 0
+    match = PREFER_WAIT.search(environ.get('HTTP_PREFER', ''))
+    if match is None:
+        return 0
+    return min(int(match.group(1)), settings.LONG_POLL_MAX_WAIT)
+
+
+class ASGIHandler:
+    """
+    ASGI application serving the project.
+
+    Django 2.2 runs views synchronously, so requests are handled by the
+    WSGI handler on a bounded pool of `ASGI_THREADS` threads, while the
+    event loop only holds connections. Waiting clients cost no thread and
+    the database sees at most `ASGI_THREADS` concurrent requests.
+
+    Conditional GETs sent with `Prefer: wait=<seconds>` are long-polled:
+    a 304 is held for up to `wait` seconds and the request is retried once
+    a model whose writes invalidate cached responses changes. A single
+    task checks the model versions every `LONG_POLL_INTERVAL` seconds for
+    all waiting requests, which hold no thread in the meantime. Endpoints
+    answering conditional requests from the response cache, such as trip
+    search and place autocomplete, thus push their next change to clients
+    instead of being polled.
+
+    Responses with a `stream_async()` method, such as
+    `EventStreamResponse`, are streamed from the event loop as well. Other
+    streaming responses, such as exports, are iterated and closed by a
+    single worker thread for their whole length.
+    """
+
+    def __init__(self, threads=None):
+        self.wsgi_handler = WSGIHandler()
+        self.threads = threads or settings.ASGI_THREADS
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.threads,
+            thread_name_prefix='asgi'
+        )
+        self.changed = None
+        self.watcher = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported scope type {scope["type"]}')
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        if self.watcher is not None:
+            self.watcher.cancel()
+        # connections are per thread, each worker closes its own
+        barrier = threading.Barrier(self.threads)
+        for future in [
+                self.executor.submit(_close_connections, barrier)
+                for _ in range(self.threads)]:
+            future.result()
+        self.executor.shutdown()
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        environ = wsgi_environ(scope, body)
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            deadline = time.monotonic() + requested_wait(environ)
+            while True:
+                status, headers, response = await self.run(
+                    self.get_response, environ)
+                remaining = deadline - time.monotonic()
+                if status != 304 or remaining <= 0:
+                    break
+                if not await self.wait_for_change(disconnected, remaining):
+                    break
+                environ['wsgi.input'].seek(0)
+            if disconnected.done():
+                if not isinstance(response, bytes):
+                    await self.run(response.close)
+                return
+            await self.send_response(
+                send, status, headers, response, disconnected)
+        finally:
+            disconnected.cancel()
+
+    async def wait_for_change(self, disconnected, timeout):
+        """
+        Waits up to `timeout` seconds for a write to a tracked model and
+        returns whether one happened.
+        """
+        if self.watcher is None or self.watcher.done():
+            self.changed = asyncio.Event()
+            self.watcher = asyncio.ensure_future(self.watch_versions())
+        event = self.changed
+        changed = asyncio.ensure_future(event.wait())
+        try:
+            await asyncio.wait(
+                [changed, disconnected],
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            changed.cancel()
+        return event.is_set()
+
+    async def watch_versions(self):
+        versions = await self.run(get_tracked_versions)
+        while True:
+            await asyncio.sleep(settings.LONG_POLL_INTERVAL)
+            current = await self.run(get_tracked_versions)
+            if current != versions:
+                versions = current
+                # wake the waiting requests, later ones wait for the next
+                self.changed.set()
+                self.changed = asyncio.Event()
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def get_response(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+        response = self.wsgi_handler(environ, start_response)
+        if not response.streaming:
+            # rendered content is read and the response closed right away,
+            # so `request_finished` runs on the thread that handled it
+            try:
+                content = b''.join(response)
+            finally:
+                response.close()
+            return started['status'], started['headers'], content
+        return started['status'], started['headers'], response
+
+    async def send_response(self, send, status, headers, response,
+                            disconnected):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        if isinstance(response, bytes):
+            await send({'type': 'http.response.body', 'body': response})
+        elif hasattr(response, 'stream_async'):
+            try:
+                await self.send_stream(
+                    send, response.stream_async(), disconnected)
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                # fires `request_finished` on a worker thread, which closes
+                # that thread's expired database connections
+                await self.run(response.close)
+        else:
+            await self.send_content(send, response, disconnected)
+            await send({'type': 'http.response.body', 'body': b''})
+
+    async def send_content(self, send, response, disconnected):
+        """
+        Sends a streaming response iterated, and closed, by one worker
+        thread: chunks may be read from a database cursor, which belongs to
+        that thread's connection. The thread waits while `STREAM_BUFFER`
+        chunks are pending and stops early once the client is gone.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=STREAM_BUFFER)
+        stop = threading.Event()
+
+        def put(chunk):
+            asyncio.run_coroutine_threadsafe(
+                chunks.put(chunk), loop).result()
+
+        def iterate():
+            try:
+                for chunk in response:
+                    if stop.is_set():
+                        break
+                    put(chunk)
+            finally:
+                response.close()
+                put(None)
+
+        iterating = asyncio.ensure_future(self.run(iterate))
+        chunk = b''
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                if disconnected.done():
+                    stop.set()
+                elif chunk:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        finally:
+            stop.set()
+            # unblock the thread until it has closed the response
+            while chunk is not None:
+                chunk = await chunks.get()
+            await iterating
+
+    async def send_stream(self, send, chunks, disconnected):
+        # streams such as server-sent events are read on the event loop,
+        # holding no thread while they wait, until the client leaves
+        try:
+            while True:
+                chunk = asyncio.ensure_future(chunks.__anext__())
+                await asyncio.wait(
+                    [chunk, disconnected],
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not chunk.done():
+                    chunk.cancel()
+                    await asyncio.wait([chunk])
+                    return
+                try:
+                    body = chunk.result()
+                except StopAsyncIteration:
+                    return
+                await send({
+                    'type': 'http.response.body',
+                    'body': body,
+                    'more_body': True,
+                })
+        finally:
+            await chunks.aclose()
@@ -0,0 +1,89 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.test import APIClient
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """
+    Runs the block against a freshly migrated test database which is
+    destroyed afterwards, so benchmarks never touch the real data.
+
+    The test environment is set up as well: `DEBUG` is off, as in
+    production, and the test client's host name is allowed. Throttling is
+    off, since every benchmark client shares one address.
+    """
+    setup_test_environment(debug=False)
+    unthrottled = override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {},
+    })
+    unthrottled.enable()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=verbosity,
+        autoclobber=True,
+        serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        unthrottled.disable()
+        teardown_test_environment()
+
+
+def api_client(user=None):
+    """
+    An `APIClient`, authenticated as `user` when given.
+    """
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user=user)
+    return client
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of `values`.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(func, repeat=20, warmup=2):
+    """
+    Calls `func` `repeat` times and returns latency statistics in
+    milliseconds.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50': percentile(timings, 0.50),
+        'p99': percentile(timings, 0.99),
+        'mean': sum(timings) / len(timings),
+        'runs': repeat,
+    }
+
+
+def format_timing(label, timing):
+    return (
+        f'{label:<40} p50 {timing["p50"]:8.3f} ms   '
+        f'p99 {timing["p99"]:8.3f} ms   mean {timing["mean"]:8.3f} ms'
+    )
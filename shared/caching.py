@@ -0,0 +1,206 @@
+import hashlib
+import random
+import time
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'model-version:{}'
+MODIFIED_KEY = 'model-modified:{}'
+
+# models registered with `track_model_versions`
+tracked_models = set()
+
+# model label -> fields whose writes alone leave its version as it is
+untracked_fields = {}
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def get_versions(models):
+    """
+    Returns `(version, modified)` pairs for `models`, where `version`
+    changes on every write to the model and `modified` is the time of the
+    last write.
+    """
+    labels = [_label(model) for model in models]
+    keys = [VERSION_KEY.format(label) for label in labels] + \
+        [MODIFIED_KEY.format(label) for label in labels]
+    values = cache.get_many(keys)
+
+    versions = []
+    for label in labels:
+        version_key = VERSION_KEY.format(label)
+        modified_key = MODIFIED_KEY.format(label)
+        version = values.get(version_key)
+        modified = values.get(modified_key)
+        if version is None or modified is None:
+            version, modified = _initialize(version_key, modified_key)
+        versions.append((version, modified))
+    return versions
+
+
+def _initialize(version_key, modified_key):
+    # a missing counter restarts at a random value so that entries cached
+    # under an evicted counter are never matched again
+    cache.add(version_key, random.getrandbits(48), None)
+    cache.add(modified_key, time.time(), None)
+    return cache.get(version_key), cache.get(modified_key)
+
+
+def get_tracked_versions():
+    """
+    Returns a value that changes whenever one of the tracked models is
+    written to.
+    """
+    models = sorted(tracked_models, key=_label)
+    return [version for version, _ in get_versions(models)]
+
+
+def bump_version(model):
+    """
+    Marks every cached response that depends on `model` as stale.
+    """
+    label = _label(model)
+    version_key = VERSION_KEY.format(label)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.add(version_key, random.getrandbits(48), None)
+    cache.set(MODIFIED_KEY.format(label), time.time(), None)
+
+
+def bump_version_on_commit(model, using=None):
+    """
+    Bumps the version of `model` now, so the writing transaction never
+    reads its own stale responses, and again once the transaction commits.
+
+    Responses cached by other requests in between may hold rows from
+    before the commit, under the first new version, which the second bump
+    leaves behind.
+    """
+    bump_version(model)
+    transaction.on_commit(lambda: bump_version(model), using=using)
+
+
+def _bump_sender_version(sender, using=None, update_fields=None, **kwargs):
+    if update_fields is not None and \
+            update_fields <= untracked_fields.get(_label(sender), set()):
+        return
+    bump_version_on_commit(sender, using)
+
+
+def _plain(data):
+    # serializer output holds `ReturnDict`s and `Hyperlink`s that keep a
+    # reference to the serialized objects, which must not be pickled
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(value) for value in data]
+    if isinstance(data, str):
+        return str(data)
+    return data
+
+
+def track_model_versions(*models, untracked=()):
+    """
+    Bumps the version of each of `models` whenever one is saved or deleted,
+    except by saves whose `update_fields` are all among the `untracked`
+    field names, which no cached response shows.
+    """
+    for model in models:
+        tracked_models.add(model)
+        untracked_fields[_label(model)] = set(untracked)
+        uid = f'track_model_versions:{_label(model)}'
+        post_save.connect(_bump_sender_version, sender=model, dispatch_uid=uid)
+        post_delete.connect(
+            _bump_sender_version, sender=model, dispatch_uid=uid)
+
+
+class CachedResponseMixin:
+    """
+    Viewset mixin that caches serialized `list` and `retrieve` responses.
+
+    Entries are keyed on the absolute URL, including query parameters, and
+    the versions of `cache_models`, so any write to one of those models
+    makes them unreachable. Responses carry an `ETag` and `Last-Modified`
+    derived from the same versions, and conditional requests that still
+    match are answered with a 304 without touching the database.
+
+    Viewsets whose responses depend on the current date, e.g. by listing
+    upcoming rows only, set `cache_daily` to key them on the date too.
+    """
+    cache_models = ()
+    cache_timeout = 300
+    cache_anonymous_only = True
+    cache_daily = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def is_cacheable(self, request):
+        if not self.cache_models:
+            return False
+        if self.cache_anonymous_only and request.user.is_authenticated:
+            return False
+        return True
+
+    def get_cache_key(self, request, versions):
+        parts = [
+            request.build_absolute_uri(),
+            request.accepted_renderer.format,
+            *[str(version) for version, _ in versions],
+        ]
+        if self.cache_daily:
+            parts.append(date.today().isoformat())
+        digest = hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+        return f'response:{self.__class__.__name__}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        versions = get_versions(self.cache_models)
+        key = self.get_cache_key(request, versions)
+        etag = f'W/"{key.rsplit(":", 1)[-1]}"'
+        last_modified = int(max(modified for _, modified in versions))
+        if self.cache_daily:
+            midnight = datetime.combine(date.today(), datetime.min.time())
+            last_modified = max(last_modified, int(midnight.timestamp()))
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, _plain(response.data), self.cache_timeout)
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and \
+            last_modified <= if_modified_since
@@ -0,0 +1,186 @@
+from functools import lru_cache
+from operator import attrgetter
+
+from django.db import models
+from django.urls import NoReverseMatch, get_script_prefix, get_urlconf
+from django.urls import reverse as django_reverse
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import (
+    HyperlinkedIdentityField,
+    HyperlinkedRelatedField,
+    PKOnlyObject,
+    PrimaryKeyRelatedField,
+)
+
+from .querysets import _get_model_field
+from .serializers import SparseFieldsetsMixin
+
+# fields whose representation of a value of the matching model field is
+# the value itself
+PASSTHROUGH_FIELDS = {
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.SlugField: str,
+    serializers.URLField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.BooleanField: bool,
+}
+
+PLACEHOLDER = 'placeholder-0'
+
+
+@lru_cache(maxsize=256)
+def _relative_url_template(view_name, lookup_url_kwarg, script_prefix,
+                           urlconf):
+    try:
+        url = django_reverse(
+            view_name, kwargs={lookup_url_kwarg: PLACEHOLDER}, urlconf=urlconf)
+    except NoReverseMatch:
+        return None
+    if url.count(PLACEHOLDER) != 1:
+        return None
+    return url
+
+
+def url_template(field):
+    """
+    Returns `(prefix, suffix)` such that `prefix + str(pk) + suffix` is the
+    URL `field` renders for an integer lookup value, or None when the URL
+    cannot be templated, as with versioning or format suffixes.
+    """
+    request = field.context.get('request', None)
+    if request is None or field.context.get('format') or \
+            getattr(request, 'versioning_scheme', None) is not None:
+        return None
+    url = _relative_url_template(
+        field.view_name,
+        field.lookup_url_kwarg,
+        get_script_prefix(),
+        get_urlconf()
+    )
+    if url is None:
+        return None
+    prefix, suffix = request.build_absolute_uri(url).split(PLACEHOLDER)
+    return prefix, suffix
+
+
+def _generic(field):
+    # what `Serializer.to_representation` does for a single field
+    def render(instance):
+        attribute = field.get_attribute(instance)
+        value = attribute.pk if isinstance(attribute, PKOnlyObject) \
+            else attribute
+        if value is None:
+            return None
+        return field.to_representation(attribute)
+    return render
+
+
+def _compile_url(field, template, get_value):
+    prefix, suffix = template
+
+    def render(instance):
+        value = get_value(instance)
+        if value is None:
+            return None
+        if type(value) is int:
+            return prefix + str(value) + suffix
+        return field.to_representation(field.get_attribute(instance))
+    return render
+
+
+def _compile_field(field, serializer):
+    source_attrs = field.source_attrs
+
+    if isinstance(field, HyperlinkedIdentityField):
+        template = url_template(field)
+        if template is not None:
+            return _compile_url(
+                field, template, attrgetter(field.lookup_field))
+        return _generic(field)
+
+    if field.source == '*' or isinstance(field, serializers.ListSerializer):
+        return _generic(field)
+
+    get_value = attrgetter('.'.join(source_attrs))
+
+    if isinstance(field, serializers.Serializer):
+        render_nested = compile_serializer(field)
+
+        def render(instance):
+            value = get_value(instance)
+            return None if value is None else render_nested(value)
+        return render
+
+    if isinstance(field, (PrimaryKeyRelatedField, HyperlinkedRelatedField)):
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+        model_field = model and _get_model_field(model, source_attrs[0])
+        if len(source_attrs) != 1 or model_field is None or \
+                not model_field.is_relation or not model_field.concrete or \
+                not field.use_pk_only_optimization():
+            return _generic(field)
+        get_pk = attrgetter(model_field.attname)
+        if isinstance(field, PrimaryKeyRelatedField):
+            return get_pk
+        template = url_template(field)
+        if template is None:
+            return _generic(field)
+        return _compile_url(field, template, get_pk)
+
+    value_type = PASSTHROUGH_FIELDS.get(type(field))
+    if value_type is not None:
+        def render(instance):
+            value = get_value(instance)
+            if value is None or type(value) is value_type:
+                return value
+            return field.to_representation(value)
+        return render
+
+    return _generic(field)
+
+
+def compile_serializer(serializer):
+    """
+    Returns a function rendering an instance the way `serializer` does.
+
+    Fields are inspected once, rather than for every instance: model
+    attributes are read with precompiled getters, values that need no
+    conversion are passed through and URLs are built from a template
+    instead of calling `reverse()`. Fields that cannot be compiled use
+    their own `to_representation`.
+    """
+    if type(serializer).to_representation not in (
+            serializers.Serializer.to_representation,
+            SparseFieldsetsMixin.to_representation):
+        return serializer.to_representation
+
+    hidden = getattr(serializer, 'hidden_fields', ())
+    compiled = [
+        (field.field_name, _compile_field(field, serializer))
+        for field in serializer._readable_fields
+        if field.field_name not in hidden
+    ]
+
+    def render(instance):
+        data = {}
+        for name, render_field in compiled:
+            try:
+                data[name] = render_field(instance)
+            except SkipField:
+                pass
+        return data
+    return render
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """
+    Read path of `many=True` serializers that renders every item through
+    `compile_serializer(child)`.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        render = compile_serializer(self.child)
+        return [render(item) for item in iterable]
@@ -0,0 +1,32 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The SQLite backend with pragmas suited to serving concurrent requests.
+
+    In WAL mode readers no longer block on a writer and commits append to
+    the log instead of rewriting the rollback journal, which with
+    `synchronous = NORMAL` skips the fsync on every commit while staying
+    consistent after a crash. `busy_timeout` makes a writer wait for the
+    lock instead of failing at once.
+
+    The pragmas are set on every new connection and may be overridden
+    with a `pragmas` dict in the database `OPTIONS`.
+    """
+    default_pragmas = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -20000,
+        'temp_store': 'MEMORY',
+    }
+
+    def get_new_connection(self, conn_params):
+        conn_params = dict(conn_params)
+        pragmas = {**self.default_pragmas, **conn_params.pop('pragmas', {})}
+        conn = super().get_new_connection(conn_params)
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
@@ -0,0 +1,100 @@
+import json
+import time
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+KEEP_ALIVE = b': keep-alive\n\n'
+
+
+def format_event(event, data, event_id=None):
+    """
+    Encodes a server-sent event whose data is `data` as JSON.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, cls=JSONEncoder)}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class EventStream:
+    """
+    Server-sent events of the messages of a pub/sub `subscription`, each
+    rendered as `(event, data)` by `render`, which may return None to skip
+    a message.
+
+    A comment is sent when no message arrived for
+    `EVENT_STREAM_HEARTBEAT` seconds, so proxies keep the connection
+    open, and the stream ends after `EVENT_STREAM_TIMEOUT` seconds, after
+    which clients reconnect with the `Last-Event-ID` of the last event
+    they received.
+    """
+
+    def __init__(self, subscription, render):
+        self.subscription = subscription
+        self.render = render
+        self.heartbeat = settings.EVENT_STREAM_HEARTBEAT
+        self.timeout = settings.EVENT_STREAM_TIMEOUT
+
+    def encode(self, message):
+        if message is None:
+            return KEEP_ALIVE
+        rendered = self.render(message)
+        if rendered is None:
+            return None
+        event, data = rendered
+        return format_event(event, data, message.id)
+
+    def wait(self, deadline):
+        return max(0, min(self.heartbeat, deadline - time.monotonic()))
+
+    def __iter__(self):
+        deadline = time.monotonic() + self.timeout
+        try:
+            yield f'retry: {settings.EVENT_STREAM_RETRY}\n\n'.encode()
+            while time.monotonic() < deadline:
+                chunk = self.encode(
+                    self.subscription.get(self.wait(deadline)))
+                if chunk is not None:
+                    yield chunk
+        finally:
+            self.close()
+
+    async def __aiter__(self):
+        deadline = time.monotonic() + self.timeout
+        try:
+            yield f'retry: {settings.EVENT_STREAM_RETRY}\n\n'.encode()
+            while time.monotonic() < deadline:
+                chunk = self.encode(
+                    await self.subscription.aget(self.wait(deadline)))
+                if chunk is not None:
+                    yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        self.subscription.close()
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """
+    A `text/event-stream` response of an `EventStream`.
+
+    Under WSGI the stream holds a thread for as long as it is open, the
+    ASGI handler reads it from the event loop through `stream_async()`
+    instead.
+    """
+
+    def __init__(self, stream, **kwargs):
+        kwargs.setdefault('content_type', 'text/event-stream')
+        super().__init__(stream, **kwargs)
+        self.event_stream = stream
+        self['Cache-Control'] = 'no-cache'
+        # stops nginx from buffering the stream
+        self['X-Accel-Buffering'] = 'no'
+
+    def stream_async(self):
+        return self.event_stream.__aiter__()
@@ -0,0 +1,35 @@
+from rest_framework import serializers
+
+from .images import FORMATS, get_variant_sizes, variant_name, variants_ready
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only field that renders the URLs of the resized variants of an
+    image field, keyed by size label and format.
+
+    Until the variants are generated in the background, every entry is the
+    URL of the original image. Which they are is recorded on the instance,
+    see `variants_ready`, so rendering does not query the storage.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request', None)
+        generated = variants_ready(value)
+        variants = {}
+        for label in get_variant_sizes():
+            variants[label] = {}
+            for extension in FORMATS:
+                name = variant_name(value.name, label, extension) \
+                    if generated else value.name
+                url = value.storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[label][extension] = url
+        return variants
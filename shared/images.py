@@ -0,0 +1,132 @@
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from shared.caching import bump_version_on_commit
+from taskqueue.registry import task
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def get_variant_sizes():
+    """
+    Maps variant labels to the longest side, in pixels, of each variant.
+    """
+    return getattr(settings, 'IMAGE_VARIANTS', {'thumb': 128, 'medium': 480})
+
+
+def variant_name(name, label, extension):
+    """
+    Storage name of a variant, stored beside the original:
+    `vehicles/car.jpeg` becomes `vehicles/car_thumb.webp`.
+    """
+    root, _ = os.path.splitext(name)
+    return f'{root}_{label}.{extension}'
+
+
+def variants_field_name(field_name):
+    """
+    Name of the model field holding the name of the image whose variants
+    were generated last, which image fields with variants have beside them.
+    """
+    return f'{field_name}_variants_for'
+
+
+def variants_ready(field_file):
+    """
+    Whether the variants of `field_file` exist, according to its model
+    instance rather than its storage.
+    """
+    field_name = variants_field_name(field_file.field.name)
+    return getattr(field_file.instance, field_name, None) == field_file.name
+
+
+def record_variants(model, pk, field_name, name):
+    """
+    Records that the variants of the image `name` exist, if the instance
+    still has that image.
+    """
+    model._base_manager.filter(pk=pk, **{field_name: name}) \
+        .update(**{variants_field_name(field_name): name})
+    # an update sends no `post_save`, so cached responses are not dropped
+    bump_version_on_commit(model)
+
+
+def has_variants(storage, name):
+    """
+    Whether the variants of the image `name` exist, judged by the one
+    `generate_variants` writes last.
+    """
+    last_label = list(get_variant_sizes())[-1]
+    last_extension = list(FORMATS)[-1]
+    return storage.exists(variant_name(name, last_label, last_extension))
+
+
+def generate_variants(storage, name):
+    """
+    Writes every size and format variant of the image `name` to `storage`,
+    replacing variants left over from a previous upload with the same name.
+    """
+    with storage.open(name, 'rb') as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+
+    for label, size in get_variant_sizes().items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            target = variant_name(name, label, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+
+
+@task(name='images.generate_variants', priority=10)
+def generate_field_variants(model, pk, field, name):
+    """
+    Generates the variants of the image `name` of the `field` of a model
+    instance, unless the instance or the image is gone by then.
+    """
+    model = apps.get_model(model)
+    instance = model._base_manager.filter(pk=pk).first()
+    if instance is None:
+        return
+    storage = getattr(instance, field).storage
+    if storage.exists(name):
+        generate_variants(storage, name)
+        record_variants(model, pk, field, name)
+
+
+def schedule_variants(field_file):
+    """
+    Queues the generation of the variants of `field_file`, if they do not
+    exist yet, as a background task. Returns the task, if any.
+
+    Variants found in the storage, e.g. generated before their instance
+    recorded them, are recorded instead.
+    """
+    if not field_file or variants_ready(field_file):
+        return None
+    instance = field_file.instance
+    name = field_file.name
+    if has_variants(field_file.storage, name):
+        record_variants(
+            instance.__class__, instance.pk, field_file.field.name, name)
+        return None
+    return generate_field_variants.enqueue(
+        model=instance._meta.label,
+        pk=instance.pk,
+        field=field_file.field.name,
+        name=name,
+        idempotency_key=f'images.generate_variants:{name}'
+    )
@@ -0,0 +1,273 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotFound
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class QueryRecorder:
+    """
+    A `connection.execute_wrapper` hook recording the number, SQL and
+    duration of the queries run while it is installed.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries.append((sql, _freeze(params)))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duplicates(self):
+        """
+        Queries repeating the SQL and parameters of an earlier query.
+        """
+        return self.count - len(set(self.queries))
+
+    @property
+    def similar(self):
+        """
+        Queries repeating the SQL of an earlier query with other
+        parameters, the signature of an N+1 pattern.
+        """
+        return len(set(self.queries)) - \
+            len(set(sql for sql, _ in self.queries))
+
+
+def _freeze(params):
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(param) for param in params)
+    if isinstance(params, dict):
+        return tuple(sorted((key, _freeze(value))
+                            for key, value in params.items()))
+    try:
+        hash(params)
+    except TypeError:
+        return repr(params)
+    return params
+
+
+class MetricsRegistry:
+    """
+    Aggregates request measurements per view and action, and renders them
+    in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = Counter()
+            self.series = defaultdict(lambda: {
+                'count': 0,
+                'duration': 0.0,
+                'buckets': [0] * len(self.buckets),
+                'db_duration': 0.0,
+                'queries': 0,
+                'duplicate_queries': 0,
+                'similar_queries': 0,
+                'response_bytes': 0,
+            })
+
+    def observe(self, view, action, status, duration, recorder,
+                response_bytes):
+        with self.lock:
+            self.requests[view, action, status] += 1
+            series = self.series[view, action]
+            series['count'] += 1
+            series['duration'] += duration
+            for index, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    series['buckets'][index] += 1
+            series['db_duration'] += recorder.duration
+            series['queries'] += recorder.count
+            series['duplicate_queries'] += recorder.duplicates
+            series['similar_queries'] += recorder.similar
+            series['response_bytes'] += response_bytes
+
+    def get(self, view, action):
+        with self.lock:
+            series = self.series.get((view, action))
+            return dict(series) if series is not None else None
+
+    def render(self):
+        with self.lock:
+            requests = sorted(self.requests.items())
+            series = sorted(
+                (key, dict(value)) for key, value in self.series.items())
+
+        lines = [
+            '# HELP kapool_requests_total Requests served.',
+            '# TYPE kapool_requests_total counter',
+        ]
+        for (view, action, status), count in requests:
+            labels = _labels(view=view, action=action, status=status)
+            lines.append(f'kapool_requests_total{{{labels}}} {count}')
+
+        lines += [
+            '# HELP kapool_request_duration_seconds Time spent in the view '
+            'and middleware.',
+            '# TYPE kapool_request_duration_seconds histogram',
+        ]
+        for (view, action), value in series:
+            for bound, count in zip(self.buckets, value['buckets']):
+                labels = _labels(view=view, action=action, le=bound)
+                lines.append(
+                    f'kapool_request_duration_seconds_bucket{{{labels}}} '
+                    f'{count}')
+            labels = _labels(view=view, action=action, le='+Inf')
+            lines.append(
+                f'kapool_request_duration_seconds_bucket{{{labels}}} '
+                f'{value["count"]}')
+            labels = _labels(view=view, action=action)
+            lines.append(
+                f'kapool_request_duration_seconds_sum{{{labels}}} '
+                f'{value["duration"]}')
+            lines.append(
+                f'kapool_request_duration_seconds_count{{{labels}}} '
+                f'{value["count"]}')
+
+        for name, key, kind, description in [
+            ('kapool_db_duration_seconds_total', 'db_duration', 'counter',
+             'Time spent executing database queries.'),
+            ('kapool_db_queries_total', 'queries', 'counter',
+             'Database queries executed.'),
+            ('kapool_db_duplicate_queries_total', 'duplicate_queries',
+             'counter', 'Queries repeating an earlier query of the same '
+             'request.'),
+            ('kapool_db_similar_queries_total', 'similar_queries',
+             'counter', 'Queries repeating the SQL of an earlier query of '
+             'the same request with other parameters.'),
+            ('kapool_response_bytes_total', 'response_bytes', 'counter',
+             'Bytes of response bodies, streamed responses excluded.'),
+        ]:
+            lines += [
+                f'# HELP {name} {description}',
+                f'# TYPE {name} {kind}',
+            ]
+            for (view, action), value in series:
+                labels = _labels(view=view, action=action)
+                lines.append(f'{name}{{{labels}}} {value[key]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return ','.join(
+        f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+metrics = MetricsRegistry()
+
+
+def is_internal_request(request):
+    """
+    Whether `request` may see instrumentation: always when `DEBUG` is on,
+    otherwise only from one of `INTERNAL_IPS`.
+    """
+    return settings.DEBUG or \
+        request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+
+
+def resolve_view_name(view_func, method):
+    """
+    Returns `(view, action)` for a resolved view function: the viewset
+    class and action, such as `('TripViewSet', 'list')`, for viewsets.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return view_func.__module__ + '.' + view_func.__name__, method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return cls.__name__, actions.get(method.lower(), method.lower())
+
+
+class InstrumentationMiddleware:
+    """
+    Measures every request: database queries and their duration through
+    an `execute_wrapper` on each connection, Python time, rendering time
+    and response size.
+
+    The measurements are aggregated per view and action in `metrics` and,
+    for internal requests, returned in a `Server-Timing` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._instrumentation = {'view': None, 'render': 0.0}
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view, action = request._instrumentation['view'] or ('', '')
+        response_bytes = 0 if response.streaming else len(response.content)
+        metrics.observe(
+            view, action, response.status_code, duration, recorder,
+            response_bytes)
+
+        if is_internal_request(request):
+            response['Server-Timing'] = self.server_timing(
+                duration, recorder, request._instrumentation['render'])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation['view'] = resolve_view_name(
+            view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # responses are rendered after the view returns, time that apart
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._instrumentation['render'] = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def server_timing(self, duration, recorder, render):
+        db = recorder.duration
+        app = max(0.0, duration - db - render)
+        return ', '.join([
+            f'db;dur={db * 1000:.2f};desc="{recorder.count} queries, '
+            f'{recorder.duplicates} duplicate, {recorder.similar} similar"',
+            f'app;dur={app * 1000:.2f}',
+            f'render;dur={render * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ])
+
+
+def metrics_view(request):
+    """
+    Serves `metrics` in the Prometheus text format to internal requests.
+    """
+    if not is_internal_request(request):
+        return HttpResponseNotFound()
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
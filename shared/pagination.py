@@ -0,0 +1,169 @@
+import base64
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a tuple of columns.
+
+    Unlike `CursorPagination`, which positions on the first ordering field
+    and skips ties with an offset, the cursor stores the full key of the
+    boundary row and the next page is fetched with a row-value comparison,
+    so every page is an index range scan regardless of its depth.
+
+    Pagination is opt-in: a list is only paginated when the request sends a
+    cursor or a page size.
+    """
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request, view)
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Pages the rows of several querysets, e.g. of tables holding the
+        same kind of rows, as one list. Every queryset is read with the
+        same keyset range and the rows are merged, so a page costs one
+        index range scan per queryset.
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.model = querysets[0].model
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        results = []
+        for queryset in querysets:
+            if position is not None:
+                queryset = queryset.filter(
+                    self.keyset_filter(position, reverse))
+            if reverse:
+                queryset = queryset.order_by(
+                    *[f'-{field}' for field in self.ordering])
+            else:
+                queryset = queryset.order_by(*self.ordering)
+            results.extend(queryset[:page_size + 1])
+        if len(querysets) > 1:
+            results.sort(
+                key=lambda row: tuple(self.get_position(row).values()),
+                reverse=reverse
+            )
+
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = None
+        self.previous_position = None
+        if results and has_next:
+            self.next_position = self.get_position(results[-1])
+        if results and has_previous:
+            self.previous_position = self.get_position(results[0])
+        return results
+
+    def keyset_filter(self, position, reverse=False):
+        """
+        Builds `(a, b, c) > (x, y, z)` as
+        `a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)`,
+        with a leading `a >= x` so the planner can range scan on `a`.
+        """
+        lookup = 'lt' if reverse else 'gt'
+        boundary = 'lte' if reverse else 'gte'
+        clauses = []
+        for index, field in enumerate(self.ordering):
+            equal = {
+                previous: position[previous]
+                for previous in self.ordering[:index]
+            }
+            equal[f'{field}__{lookup}'] = position[field]
+            clauses.append(Q(**equal))
+        first = self.ordering[0]
+        return Q(**{f'{first}__{boundary}': position[first]}) & \
+            reduce(or_, clauses)
+
+    def get_position(self, instance):
+        return OrderedDict(
+            (field, getattr(instance, field)) for field in self.ordering
+        )
+
+    def encode_cursor(self, position, reverse=False):
+        payload = {
+            'p': list(position.values()),
+            'r': int(reverse),
+        }
+        data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = payload['p']
+            reverse = bool(payload.get('r'))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = OrderedDict()
+            for field, value in zip(self.ordering, values):
+                model_field = self.model._meta.get_field(field)
+                position[field] = model_field.to_python(value)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import threading
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+Message = namedtuple('Message', ['id', 'channel', 'data'])
+
+
+class Broker:
+    """
+    Publishes messages to the subscribers of a channel.
+
+    Message ids increase with every message, so a client reconnecting with
+    the id of the last message it received can be sent what it missed.
+    Data must be serializable to JSON, so that brokers spanning several
+    processes can implement the same interface.
+    """
+
+    def publish(self, channel, data):
+        raise NotImplementedError
+
+    def subscribe(self, channels, last_id=None):
+        """
+        Returns a `Subscription` to `channels`, starting with the retained
+        messages published after `last_id` when it is given.
+        """
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class Subscription:
+    """
+    Messages of a broker's channels, received from publishing threads and
+    read either blocking, with `get()`, or from an event loop, with
+    `aget()`.
+
+    When a subscriber falls more than `max_pending` messages behind, the
+    oldest ones are dropped.
+    """
+
+    def __init__(self, broker, channels, max_pending=1000):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.messages = deque(maxlen=max_pending)
+        self.condition = threading.Condition()
+        self.waiters = []
+
+    def put(self, message):
+        with self.condition:
+            self.messages.append(message)
+            self.condition.notify_all()
+            waiters = list(self.waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _pop(self):
+        return self.messages.popleft() if self.messages else None
+
+    def get(self, timeout=None):
+        """
+        Returns the next message, or None if none arrives within `timeout`
+        seconds.
+        """
+        with self.condition:
+            if not self.messages:
+                self.condition.wait(timeout)
+            return self._pop()
+
+    async def aget(self, timeout=None):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.condition:
+            if self.messages:
+                return self._pop()
+            self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.condition:
+                self.waiters.remove(waiter)
+        with self.condition:
+            return self._pop()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker(Broker):
+    """
+    Broker delivering messages to the subscribers of the current process,
+    which retains the last `backlog` messages of every channel for
+    reconnecting subscribers.
+
+    Message ids are counted per process and restart at 1 with it, so a
+    `last_id` from before a restart, or from another process's broker,
+    skips or replays messages. Several processes need a shared broker.
+    """
+
+    def __init__(self, backlog=1000):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.subscriptions = {}
+        self.history = deque(maxlen=backlog)
+
+    def publish(self, channel, data):
+        with self.lock:
+            message = Message(next(self.ids), channel, data)
+            self.history.append(message)
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+        return message
+
+    def subscribe(self, channels, last_id=None):
+        subscription = Subscription(self, channels)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscriptions.setdefault(channel, set()).add(
+                    subscription)
+            if last_id is not None:
+                for message in self.history:
+                    if message.id > last_id and \
+                            message.channel in subscription.channels:
+                        subscription.put(message)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscriptions = self.subscriptions.get(channel)
+                if subscriptions is None:
+                    continue
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[channel]
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """
+    The broker configured with the `PUBSUB_BROKER` setting.
+    """
+    return import_string(settings.PUBSUB_BROKER)()
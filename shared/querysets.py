@@ -0,0 +1,173 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import permissions, serializers
+from rest_framework.relations import (
+    HyperlinkedIdentityField,
+    ManyRelatedField,
+    RelatedField,
+)
+
+
+class QueryPlan:
+    """
+    The `select_related`, `prefetch_related` and `only` arguments a
+    serializer needs to render a queryset without extra queries.
+    """
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = {}
+        self.only = set()
+
+    def apply(self, queryset, defer=True):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        for lookup in sorted(self.prefetch_related):
+            queryset = queryset.prefetch_related(
+                self.prefetch_related[lookup])
+        if defer and self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def _path(prefix, name):
+    return f'{prefix}__{name}' if prefix else name
+
+
+def _get_model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _is_forward_relation(model_field):
+    return (
+        model_field is not None
+        and model_field.is_relation
+        and (model_field.many_to_one or model_field.one_to_one)
+        and model_field.concrete
+    )
+
+
+def _load_all(plan, model, prefix):
+    # the serializer reads something we cannot map to a column (a property
+    # or a method field), so every concrete column of the model is loaded
+    for model_field in model._meta.concrete_fields:
+        plan.only.add(_path(prefix, model_field.name))
+
+
+def _plan_serializer(plan, serializer, model, prefix):
+    plan.only.add(_path(prefix, model._meta.pk.name))
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if field.source == '*':
+            if isinstance(field, HyperlinkedIdentityField):
+                lookup = field.lookup_field
+                if lookup != 'pk':
+                    plan.only.add(_path(prefix, lookup))
+            elif isinstance(field, serializers.Serializer):
+                _plan_serializer(plan, field, model, prefix)
+            else:
+                _load_all(plan, model, prefix)
+            continue
+
+        *relations, name = field.source_attrs
+        current_model, current_prefix = model, prefix
+        for relation in relations:
+            model_field = _get_model_field(current_model, relation)
+            if not _is_forward_relation(model_field):
+                _load_all(plan, current_model, current_prefix)
+                break
+            path = _path(current_prefix, relation)
+            plan.select_related.add(path)
+            plan.only.add(path)
+            current_model = model_field.related_model
+            current_prefix = path
+            plan.only.add(_path(current_prefix, current_model._meta.pk.name))
+        else:
+            _plan_field(plan, field, current_model, current_prefix, name)
+
+
+def _plan_field(plan, field, model, prefix, name):
+    model_field = _get_model_field(model, name)
+    path = _path(prefix, name)
+
+    if model_field is None:
+        _load_all(plan, model, prefix)
+        return
+
+    if isinstance(field, serializers.ListSerializer) or \
+            isinstance(field, ManyRelatedField):
+        child = getattr(field, 'child', None)
+        queryset = model_field.related_model._default_manager.all()
+        if isinstance(child, serializers.Serializer):
+            queryset = plan_queryset(queryset, child)
+        plan.prefetch_related[path] = Prefetch(path, queryset=queryset)
+        return
+
+    if isinstance(field, serializers.Serializer):
+        if not _is_forward_relation(model_field):
+            plan.prefetch_related[path] = Prefetch(path)
+            return
+        plan.select_related.add(path)
+        plan.only.add(path)
+        _plan_serializer(plan, field, model_field.related_model, path)
+        return
+
+    if isinstance(field, RelatedField) and _is_forward_relation(model_field):
+        plan.only.add(path)
+        if not field.use_pk_only_optimization():
+            # e.g. a slug field reads a column of the related row
+            plan.select_related.add(path)
+            _load_all(plan, model_field.related_model, path)
+        return
+
+    if model_field.is_relation and not model_field.concrete:
+        plan.prefetch_related[path] = Prefetch(path)
+        return
+
+    plan.only.add(path)
+
+
+def build_query_plan(serializer, model):
+    """
+    Walks the readable fields of `serializer` and returns the `QueryPlan`
+    that loads everything it renders for `model` up front.
+    """
+    plan = QueryPlan()
+    _plan_serializer(plan, serializer, model, '')
+    return plan
+
+
+def plan_queryset(queryset, serializer, defer=True):
+    """
+    Applies the query plan derived from `serializer` to `queryset`.
+
+    Nested serializers on forward relations become `select_related`, reverse
+    and many-to-many relations become `prefetch_related`, and when `defer`
+    is set only the columns the serializer reads are selected.
+    """
+    plan = build_query_plan(serializer, queryset.model)
+    return plan.apply(queryset, defer=defer)
+
+
+class QueryPlanMixin:
+    """
+    Viewset mixin that plans `get_queryset()` from the serializer so that
+    list and detail endpoints run a constant number of queries.
+
+    Column pruning with `only()` is limited to safe methods, writes keep
+    fully loaded instances for model validation.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return plan_queryset(
+            queryset,
+            self.get_serializer(),
+            defer=self.request.method in permissions.SAFE_METHODS
+        )
@@ -0,0 +1,37 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PassthroughRenderer(JSONRenderer):
+    """
+    Accepts any media type for views that stream their own response, such
+    as a CSV export requested with `Accept: text/csv`.
+
+    Error responses raised before streaming starts are still rendered as
+    JSON.
+    """
+    media_type = '*/*'
+    format = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders compact JSON with `orjson` when it is installed, falling back
+    to the standard `JSONRenderer` for indented output and when it is not.
+    """
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self._encoder.default)
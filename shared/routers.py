@@ -0,0 +1,115 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework import permissions
+
+PIN_COOKIE = 'primary_pin'
+
+_state = threading.local()
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def pin_to_primary():
+    """
+    Sends the remaining reads of the current request to the primary.
+    """
+    _state.pinned = True
+
+
+@contextmanager
+def use_primary():
+    """
+    Reads from the primary inside the block.
+    """
+    pinned = is_pinned()
+    pin_to_primary()
+    try:
+        yield
+    finally:
+        _state.pinned = pinned
+
+
+class ReplicaRouter:
+    """
+    Sends reads to one of `DATABASE_REPLICAS`, picked at random, and
+    writes to the primary.
+
+    Reads go to the primary instead when the request is pinned to it,
+    inside a transaction, or for an object loaded from the primary, so
+    that nothing reads data older than what the request wrote itself.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = get_replicas()
+        if not replicas or is_pinned() or \
+                connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas receive the schema from the primary
+        return db not in get_replicas()
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins requests to the primary database while they may need to read
+    their own writes.
+
+    A request is pinned when it uses an unsafe method, when its view sets
+    `read_from_primary`, or when it carries the cookie set after a write,
+    which keeps the client on the primary for `REPLICA_PIN_SECONDS` until
+    the replicas have caught up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = request.method not in permissions.SAFE_METHODS or \
+            PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.pinned = _state.wrote = False
+
+        if wrote and get_replicas():
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        cls = getattr(view_func, 'cls', None)
+        if getattr(cls, 'read_from_primary', False):
+            pin_to_primary()
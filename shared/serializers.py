@@ -0,0 +1,101 @@
+from rest_framework import permissions, serializers
+
+
+def parse_fieldset(value):
+    """
+    Parses `'id,origin.name'` into the tree `{'id': {}, 'origin': {'name':
+    {}}}`, where an empty subtree selects every field.
+    """
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsetsMixin:
+    """
+    Serializer mixin letting clients shape responses with query
+    parameters.
+
+    `?fields=id,trip_date,origin.name` renders only the listed fields,
+    dotted paths selecting fields of nested objects. With `?expand=`,
+    only the listed nested objects are embedded, for example
+    `?expand=origin,vehicle`, and the others are rendered as their
+    primary key. Without `?expand=` every nested object is embedded.
+
+    On writes, writable fields are only hidden from the response, so they
+    are still validated. As querysets are planned from the serializer,
+    relations that are not embedded are not joined.
+    """
+    fields_param = 'fields'
+    expand_param = 'expand'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request', None)
+        if request is None:
+            return fields
+        params = getattr(request, 'query_params', request.GET)
+        path = self.get_field_path()
+
+        self.hidden_fields = set()
+        if params.get(self.fields_param):
+            selected = parse_fieldset(params[self.fields_param])
+            for name in path:
+                selected = selected.get(name, {})
+            if selected:
+                # on writes, writable fields stay for validation and are
+                # hidden from the representation instead
+                if request.method not in permissions.SAFE_METHODS:
+                    self.hidden_fields = {
+                        name for name, field in fields.items()
+                        if not field.read_only and not field.write_only and
+                        name not in selected
+                    }
+                fields = type(fields)(
+                    (name, field) for name, field in fields.items()
+                    if field.write_only or name in selected or
+                    name in self.hidden_fields
+                )
+
+        if self.expand_param in params:
+            expand = set(
+                name.strip()
+                for name in params[self.expand_param].split(',')
+            )
+            for name, field in list(fields.items()):
+                if isinstance(field, serializers.BaseSerializer) and \
+                        not field.write_only and \
+                        '.'.join([*path, name]) not in expand:
+                    fields[name] = self.collapse_field(field)
+
+        return fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in getattr(self, 'hidden_fields', ()):
+            data.pop(name, None)
+        return data
+
+    def get_field_path(self):
+        """
+        Names of the fields leading from the root serializer to this one.
+        """
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+    def collapse_field(self, field):
+        many = isinstance(field, serializers.ListSerializer)
+        return serializers.PrimaryKeyRelatedField(
+            source=field.source,
+            read_only=True,
+            many=many
+        )
@@ -0,0 +1,123 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from places.models import Place, normalize_place_name
+from trips.models import Trip
+from trips.summaries import rebuild_summaries
+from vehicles.models import Vehicle
+
+BATCH_SIZE = 5000
+
+# places are spread over a box roughly the size of South Africa
+LATITUDES = (-35.0, -22.0)
+LONGITUDES = (16.0, 33.0)
+
+MAKES = [
+    ('Toyota', 'Corolla'),
+    ('Volkswagen', 'Polo'),
+    ('Ford', 'Fiesta'),
+    ('Honda', 'Jazz'),
+    ('Nissan', 'Almera'),
+]
+
+
+def _bulk_create(model, objects):
+    for start in range(0, len(objects), BATCH_SIZE):
+        model.objects.bulk_create(objects[start:start + BATCH_SIZE])
+
+
+def _batched(iterable):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(users=100, places=50, vehicles=None, trips=1000, days=90, seed=0):
+    """
+    Bulk inserts a synthetic data set for benchmarks.
+
+    Rows are written with `bulk_create`, bypassing model `save()` and
+    signals, so this must only be used against a scratch database. Trip
+    summaries are rebuilt afterwards. Returns the row counts by model name.
+    """
+    rng = random.Random(seed)
+    vehicles = vehicles or users
+    User = get_user_model()
+
+    with transaction.atomic():
+        user_offset = User.objects.count()
+        _bulk_create(User, [
+            User(
+                username=f'user{user_offset + index}',
+                email=f'user{user_offset + index}@example.com',
+                first_name=f'First{index}',
+                last_name=f'Last{index}',
+                password='!',
+            )
+            for index in range(users)
+        ])
+        user_ids = list(User.objects.values_list('id', flat=True))
+
+        place_offset = Place.objects.count()
+        names = [f'Place {place_offset + index}' for index in range(places)]
+        _bulk_create(Place, [
+            Place(
+                name=name,
+                name_key=normalize_place_name(name),
+                latitude=rng.uniform(*LATITUDES),
+                longitude=rng.uniform(*LONGITUDES),
+            )
+            for name in names
+        ])
+        place_ids = list(Place.objects.values_list('id', flat=True))
+
+        _bulk_create(Vehicle, [
+            Vehicle(
+                user_id=rng.choice(user_ids),
+                make=make,
+                model=model,
+                reg_number=f'SYN {index:06d}',
+            )
+            for index, (make, model) in enumerate(
+                rng.choice(MAKES) for _ in range(vehicles))
+        ])
+        vehicle_owners = list(
+            Vehicle.objects.values_list('id', 'user_id'))
+
+    today = date.today()
+    rows = (
+        _synthetic_trip(rng, place_ids, vehicle_owners, today, days)
+        for _ in range(trips)
+    )
+    for batch in _batched(rows):
+        with transaction.atomic():
+            Trip.objects.bulk_create(batch)
+    rebuild_summaries()
+
+    return {
+        'users': users,
+        'places': places,
+        'vehicles': vehicles,
+        'trips': trips,
+    }
+
+
+def _synthetic_trip(rng, place_ids, vehicle_owners, today, days):
+    origin_id, destination_id = rng.sample(place_ids, 2)
+    vehicle_id, user_id = rng.choice(vehicle_owners)
+    return Trip(
+        user_id=user_id,
+        vehicle_id=vehicle_id,
+        origin_id=origin_id,
+        destination_id=destination_id,
+        trip_date=today + timedelta(days=rng.randrange(days)),
+        num_seats=rng.randint(1, 4),
+    )
@@ -0,0 +1,30 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountTestMixin:
+    """
+    Test case mixin for asserting that an endpoint's query count does not
+    grow with the number of rows it returns.
+    """
+
+    def assertConstantQueryCount(self, seed, request, sizes=(1, 5, 20)):
+        """
+        Grows the data set with `seed(n)` to each of `sizes` and asserts
+        that `request()` runs the same number of queries every time.
+        """
+        counts = {}
+        seeded = 0
+        for size in sizes:
+            seed(size - seeded)
+            seeded = size
+            with CaptureQueriesContext(connection) as context:
+                request()
+            counts[size] = len(context.captured_queries)
+
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Query count grows with the result size: {counts}'
+        )
+        return counts[sizes[0]]
+
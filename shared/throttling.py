@@ -0,0 +1,188 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class CounterStore:
+    """
+    Counts the requests of throttled clients.
+
+    Unlike DRF's throttles, which keep a list of every request's timestamp
+    per client, a store keeps a constant amount of state per client, so a
+    request costs the same however high the rate is.
+    """
+
+    def hit(self, key, limit, duration):
+        """
+        Counts a request against `key`, allowing `limit` requests per
+        `duration` seconds. Returns whether the request is allowed and, if
+        not, the seconds until it would be.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalCounterStore(CounterStore):
+    """
+    Token buckets in process memory, refilling at `limit` per `duration`.
+
+    Only the requests handled by this process are counted, so with several
+    processes a client gets up to that many times the rate. The least
+    recently seen clients are forgotten beyond `max_keys`.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def hit(self, key, limit, duration):
+        now = time.monotonic()
+        refill_rate = limit / duration
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        if allowed:
+            return True, None
+        return False, (1 - tokens) / refill_rate
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheCounterStore(CounterStore):
+    """
+    Sliding window counters in the `THROTTLE_CACHE` cache, shared by every
+    process using that cache, e.g. memcached or redis. The cache should
+    hold nothing else, `clear` empties it.
+
+    A request is counted in the current fixed window, and the previous
+    window's count is weighted by how much of it the sliding window still
+    covers. A request costs the same three cache operations, a read, an
+    add and an increment, at any rate.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias or getattr(settings, 'THROTTLE_CACHE', 'throttle')
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def hit(self, key, limit, duration):
+        now = time.time()
+        window = int(now // duration)
+        elapsed = now % duration / duration
+        current_key = f'{key}:{window}'
+        previous = self.cache.get(f'{key}:{window - 1}', 0)
+        # windows expire once no later window can weigh them in
+        self.cache.add(current_key, 0, timeout=math.ceil(2 * duration))
+        count = self.cache.incr(current_key)
+        if previous * (1 - elapsed) + count <= limit:
+            return True, None
+        # rejected requests do not use up the rate
+        count = self.cache.decr(current_key)
+        if count < limit:
+            # until the previous window weighs little enough for one more
+            fraction = 1 - (limit - count - 1) / previous
+            return False, max(fraction - elapsed, 0) * duration
+        # not before the next window, in which this one weighs in
+        fraction = max(1 - (limit - 1) / count, 0)
+        return False, (1 - elapsed + fraction) * duration
+
+    def clear(self):
+        self.cache.clear()
+
+
+@lru_cache(maxsize=None)
+def get_counter_store():
+    """
+    The store configured with the `THROTTLE_COUNTER_STORE` setting.
+    """
+    return import_string(settings.THROTTLE_COUNTER_STORE)()
+
+
+class CounterThrottle(SimpleRateThrottle):
+    """
+    Throttles each user, or each IP address for anonymous requests, at the
+    `DEFAULT_THROTTLE_RATES` rate of the throttle's `scope`, counting in
+    `get_counter_store()`.
+
+    Rates are looked up on every request, so a scope without a rate is not
+    throttled.
+    """
+
+    def __init__(self):
+        # the rate depends on the scope, which may depend on the request
+        self.retry_after = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_store(self):
+        return get_counter_store()
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if self.scope is None:
+            return True
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        allowed, self.retry_after = self.get_store().hit(
+            self.get_cache_key(request, view),
+            self.num_requests,
+            self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class ScopedCounterThrottle(CounterThrottle):
+    """
+    Throttles requests in the scope set by the view's `throttle_scope`,
+    which `@action` can set per action, or else by the request: `writes`
+    for unsafe methods and `search` for lists.
+    """
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is not None:
+            return scope
+        if request.method not in SAFE_METHODS:
+            return 'writes'
+        if getattr(view, 'action', None) == 'list':
+            return 'search'
+        return None
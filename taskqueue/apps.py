@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TaskqueueConfig(AppConfig):
+    name = 'taskqueue'
+
+    def ready(self):
+        # registers the tasks declared in the `tasks` module of every app
+        autodiscover_modules('tasks')
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from taskqueue.registry import registry
+from taskqueue.worker import work
+
+
+def _worker_name(index):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def _run_worker(index, stop, options):
+    # the supervisor handles interrupts and stops workers through `stop`,
+    # so a task is never interrupted halfway
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        work(
+            _worker_name(index),
+            stop,
+            poll_interval=options['poll_interval'],
+            burst=options['burst']
+        )
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued background tasks in a pool of worker processes until '
+        'interrupted, or with --burst until no task is due.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Worker processes, TASK_WORKERS by default')
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Seconds between checks of an empty queue')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no task is due')
+
+    def handle(self, *args, **options):
+        processes = options['processes'] or settings.TASK_WORKERS
+        if options['poll_interval'] is None:
+            options['poll_interval'] = settings.TASK_POLL_INTERVAL
+        self.schedule_daily_tasks()
+
+        if processes == 1:
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *args: stop.set())
+            try:
+                processed = work(
+                    _worker_name(0),
+                    stop,
+                    poll_interval=options['poll_interval'],
+                    burst=options['burst']
+                )
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(f'Ran {processed} tasks')
+            return
+
+        # forked workers must not share the supervisor's connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        workers = [
+            context.Process(
+                target=_run_worker,
+                args=(index, stop, options),
+                name=f'taskqueue-worker-{index}'
+            )
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def request_stop(signum, frame):
+            self.stdout.write('Stopping workers after their current task...')
+            stop.set()
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(options['poll_interval'])
+            if not stop.is_set():
+                self.schedule_daily_tasks()
+        connections.close_all()
+
+    def schedule_daily_tasks(self):
+        # the keys make this a no-op after the first call of the day
+        today = timezone.now().date()
+        for name in settings.DAILY_TASKS:
+            registry[name].enqueue(idempotency_key=f'{name}:{today}')
@@ -0,0 +1,74 @@
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class Task(models.Model):
+    """
+    A call of a registered task, run by `manage.py run_workers`.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    ]
+
+    name = models.CharField(max_length=200, verbose_name=_('Task'))
+
+    # keyword arguments of the call, as JSON
+    arguments = models.TextField(default='{}')
+
+    priority = models.IntegerField(
+        default=0,
+        help_text=_('Tasks with a higher priority run first')
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+
+    idempotency_key = models.CharField(
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text=_('Enqueuing a task with the key of an existing one '
+                    'does nothing')
+    )
+
+    attempts = models.PositiveIntegerField(default=0)
+
+    max_attempts = models.PositiveIntegerField(default=3)
+
+    run_at = models.DateTimeField(
+        help_text=_('The task does not run before this time')
+    )
+
+    locked_by = models.CharField(max_length=100, blank=True)
+
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+    class Meta:
+        verbose_name = _('Task')
+        verbose_name_plural = _('Tasks')
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='task_status_run_at_idx'
+            ),
+        ]
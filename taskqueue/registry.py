@@ -0,0 +1,89 @@
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+registry = {}
+
+
+class TaskFunction:
+    """
+    A function registered with `@task`, which can be called directly or
+    queued with `enqueue()`.
+    """
+
+    def __init__(self, func, name, priority, max_attempts, retry_delay):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.__doc__ = func.__doc__
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, *, idempotency_key=None, priority=None, delay=None,
+                **kwargs):
+        """
+        Queues a call with `kwargs`, which must be serializable to JSON.
+
+        The task is inserted in the current transaction, so workers only
+        see it once that commits and never if it rolls back. When a task
+        with `idempotency_key` exists, that task is returned instead.
+        """
+        if idempotency_key is not None:
+            existing = Task.objects.filter(
+                idempotency_key=idempotency_key).first()
+            if existing is not None:
+                return existing
+
+        run_at = timezone.now()
+        if delay:
+            run_at += timedelta(seconds=delay)
+        task = Task(
+            name=self.name,
+            arguments=json.dumps(kwargs, sort_keys=True),
+            priority=self.priority if priority is None else priority,
+            idempotency_key=idempotency_key,
+            max_attempts=self.max_attempts,
+            run_at=run_at
+        )
+        try:
+            with transaction.atomic():
+                task.save()
+        except IntegrityError:
+            if idempotency_key is None:
+                raise
+            # queued concurrently with the same key
+            return Task.objects.get(idempotency_key=idempotency_key)
+        return task
+
+    def get_retry_delay(self, attempts):
+        """
+        Seconds before retrying after `attempts` failed attempts, doubling
+        with every attempt.
+        """
+        return self.retry_delay * 2 ** (attempts - 1)
+
+
+def task(name=None, priority=0, max_attempts=3, retry_delay=10):
+    """
+    Registers the decorated function as a task named `name`, by default
+    `<module>.<function>`.
+
+    A task that raises is retried up to `max_attempts` times in total,
+    `retry_delay` seconds after its first failure and twice as long after
+    every further one. Keyword arguments `idempotency_key`, `priority` and
+    `delay` are reserved by `enqueue()`.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registered = TaskFunction(
+            func, task_name, priority, max_attempts, retry_delay)
+        registry[task_name] = registered
+        return registered
+    return decorator
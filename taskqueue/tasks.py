@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task
+from .registry import task
+
+
+@task(name='taskqueue.purge_finished', priority=-10)
+def purge_finished(days=None):
+    """
+    Deletes the tasks that finished successfully more than
+    `TASK_RETENTION_DAYS` days ago. Failed tasks are kept for inspection.
+    """
+    if days is None:
+        days = settings.TASK_RETENTION_DAYS
+    Task.objects.filter(
+        status=Task.DONE,
+        finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
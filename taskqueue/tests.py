@@ -0,0 +1,129 @@
+from datetime import timedelta
+import json
+import threading
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from places.models import Place
+from .models import Task
+from .registry import task
+from .tasks import purge_finished
+from .worker import claim, execute, requeue_stale, work
+
+calls = []
+
+
+@task(name='taskqueue.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='taskqueue.tests.fail', max_attempts=2, retry_delay=60)
+def fail():
+    raise ValueError('Failed')
+
+
+@task(name='taskqueue.tests.create_place')
+def create_place(name):
+    Place.objects.create(name=name)
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.stop = threading.Event()
+
+    def test_enqueue_and_run(self):
+        queued = record.enqueue(value=1)
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(json.loads(queued.arguments), {'value': 1})
+
+        self.assertEqual(work('test', self.stop, burst=True), 1)
+        self.assertEqual(calls, [1])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.DONE)
+        self.assertEqual(queued.attempts, 1)
+
+    def test_idempotency_key(self):
+        first = record.enqueue(value=1, idempotency_key='once')
+        second = record.enqueue(value=2, idempotency_key='once')
+        self.assertEqual(first.pk, second.pk)
+        work('test', self.stop, burst=True)
+        self.assertEqual(calls, [1])
+
+    def test_priority(self):
+        record.enqueue(value='low', priority=-1)
+        record.enqueue(value='normal')
+        record.enqueue(value='high', priority=5)
+        work('test', self.stop, burst=True)
+        self.assertEqual(calls, ['high', 'normal', 'low'])
+
+    def test_delay(self):
+        record.enqueue(value=1, delay=60)
+        self.assertEqual(work('test', self.stop, burst=True), 0)
+
+    def test_claimed_once(self):
+        record.enqueue(value=1)
+        self.assertEqual(len(claim('first')), 1)
+        self.assertEqual(claim('second'), [])
+
+    def test_retry(self):
+        queued = fail.enqueue()
+        before = timezone.now()
+        work('test', self.stop, burst=True)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertIn('ValueError: Failed', queued.last_error)
+        self.assertGreaterEqual(
+            queued.run_at, before + timedelta(seconds=60))
+
+        Task.objects.update(run_at=timezone.now())
+        work('test', self.stop, burst=True)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    def test_unknown_task(self):
+        queued = Task.objects.create(name='missing', run_at=timezone.now())
+        work('test', self.stop, burst=True)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 1)
+
+    def test_requeue_stale(self):
+        record.enqueue(value=1)
+        [claimed] = claim('dead')
+        execute_later = Task.objects.filter(pk=claimed.pk)
+        execute_later.update(locked_at=timezone.now() - timedelta(hours=1))
+        requeue_stale(timeout=60)
+        self.assertEqual(execute_later.get().status, Task.QUEUED)
+
+        execute(claim('test')[0])
+        self.assertEqual(calls, [1])
+
+    def test_purge_finished(self):
+        old = record.enqueue(value=1)
+        recent = record.enqueue(value=2)
+        work('test', self.stop, burst=True)
+        Task.objects.filter(pk=old.pk).update(
+            finished_at=timezone.now() - timedelta(days=30))
+        purge_finished(days=7)
+        self.assertEqual(
+            list(Task.objects.values_list('pk', flat=True)), [recent.pk])
+
+
+class RunWorkersTest(TransactionTestCase):
+    def test_processes(self):
+        for index in range(20):
+            create_place.enqueue(name=f'Place {index}')
+        call_command('run_workers', processes=3, burst=True, poll_interval=0.1)
+
+        self.assertEqual(Place.objects.count(), 20)
+        self.assertEqual(
+            Task.objects.filter(
+                name='taskqueue.tests.create_place', status=Task.DONE
+            ).count(),
+            20
+        )
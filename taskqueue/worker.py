@@ -0,0 +1,126 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError
+from django.db.models import F
+from django.utils import timezone
+
+from shared.routers import pin_to_primary
+from .models import Task
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+def claim(worker, limit=10):
+    """
+    Marks up to `limit` due tasks as running on `worker` and returns them,
+    highest priority first.
+
+    Each task is taken with a conditional `UPDATE ... WHERE status =
+    'queued'`, so a task is never claimed by two workers.
+    """
+    now = timezone.now()
+    candidates = Task.objects \
+        .filter(status=Task.QUEUED, run_at__lte=now) \
+        .order_by('-priority', 'run_at', 'id') \
+        .values_list('id', flat=True)[:limit]
+    claimed = [
+        pk for pk in list(candidates)
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1
+        )
+    ]
+    return list(
+        Task.objects.filter(pk__in=claimed)
+        .order_by('-priority', 'run_at', 'id')
+    )
+
+
+def execute(task):
+    """
+    Runs a claimed task and records the outcome, queueing a retry when it
+    fails with attempts left.
+    """
+    now = timezone.now
+    task_function = registry.get(task.name)
+    try:
+        if task_function is None:
+            raise LookupError(f'No task is registered as {task.name}')
+        task_function(**json.loads(task.arguments))
+    except Exception:
+        logger.exception('Task %s #%s failed', task.name, task.pk)
+        task.last_error = traceback.format_exc()
+        if task_function is not None and task.attempts < task.max_attempts:
+            task.status = Task.QUEUED
+            task.run_at = now() + timedelta(
+                seconds=task_function.get_retry_delay(task.attempts))
+        else:
+            task.status = Task.FAILED
+            task.finished_at = now()
+    else:
+        task.status = Task.DONE
+        task.finished_at = now()
+    task.locked_by = ''
+    task.locked_at = None
+    task.save(update_fields=[
+        'status', 'run_at', 'last_error', 'finished_at', 'locked_by',
+        'locked_at',
+    ])
+    return task
+
+
+def requeue_stale(timeout=None):
+    """
+    Releases the tasks of workers that died while running them, after
+    `TASK_LOCK_TIMEOUT` seconds, failing those without attempts left.
+    """
+    if timeout is None:
+        timeout = settings.TASK_LOCK_TIMEOUT
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=now - timedelta(seconds=timeout)
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED,
+        finished_at=now,
+        locked_by='',
+        locked_at=None,
+        last_error='The worker running the task stopped'
+    )
+    stale.update(status=Task.QUEUED, locked_by='', locked_at=None)
+
+
+def work(worker, stop, poll_interval=None, burst=False, batch_size=10):
+    """
+    Runs tasks on `worker` until the `stop` event is set, or, with
+    `burst`, until no task is due. Returns the number of tasks run.
+    """
+    if poll_interval is None:
+        poll_interval = settings.TASK_POLL_INTERVAL
+    # reads go to the primary, a worker reads its own writes
+    pin_to_primary()
+    processed = 0
+    while not stop.is_set():
+        try:
+            requeue_stale()
+            tasks = claim(worker, batch_size)
+        except OperationalError:
+            logger.exception('Could not claim tasks')
+            tasks = []
+        if not tasks:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        for task in tasks:
+            execute(task)
+            processed += 1
+    return processed
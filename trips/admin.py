@@ -1,8 +1,50 @@
 from django.contrib import admin
 
-from .models import Trip
+from .models import (
+    ArchivedBooking,
+    ArchivedTrip,
+    Booking,
+    Trip,
+    TripSummary,
+)
 
 
 @admin.register(Trip)
 class TripAdmin(admin.ModelAdmin):
     list_display = ('trip_date', 'origin', 'destination', 'user',)
+
+    def get_queryset(self, request):
+        # past trips too, until they are archived
+        queryset = Trip.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ('trip', 'user', 'seats', 'created_at',)
+
+    def get_readonly_fields(self, request, obj=None):
+        # the trip may be past, which the trip choices and the model's
+        # validation, both on `Trip.objects`, would reject
+        if obj is not None:
+            return ('trip',)
+        return ()
+
+
+@admin.register(ArchivedTrip)
+class ArchivedTripAdmin(admin.ModelAdmin):
+    list_display = ('trip_date', 'origin', 'destination', 'user',)
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ('trip', 'user', 'seats', 'created_at',)
+
+
+@admin.register(TripSummary)
+class TripSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        'trip_date', 'origin_name', 'destination_name', 'driver_name',)
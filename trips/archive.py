@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from search.index import schedule
+from shared.caching import bump_version
+from .models import (
+    ArchivedBooking,
+    ArchivedTrip,
+    Booking,
+    Trip,
+    TripSummary,
+)
+
+
+def archive_cutoff(days=None):
+    """
+    Trips before this date are archived, `TRIP_ARCHIVE_AFTER_DAYS` days
+    after they took place.
+    """
+    if days is None:
+        days = settings.TRIP_ARCHIVE_AFTER_DAYS
+    return date.today() - timedelta(days=days)
+
+
+def archive_batch(trip_ids, using='default'):
+    """
+    Moves the trips in `trip_ids` and their bookings to the archive
+    tables in one transaction.
+
+    The rows are deleted without sending `pre_delete`/`post_delete`, which
+    would notify passengers and feed subscribers of a cancellation.
+    """
+    archived_at = timezone.now()
+    with transaction.atomic(using=using):
+        trips = list(
+            Trip.all_objects.using(using).filter(id__in=trip_ids)
+            .select_for_update()
+        )
+        bookings = list(
+            Booking.objects.using(using).filter(trip_id__in=trip_ids))
+        ArchivedTrip.objects.using(using).bulk_create([
+            ArchivedTrip(
+                id=trip.id,
+                user_id=trip.user_id,
+                origin_id=trip.origin_id,
+                destination_id=trip.destination_id,
+                vehicle_id=trip.vehicle_id,
+                trip_date=trip.trip_date,
+                num_seats=trip.num_seats,
+                archived_at=archived_at
+            )
+            for trip in trips
+        ])
+        ArchivedBooking.objects.using(using).bulk_create([
+            ArchivedBooking(
+                id=booking.id,
+                trip_id=booking.trip_id,
+                user_id=booking.user_id,
+                seats=booking.seats,
+                created_at=booking.created_at
+            )
+            for booking in bookings
+        ])
+        Booking.objects.using(using).filter(
+            trip_id__in=trip_ids)._raw_delete(using)
+        TripSummary.objects.using(using).filter(
+            id__in=trip_ids)._raw_delete(using)
+        Trip.all_objects.using(using).filter(
+            id__in=trip_ids)._raw_delete(using)
+        # drops the search documents of the archived trips
+        schedule('trips.trip', trip_ids, using)
+    return len(trips)
+
+
+def archive_trips(before=None, batch_size=500, using='default'):
+    """
+    Archives every trip dated before `before`, by default
+    `archive_cutoff()`, in batches of `batch_size` trips so that no
+    transaction locks the table for long. Returns the number of trips
+    archived.
+    """
+    if before is None:
+        before = archive_cutoff()
+    archived = 0
+    while True:
+        trip_ids = list(
+            Trip.all_objects.using(using)
+            .filter(trip_date__lt=before)
+            .order_by('trip_date', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not trip_ids:
+            break
+        archived += archive_batch(trip_ids, using)
+    if archived:
+        bump_version(Trip)
+    return archived
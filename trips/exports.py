@@ -0,0 +1,145 @@
+import csv
+import json
+from datetime import date, datetime
+
+from .models import Booking
+
+# (column, lookup) pairs of each export
+TRIP_COLUMNS = [
+    ('id', 'id'),
+    ('trip_date', 'trip_date'),
+    ('num_seats', 'num_seats'),
+    ('origin', 'origin__name'),
+    ('destination', 'destination__name'),
+    ('driver', 'user__username'),
+    ('vehicle_make', 'vehicle__make'),
+    ('vehicle_model', 'vehicle__model'),
+    ('vehicle_reg_number', 'vehicle__reg_number'),
+]
+
+BOOKING_COLUMNS = [
+    ('id', 'id'),
+    ('trip_id', 'trip_id'),
+    ('trip_date', 'trip__trip_date'),
+    ('origin', 'trip__origin__name'),
+    ('destination', 'trip__destination__name'),
+    ('passenger', 'user__username'),
+    ('seats', 'seats'),
+    ('created_at', 'created_at'),
+]
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+class Export:
+    """
+    A streamed export of `queryset` as CSV or NDJSON.
+
+    Rows are read as tuples with `values_list().iterator()`, so memory use
+    is bounded by `chunk_size` however many rows are exported.
+    """
+
+    def __init__(self, queryset, columns, ordering, output='csv',
+                 chunk_size=CHUNK_SIZE):
+        if output not in FORMATS:
+            raise ValueError(f'Unknown export format: {output}')
+        self.queryset = queryset
+        self.columns = columns
+        self.ordering = ordering
+        self.output = output
+        self.chunk_size = chunk_size
+
+    @property
+    def content_type(self):
+        return FORMATS[self.output]
+
+    @property
+    def header(self):
+        return [column for column, _ in self.columns]
+
+    def rows(self):
+        lookups = [lookup for _, lookup in self.columns]
+        return (
+            self.queryset
+            .order_by(*self.ordering)
+            .values_list(*lookups)
+            .iterator(chunk_size=self.chunk_size)
+        )
+
+    def lines(self):
+        if self.output == 'csv':
+            return self.csv_lines()
+        return self.ndjson_lines()
+
+    def csv_lines(self):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.header)
+        for row in self.rows():
+            yield writer.writerow([_format(value) for value in row])
+
+    def ndjson_lines(self):
+        header = self.header
+        for row in self.rows():
+            yield json.dumps(
+                dict(zip(header, [_format(value) for value in row])),
+                separators=(',', ':')
+            ) + '\n'
+
+    def __iter__(self):
+        """
+        Yields the export encoded in chunks of roughly `BUFFER_SIZE` bytes.
+        """
+        buffer, size = [], 0
+        for line in self.lines():
+            buffer.append(line)
+            size += len(line)
+            if size >= BUFFER_SIZE:
+                yield ''.join(buffer).encode()
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer).encode()
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _format(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def trip_export(trips, output='csv', chunk_size=CHUNK_SIZE):
+    return Export(
+        trips,
+        TRIP_COLUMNS,
+        ('trip_date', 'id'),
+        output=output,
+        chunk_size=chunk_size
+    )
+
+
+def booking_export(trips, output='csv', chunk_size=CHUNK_SIZE, user=None):
+    """
+    Exports the bookings on `trips`, only those made by or for `user` when
+    given.
+    """
+    bookings = Booking.objects.filter(trip__in=trips.values('id'))
+    if user is not None:
+        bookings = bookings.filter(trip__user=user) | \
+            bookings.filter(user=user)
+    return Export(
+        bookings,
+        BOOKING_COLUMNS,
+        ('id',),
+        output=output,
+        chunk_size=chunk_size
+    )
@@ -0,0 +1,41 @@
+from shared.pubsub import get_broker
+
+CREATED = 'created'
+UPDATED = 'updated'
+CANCELLED = 'cancelled'
+
+
+def route_channel(origin_id, destination_id):
+    return f'trips.route.{origin_id}.{destination_id}'
+
+
+def route_channels(origin_ids, destination_ids):
+    return [
+        route_channel(origin_id, destination_id)
+        for origin_id in origin_ids
+        for destination_id in destination_ids
+    ]
+
+
+def trip_payload(trip):
+    return {
+        'id': trip['id'],
+        'trip_date': str(trip['trip_date']),
+        'num_seats': trip['num_seats'],
+        'origin_id': trip['origin_id'],
+        'destination_id': trip['destination_id'],
+        'vehicle_id': trip['vehicle_id'],
+        'driver_id': trip['user_id'],
+    }
+
+
+def publish_trip(event, trip):
+    """
+    Announces `event` on `trip`, given as a dict of its column values, to
+    the subscribers of its route.
+    """
+    payload = trip_payload(trip)
+    get_broker().publish(
+        route_channel(payload['origin_id'], payload['destination_id']),
+        {'event': event, 'trip': payload}
+    )
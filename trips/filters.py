@@ -1,23 +1,72 @@
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
 
+from places.cache import place_cache
+from places.geo import parse_point
+from places.models import Place
 from .models import Trip
 
 
 class TripFilter(filters.FilterSet):
     """
     FilterSet for `Trip` model.
+
+    Place names are resolved to ids through `place_cache`, so the trip
+    query filters on `origin_id`/`destination_id` and can use the
+    `(origin, destination, trip_date)` index instead of joining `Place`.
+
+    `near=lat,lng` matches trips starting within `radius` kilometres of
+    the point, found through the spatial index of `place_cache`, or with a
+    subquery when there are too many places to list.
     """
+    default_radius = 10
+    max_radius = 200
+    # SQLite allows at most 999 parameters per statement before 3.32
+    max_place_ids = 500
+
     num_seats = filters.NumberFilter(
         field_name='num_seats',
         lookup_expr='gte')
 
     origin = filters.CharFilter(
-        field_name='origin__name',
-        lookup_expr='iexact')
+        field_name='origin',
+        method='filter_place')
 
     destination = filters.CharFilter(
-        field_name='destination__name',
-        lookup_expr='iexact')
+        field_name='destination',
+        method='filter_place')
+
+    near = filters.CharFilter(method='filter_near')
+
+    radius = filters.NumberFilter(method='filter_radius')
+
+    def filter_place(self, queryset, name, value):
+        place_ids = place_cache.resolve(value)
+        return queryset.filter(**{f'{name}_id__in': place_ids})
+
+    def filter_near(self, queryset, name, value):
+        try:
+            lat, lng = parse_point(value)
+        except ValueError:
+            raise ValidationError(
+                {'near': ['Expected latitude and longitude as "lat,lng".']})
+        radius = self.form.cleaned_data.get('radius')
+        if radius is None:
+            radius = self.default_radius
+        if not 0 < radius <= self.max_radius:
+            raise ValidationError({'radius': [
+                f'Expected a radius between 0 and {self.max_radius} km.']})
+        places = place_cache.near(lat, lng, float(radius))
+        if len(places) > self.max_place_ids:
+            place_ids = Place.objects.within(lat, lng, float(radius)) \
+                .values('id')
+        else:
+            place_ids = [place.id for _, place in places]
+        return queryset.filter(origin_id__in=place_ids)
+
+    def filter_radius(self, queryset, name, value):
+        # applied by `filter_near`
+        return queryset
 
     class Meta:
         model = Trip
@@ -26,4 +75,6 @@ class TripFilter(filters.FilterSet):
             'num_seats',
             'origin',
             'destination',
+            'near',
+            'radius',
         ]
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from trips.archive import archive_cutoff, archive_trips
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves trips older than TRIP_ARCHIVE_AFTER_DAYS days, and their '
+        'bookings, to the archive tables. Run daily by run_workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Archive trips older than this many days')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        before = archive_cutoff(options['days'])
+        archived = archive_trips(before, options['batch_size'])
+        self.stdout.write(f'Archived {archived} trips dated before {before}')
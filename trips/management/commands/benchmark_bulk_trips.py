@@ -0,0 +1,77 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from places.models import Place
+from shared.benchmark import api_client, scratch_database
+from shared.synthetic import seed
+from trips.models import Trip
+from vehicles.models import Vehicle
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares creating trips with one POST per trip against a single '
+        'bulk POST, in a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=40)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seed(users=1, places=2, vehicles=1, trips=0)
+            self.run(options)
+
+    def run(self, options):
+        user = get_user_model().objects.get()
+        origin, destination = Place.objects.all()
+        trip = {
+            'origin_id': origin.id,
+            'destination_id': destination.id,
+            'vehicle_id': Vehicle.objects.get().id,
+            'num_seats': 3,
+        }
+        dates = [
+            str(date.today() + timedelta(days=days))
+            for days in range(options['trips'])
+        ]
+        client = api_client(user)
+
+        def single_posts():
+            for trip_date in dates:
+                response = client.post(
+                    '/api/v1/trips/',
+                    {**trip, 'trip_date': trip_date},
+                    format='json'
+                )
+                assert response.status_code == 201, response.content
+
+        def bulk_post():
+            response = client.post(
+                '/api/v1/trips/bulk/',
+                {**trip, 'dates': dates},
+                format='json'
+            )
+            assert response.status_code == 201, response.content
+
+        results = {}
+        for label, create in [
+                (f'{len(dates)} single POSTs', single_posts),
+                ('1 bulk POST', bulk_post)]:
+            timings = []
+            for _ in range(options['repeat']):
+                Trip.objects.all().delete()
+                start = time.perf_counter()
+                create()
+                timings.append(time.perf_counter() - start)
+            results[label] = min(timings)
+            self.stdout.write(
+                f'{label:<20} {results[label] * 1000:10.1f} ms   '
+                f'{len(dates) / results[label]:10.0f} trips/s')
+
+        single, bulk = results.values()
+        self.stdout.write(f'bulk is {single / bulk:.1f}x faster')
@@ -0,0 +1,84 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from places.models import Place
+from shared.benchmark import format_timing, measure, scratch_database
+from shared.synthetic import seed
+from trips.filters import TripFilter
+from trips.models import Trip
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks trip search by origin, destination and date on a '
+        'synthetic data set in a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=1000000)
+        parser.add_argument('--places', type=int, default=500)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(
+                f'Seeding {options["trips"]} trips over '
+                f'{options["places"]} places...')
+            seed(
+                users=options['users'],
+                places=options['places'],
+                trips=options['trips'],
+                days=options['days'],
+            )
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(1)
+        names = list(Place.objects.values_list('name', flat=True))
+        searches = [
+            (
+                *rng.sample(names, 2),
+                date.today() + timedelta(days=rng.randrange(options['days'])),
+            )
+            for _ in range(options['repeat'])
+        ]
+
+        def join_search(origin, destination, trip_date):
+            # the previous TripFilter: case-insensitive match through a join
+            return Trip.objects.filter(
+                origin__name__iexact=origin.upper(),
+                destination__name__iexact=destination.upper(),
+                trip_date=trip_date,
+                num_seats__gte=1,
+            )
+
+        def filter_search(origin, destination, trip_date):
+            return TripFilter({
+                'origin': origin.upper(),
+                'destination': destination.upper(),
+                'trip_date': str(trip_date),
+                'num_seats': 1,
+            }, queryset=Trip.objects.all()).qs
+
+        for label, search in [
+                ('iexact join on place name', join_search),
+                ('TripFilter (ids + route index)', filter_search)]:
+            queries = iter(searches * 2)
+            timing = measure(
+                lambda: list(search(*next(queries)).values_list('id')),
+                repeat=options['repeat'],
+            )
+            self.stdout.write(format_timing(label, timing))
+            self.explain(search(*searches[0]))
+
+    def explain(self, queryset):
+        sql, params = queryset.values_list('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            for row in cursor.fetchall():
+                self.stdout.write(f'    {row[-1]}')
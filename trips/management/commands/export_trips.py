@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trips.exports import CHUNK_SIZE, FORMATS, booking_export, trip_export
+from trips.filters import TripFilter
+from trips.models import Trip
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams trips, or the bookings on them, as CSV or NDJSON. Accepts '
+        'the same filters as /api/v1/trips/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', choices=sorted(FORMATS), default='csv')
+        parser.add_argument(
+            '--bookings', action='store_true',
+            help='Export the bookings on the matching trips')
+        parser.add_argument(
+            '--file', help='Write to this file instead of stdout')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--origin')
+        parser.add_argument('--destination')
+        parser.add_argument('--trip-date')
+        parser.add_argument('--num-seats')
+
+    def handle(self, *args, **options):
+        filterset = TripFilter({
+            name: options[name]
+            for name in ['origin', 'destination', 'trip_date', 'num_seats']
+            if options[name] is not None
+        }, queryset=Trip.all_objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        make_export = booking_export if options['bookings'] else trip_export
+        export = make_export(
+            filterset.qs,
+            options['output'],
+            chunk_size=options['chunk_size']
+        )
+
+        if options['file']:
+            with open(options['file'], 'wb') as out:
+                for chunk in export:
+                    out.write(chunk)
+        else:
+            for chunk in export:
+                self.stdout.write(chunk.decode(), ending='')
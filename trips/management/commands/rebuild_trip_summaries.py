@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from shared.caching import bump_version
+from trips.models import Trip
+from trips.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        'Recreates the summary of every trip, e.g. after trips, places, '
+        'vehicles or users were changed without sending signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_summaries(
+            using=options['database'],
+            batch_size=options['batch_size']
+        )
+        # cached trip lists may hold the old summaries
+        bump_version(Trip)
+        self.stdout.write(f'Rebuilt {count} trip summaries')
@@ -0,0 +1,190 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+from django.conf import settings
+
+from .models import Trip
+
+TripEdge = namedtuple(
+    'TripEdge', 'id origin_id destination_id trip_date num_seats')
+
+
+class RouteGraph:
+    """
+    In-memory graph of upcoming trips, with places as nodes and trips as
+    edges.
+
+    The outgoing trips of each place are kept sorted by date, so the
+    connections leaving a transfer place within the allowed layover are
+    found with a binary search.
+    """
+    fields = ('id', 'origin_id', 'destination_id', 'trip_date', 'num_seats')
+
+    def __init__(self, rows=()):
+        self.edges = {}
+        self.outgoing = defaultdict(list)
+        for row in rows:
+            self.add(TripEdge(*row))
+
+    def __len__(self):
+        return len(self.edges)
+
+    def add(self, edge):
+        self.remove(edge.id)
+        self.edges[edge.id] = edge
+        insort(self.outgoing[edge.origin_id], (edge.trip_date, edge.id))
+
+    def remove(self, trip_id):
+        edge = self.edges.pop(trip_id, None)
+        if edge is None:
+            return
+        keys = self.outgoing[edge.origin_id]
+        index = bisect_left(keys, (edge.trip_date, edge.id))
+        del keys[index]
+        if not keys:
+            del self.outgoing[edge.origin_id]
+
+    def set_seats(self, trip_id, num_seats):
+        edge = self.edges.get(trip_id)
+        if edge is not None:
+            self.edges[trip_id] = edge._replace(num_seats=num_seats)
+
+    def departures(self, place_id, first_date, last_date=None, seats=1):
+        """
+        Yields the trips leaving `place_id` between `first_date` and
+        `last_date`, inclusive, with at least `seats` free seats.
+        """
+        keys = self.outgoing.get(place_id, [])
+        start = bisect_left(keys, (first_date,))
+        end = len(keys) if last_date is None else \
+            bisect_right(keys, (last_date, float('inf')))
+        for _, trip_id in keys[start:end]:
+            edge = self.edges[trip_id]
+            if edge.num_seats >= seats:
+                yield edge
+
+    def itineraries(self, origin_ids, destination_ids, first_date, seats=1,
+                    max_layover=1):
+        """
+        Returns the direct trips and two-trip connections from any of
+        `origin_ids` to any of `destination_ids`, leaving on or after
+        `first_date` with at least `seats` free seats.
+
+        A connection's second trip leaves from where the first one
+        arrives, on the same day or up to `max_layover` days later.
+        Itineraries are tuples of `TripEdge`s ranked by arrival date,
+        then by number of trips, then by layover.
+        """
+        origin_ids, destination_ids = set(origin_ids), set(destination_ids)
+        found = []
+        for origin_id in origin_ids:
+            for first in self.departures(origin_id, first_date, seats=seats):
+                if first.destination_id in destination_ids:
+                    found.append((first,))
+                    continue
+                if first.destination_id in origin_ids:
+                    continue
+                connections = self.departures(
+                    first.destination_id,
+                    first.trip_date,
+                    first.trip_date + timedelta(days=max_layover),
+                    seats
+                )
+                for second in connections:
+                    if second.destination_id in destination_ids:
+                        found.append((first, second))
+        found.sort(key=_rank)
+        return found
+
+
+def _rank(itinerary):
+    first, last = itinerary[0], itinerary[-1]
+    return (
+        last.trip_date,
+        len(itinerary),
+        (last.trip_date - first.trip_date).days,
+        [edge.id for edge in itinerary],
+    )
+
+
+class RouteGraphCache:
+    """
+    Process-wide, lazily loaded `RouteGraph` of trips from today on.
+
+    Trips are added, removed and updated in place as they are written in
+    this process, see `trips.receivers`. `ROUTE_GRAPH_TTL` bounds how
+    long changes made by other processes can go unnoticed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._graph = None
+        self._loaded_at = 0
+        self._loaded_on = None
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ROUTE_GRAPH_TTL', 60)
+
+    def _is_stale(self):
+        # past trips are only dropped by reloading, once a day at least
+        return self._graph is None or \
+            time.monotonic() - self._loaded_at >= self.ttl or \
+            self._loaded_on != date.today()
+
+    def _get_graph(self):
+        if self._is_stale():
+            rows = Trip.objects.filter(
+                trip_date__gte=date.today()
+            ).values_list(*RouteGraph.fields)
+            self._graph = RouteGraph(rows)
+            self._loaded_at = time.monotonic()
+            self._loaded_on = date.today()
+        return self._graph
+
+    def invalidate(self):
+        with self._lock:
+            self._graph = None
+
+    def search(self, origin_ids, destination_ids, first_date, seats=1,
+               max_layover=1):
+        with self._lock:
+            return self._get_graph().itineraries(
+                origin_ids,
+                destination_ids,
+                max(first_date, date.today()),
+                seats,
+                max_layover
+            )
+
+    def add_trip(self, trip):
+        with self._lock:
+            if self._graph is None:
+                return
+            if trip.trip_date < self._loaded_on:
+                self._graph.remove(trip.id)
+            else:
+                self._graph.add(TripEdge(
+                    *[getattr(trip, field) for field in RouteGraph.fields]))
+
+    def remove_trip(self, trip_id):
+        with self._lock:
+            if self._graph is not None:
+                self._graph.remove(trip_id)
+
+    def refresh_seats(self, trip_id):
+        with self._lock:
+            if self._graph is None or trip_id not in self._graph.edges:
+                return
+            num_seats = Trip.objects.filter(pk=trip_id).values_list(
+                'num_seats', flat=True).first()
+            if num_seats is None:
+                self._graph.remove(trip_id)
+            else:
+                self._graph.set_seats(trip_id, num_seats)
+
+
+route_graph = RouteGraphCache()
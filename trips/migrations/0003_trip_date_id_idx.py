@@ -0,0 +1,21 @@
+# Generated by Django 2.2.8 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0002_trip_num_seats'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='trip',
+            options={'ordering': ['trip_date'], 'verbose_name': 'Trip', 'verbose_name_plural': 'Trips'},
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['trip_date', 'id'], name='trip_date_id_idx'),
+        ),
+    ]
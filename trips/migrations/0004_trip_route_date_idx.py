@@ -0,0 +1,17 @@
+# Generated by Django 2.2.8 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0003_trip_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['origin', 'destination', 'trip_date'], name='trip_route_date_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.8 on 2026-10-18 10:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trips', '0004_trip_route_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveIntegerField(default=1, help_text='Number of seats booked', verbose_name='Number of seats')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Booked at')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='trips.Trip', verbose_name='Trip')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to=settings.AUTH_USER_MODEL, verbose_name='Passenger')),
+            ],
+            options={
+                'verbose_name': 'Booking',
+                'verbose_name_plural': 'Bookings',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
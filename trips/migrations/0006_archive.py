@@ -0,0 +1,55 @@
+# Generated by Django 2.2.8 on 2026-10-18 10:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vehicles', '0001_initial'),
+        ('places', '0003_place_coordinates'),
+        ('trips', '0005_booking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTrip',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('trip_date', models.DateField(verbose_name='Trip date')),
+                ('num_seats', models.IntegerField(verbose_name='Number of seats')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived at')),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_trip_destinations', to='places.Place', verbose_name='To')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_trip_origins', to='places.Place', verbose_name='From')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_trips', to=settings.AUTH_USER_MODEL, verbose_name='Driver')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_trip_vehicles', to='vehicles.Vehicle', verbose_name='Vehicle')),
+            ],
+            options={
+                'verbose_name': 'Archived trip',
+                'verbose_name_plural': 'Archived trips',
+                'ordering': ['trip_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('seats', models.PositiveIntegerField(verbose_name='Number of seats')),
+                ('created_at', models.DateTimeField(verbose_name='Booked at')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='trips.ArchivedTrip', verbose_name='Trip')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL, verbose_name='Passenger')),
+            ],
+            options={
+                'verbose_name': 'Archived booking',
+                'verbose_name_plural': 'Archived bookings',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedtrip',
+            index=models.Index(fields=['trip_date', 'id'], name='archived_trip_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.8 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+def populate_summaries(apps, schema_editor):
+    Trip = apps.get_model('trips', 'Trip')
+    TripSummary = apps.get_model('trips', 'TripSummary')
+    using = schema_editor.connection.alias
+    trips = Trip._base_manager.using(using) \
+        .select_related('origin', 'destination', 'vehicle', 'user') \
+        .order_by('id')
+    batch = []
+    for trip in trips.iterator(chunk_size=1000):
+        user = trip.user
+        batch.append(TripSummary(
+            id=trip.id,
+            trip_date=trip.trip_date,
+            num_seats=trip.num_seats,
+            origin_id=trip.origin_id,
+            origin_name=trip.origin.name,
+            destination_id=trip.destination_id,
+            destination_name=trip.destination.name,
+            vehicle_id=trip.vehicle_id,
+            vehicle_name=f'{trip.vehicle.make} {trip.vehicle.model}',
+            user_id=trip.user_id,
+            driver_name=(
+                f'{user.first_name} {user.last_name}'.strip()
+                or user.username
+            )
+        ))
+        if len(batch) == 1000:
+            TripSummary.objects.using(using).bulk_create(batch)
+            batch = []
+    TripSummary.objects.using(using).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0006_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripSummary',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('trip_date', models.DateField(verbose_name='Trip date')),
+                ('num_seats', models.IntegerField(verbose_name='Number of seats')),
+                ('origin_id', models.IntegerField(verbose_name='From')),
+                ('origin_name', models.CharField(max_length=100, verbose_name='From')),
+                ('destination_id', models.IntegerField(verbose_name='To')),
+                ('destination_name', models.CharField(max_length=100, verbose_name='To')),
+                ('vehicle_id', models.IntegerField(db_index=True, verbose_name='Vehicle')),
+                ('vehicle_name', models.CharField(max_length=61, verbose_name='Vehicle')),
+                ('user_id', models.IntegerField(db_index=True, verbose_name='Driver')),
+                ('driver_name', models.CharField(max_length=300, verbose_name='Driver')),
+            ],
+            options={
+                'verbose_name': 'Trip summary',
+                'verbose_name_plural': 'Trip summaries',
+                'ordering': ['trip_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tripsummary',
+            index=models.Index(fields=['origin_id', 'destination_id', 'trip_date'], name='summary_route_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tripsummary',
+            index=models.Index(fields=['trip_date', 'id'], name='summary_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tripsummary',
+            index=models.Index(fields=['destination_id'], name='summary_destination_idx'),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,64 @@
 from datetime import date
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import F, Max
+from django.db.models.signals import post_save
 from django.utils.translation import ugettext_lazy as _
 
 from places.models import Place
 from vehicles.models import Vehicle
+from .signals import seats_changed
+from .summaries import save_summaries
+
+
+class TripManager(models.Manager):
+    def create_many(self, trips):
+        """
+        Inserts `trips` with a single `bulk_create` in one transaction.
+
+        Unlike `bulk_create`, primary keys are set on every trip and
+        `post_save` is sent for each, so receivers keeping caches and
+        indexes in sync see the new rows. Their summaries are inserted at
+        once as well, and `post_save` is sent with `bulk=True` so that the
+        receiver writing single summaries skips them. Model `save()`
+        validation is not run, callers validate beforehand.
+        """
+        using = self.db
+        with transaction.atomic(using=using):
+            if connections[using].features.can_return_ids_from_bulk_insert:
+                self.bulk_create(trips)
+            else:
+                last_id = self.aggregate(last_id=Max('id'))['last_id'] or 0
+                self.bulk_create(trips)
+                ids = self.filter(
+                    id__gt=last_id,
+                    user_id__in={trip.user_id for trip in trips}
+                ).order_by('id').values_list('id', flat=True)
+                for trip, pk in zip(trips, ids):
+                    trip.pk = pk
+            save_summaries(trips, using)
+            for trip in trips:
+                post_save.send(
+                    sender=Trip,
+                    instance=trip,
+                    created=True,
+                    update_fields=None,
+                    raw=False,
+                    using=using,
+                    bulk=True
+                )
+        return trips
+
+
+class UpcomingTripManager(TripManager):
+    """
+    Trips from today on. Past trips stay in the table until they are
+    archived and are only reachable through `Trip.all_objects`.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(trip_date__gte=date.today())
 
 
 class Trip(models.Model):
@@ -57,6 +110,9 @@ class Trip(models.Model):
         help_text=_('Number of seats available')
     )
 
+    objects = UpcomingTripManager()
+    all_objects = TripManager()
+
     def save(self, *args, **kwargs):
         if self.origin == self.destination:
             raise ValidationError(
@@ -75,3 +131,235 @@ class Trip(models.Model):
         verbose_name = _('Trip')
         verbose_name_plural = _('Trips')
         ordering = ['trip_date']
+        indexes = [
+            models.Index(
+                fields=['origin', 'destination', 'trip_date'],
+                name='trip_route_date_idx'
+            ),
+            models.Index(
+                fields=['trip_date', 'id'],
+                name='trip_date_id_idx'
+            ),
+        ]
+
+
+class BookingManager(models.Manager):
+    def book(self, trip, user, seats=1):
+        """
+        Reserves `seats` on `trip` for `user`.
+
+        Availability is decremented with a single conditional
+        `UPDATE ... SET num_seats = num_seats - n WHERE num_seats >= n`,
+        so concurrent bookings can never take the count below zero.
+        """
+        if trip.user_id == user.id:
+            raise ValidationError(
+                'Drivers cannot book their own trip',
+                code='own_trip'
+            )
+        with transaction.atomic(using=self.db):
+            updated = Trip.objects.using(self.db).filter(
+                pk=trip.pk,
+                num_seats__gte=seats
+            ).update(num_seats=F('num_seats') - seats)
+            if not updated:
+                raise ValidationError(
+                    'Not enough seats available',
+                    code='no_seats'
+                )
+            # relative to the summary's own count, in this transaction, so
+            # concurrent bookings cannot write back a stale one
+            TripSummary.objects.using(self.db).filter(id=trip.pk) \
+                .update(num_seats=F('num_seats') - seats)
+            booking = self.create(trip=trip, user=user, seats=seats)
+        seats_changed.send(sender=Trip, trip_id=trip.pk, using=self.db)
+        return booking
+
+
+class Booking(models.Model):
+    trip = models.ForeignKey(
+        Trip,
+        on_delete=models.CASCADE,
+        related_name='bookings',
+        verbose_name=_('Trip')
+    )
+
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='bookings',
+        verbose_name=_('Passenger')
+    )
+
+    seats = models.PositiveIntegerField(
+        default=1,
+        verbose_name=_('Number of seats'),
+        help_text=_('Number of seats booked')
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Booked at')
+    )
+
+    objects = BookingManager()
+
+    def __str__(self):
+        return f'{self.seats} seat(s) on {self.trip} for {self.user}'
+
+    class Meta:
+        verbose_name = _('Booking')
+        verbose_name_plural = _('Bookings')
+        ordering = ['created_at']
+
+
+class ArchivedTrip(models.Model):
+    """
+    A past trip moved out of `Trip` by `trips.archive.archive_trips`,
+    keeping its id.
+    """
+    id = models.IntegerField(primary_key=True)
+
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='archived_trips',
+        verbose_name=_('Driver'),
+    )
+
+    origin = models.ForeignKey(
+        Place,
+        on_delete=models.CASCADE,
+        related_name='archived_trip_origins',
+        verbose_name=_('From')
+    )
+
+    destination = models.ForeignKey(
+        Place,
+        on_delete=models.CASCADE,
+        related_name='archived_trip_destinations',
+        verbose_name=_('To')
+    )
+
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='archived_trip_vehicles',
+        verbose_name=_('Vehicle')
+    )
+
+    trip_date = models.DateField(verbose_name=_('Trip date'))
+
+    num_seats = models.IntegerField(verbose_name=_('Number of seats'))
+
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Archived at')
+    )
+
+    def __str__(self):
+        return f'{self.origin} to {self.destination} by {self.user}'
+
+    class Meta:
+        verbose_name = _('Archived trip')
+        verbose_name_plural = _('Archived trips')
+        ordering = ['trip_date']
+        indexes = [
+            models.Index(
+                fields=['trip_date', 'id'],
+                name='archived_trip_date_id_idx'
+            ),
+        ]
+
+
+class ArchivedBooking(models.Model):
+    """
+    A booking on an archived trip, keeping its id.
+    """
+    id = models.IntegerField(primary_key=True)
+
+    trip = models.ForeignKey(
+        ArchivedTrip,
+        on_delete=models.CASCADE,
+        related_name='bookings',
+        verbose_name=_('Trip')
+    )
+
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='archived_bookings',
+        verbose_name=_('Passenger')
+    )
+
+    seats = models.PositiveIntegerField(verbose_name=_('Number of seats'))
+
+    created_at = models.DateTimeField(verbose_name=_('Booked at'))
+
+    class Meta:
+        verbose_name = _('Archived booking')
+        verbose_name_plural = _('Archived bookings')
+        ordering = ['created_at']
+
+
+class TripSummary(models.Model):
+    """
+    A trip with the names of its places, vehicle and driver copied in,
+    keeping its id, so trip lists are read from this table alone.
+
+    Rows are written in the same transaction as the trips, places,
+    vehicles and users they copy, see `trips.summaries`.
+    """
+    id = models.IntegerField(primary_key=True)
+
+    trip_date = models.DateField(verbose_name=_('Trip date'))
+
+    num_seats = models.IntegerField(verbose_name=_('Number of seats'))
+
+    origin_id = models.IntegerField(verbose_name=_('From'))
+
+    origin_name = models.CharField(max_length=100, verbose_name=_('From'))
+
+    destination_id = models.IntegerField(verbose_name=_('To'))
+
+    destination_name = models.CharField(
+        max_length=100,
+        verbose_name=_('To')
+    )
+
+    vehicle_id = models.IntegerField(
+        db_index=True,
+        verbose_name=_('Vehicle')
+    )
+
+    vehicle_name = models.CharField(
+        max_length=61,
+        verbose_name=_('Vehicle')
+    )
+
+    user_id = models.IntegerField(db_index=True, verbose_name=_('Driver'))
+
+    driver_name = models.CharField(max_length=300, verbose_name=_('Driver'))
+
+    def __str__(self):
+        return f'{self.origin_name} to {self.destination_name} by ' \
+            f'{self.driver_name}'
+
+    class Meta:
+        verbose_name = _('Trip summary')
+        verbose_name_plural = _('Trip summaries')
+        ordering = ['trip_date']
+        indexes = [
+            models.Index(
+                fields=['origin_id', 'destination_id', 'trip_date'],
+                name='summary_route_date_idx'
+            ),
+            models.Index(
+                fields=['trip_date', 'id'],
+                name='summary_date_id_idx'
+            ),
+            models.Index(
+                fields=['destination_id'],
+                name='summary_destination_idx'
+            ),
+        ]
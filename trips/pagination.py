@@ -0,0 +1,19 @@
+from shared.pagination import KeysetPagination
+
+
+class TripCursorPagination(KeysetPagination):
+    """
+    Pages trips in `(trip_date, id)` order, backed by the
+    `trip_date_id_idx` index on `Trip`.
+    """
+    ordering = ('trip_date', 'id')
+    page_size = 25
+
+
+class TripHistoryPagination(TripCursorPagination):
+    """
+    Pages archived trips, always, as the archive only grows.
+    """
+
+    def is_requested(self, request):
+        return True
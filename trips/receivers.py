@@ -0,0 +1,201 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from places.models import Place
+from vehicles.models import Vehicle
+from .feed import CANCELLED, CREATED, UPDATED, publish_trip
+from .matching import route_graph
+from .models import Booking, Trip, TripSummary
+from .signals import seats_changed
+from .summaries import (
+    DRIVER_FIELDS,
+    VEHICLE_FIELDS,
+    driver_name,
+    save_summary,
+    vehicle_name,
+)
+from .tasks import notify_passenger
+
+# changes to these fields are emailed to the trip's passengers
+NOTIFIED_FIELDS = {'trip_date', 'origin', 'destination', 'vehicle'}
+
+
+def _apply_now_and_on_commit(update):
+    # apply now so this transaction sees its own change, and again on
+    # commit in case another request reloaded the graph in the meantime;
+    # trips of a rolled back transaction are skipped by the route search
+    update()
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=Trip)
+def add_trip_to_route_graph(sender, instance, **kwargs):
+    _apply_now_and_on_commit(lambda: route_graph.add_trip(instance))
+
+
+@receiver(post_delete, sender=Trip)
+def remove_trip_from_route_graph(sender, instance, **kwargs):
+    trip_id = instance.id
+    _apply_now_and_on_commit(lambda: route_graph.remove_trip(trip_id))
+
+
+@receiver(seats_changed, sender=Trip)
+def refresh_route_graph_seats(sender, trip_id, **kwargs):
+    _apply_now_and_on_commit(lambda: route_graph.refresh_seats(trip_id))
+
+
+def _trip_row(trip):
+    # column values as they are now, `instance` may change before commit
+    return {
+        field.attname: getattr(trip, field.attname)
+        for field in Trip._meta.concrete_fields
+    }
+
+
+@receiver(post_save, sender=Trip)
+def publish_saved_trip(sender, instance, created, **kwargs):
+    row = _trip_row(instance)
+    # the route before the save, see `remember_notified_values`
+    before = getattr(instance, '_notified_before', None)
+    if created or before is None or \
+            (before['origin'], before['destination']) == \
+            (row['origin_id'], row['destination_id']):
+        event = CREATED if created else UPDATED
+        transaction.on_commit(lambda: publish_trip(event, row))
+        return
+
+    # the trip leaves the feeds of its old route for those of its new one
+    old_row = dict(
+        row, origin_id=before['origin'], destination_id=before['destination'])
+
+    def publish():
+        publish_trip(CANCELLED, old_row)
+        publish_trip(CREATED, row)
+    transaction.on_commit(publish)
+
+
+@receiver(post_delete, sender=Trip)
+def publish_cancelled_trip(sender, instance, **kwargs):
+    row = _trip_row(instance)
+    transaction.on_commit(lambda: publish_trip(CANCELLED, row))
+
+
+@receiver(seats_changed, sender=Trip)
+def publish_seats(sender, trip_id, **kwargs):
+    def publish():
+        row = Trip.objects.filter(pk=trip_id).values().first()
+        if row is not None:
+            publish_trip(UPDATED, row)
+    transaction.on_commit(publish)
+
+
+def _passenger_emails(trip_id):
+    return set(
+        Booking.objects
+        .filter(trip_id=trip_id)
+        .exclude(user__email='')
+        .values_list('user__email', flat=True)
+    )
+
+
+def _notified_values(trip):
+    return {
+        field: getattr(trip, Trip._meta.get_field(field).attname)
+        for field in NOTIFIED_FIELDS
+    }
+
+
+@receiver(pre_save, sender=Trip)
+def remember_notified_values(sender, instance, raw, using, update_fields,
+                             **kwargs):
+    # the values before the save, to tell whether passengers need an email
+    # and whether the trip moved to another route feed
+    instance._notified_before = None
+    if raw or instance.pk is None or update_fields is not None and \
+            not NOTIFIED_FIELDS.intersection(update_fields):
+        return
+    previous = Trip.all_objects.using(using).filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._notified_before = _notified_values(previous)
+
+
+@receiver(post_save, sender=Trip)
+def notify_updated_trip(sender, instance, created, **kwargs):
+    before = getattr(instance, '_notified_before', None)
+    if created or before is None or before == _notified_values(instance):
+        return
+    for email in _passenger_emails(instance.pk):
+        notify_passenger.enqueue(
+            email=email,
+            subject='Your trip was updated',
+            message=f'Your trip is now from {instance.origin} to '
+                    f'{instance.destination} on {instance.trip_date}.'
+        )
+
+
+@receiver(pre_delete, sender=Trip)
+def notify_cancelled_trip(sender, instance, **kwargs):
+    # before the bookings are deleted along with the trip
+    for email in _passenger_emails(instance.pk):
+        notify_passenger.enqueue(
+            email=email,
+            subject='Your trip was cancelled',
+            message=f'Your trip from {instance.origin} to '
+                    f'{instance.destination} on {instance.trip_date} was '
+                    f'cancelled.',
+            idempotency_key=f'trips.cancelled:{instance.pk}:{email}'
+        )
+
+
+@receiver(post_save, sender=Trip)
+def save_trip_summary(sender, instance, created, using, bulk=False,
+                      **kwargs):
+    # `Trip.objects.create_many()` inserts its summaries itself
+    if not bulk:
+        save_summary(instance, created, using)
+
+
+@receiver(post_delete, sender=Trip)
+def delete_trip_summary(sender, instance, using, **kwargs):
+    TripSummary.objects.using(using).filter(id=instance.id).delete()
+
+
+def _changed(update_fields, fields):
+    return update_fields is None or bool(fields.intersection(update_fields))
+
+
+@receiver(post_save, sender=Place)
+def rename_summary_places(sender, instance, created, update_fields, using,
+                          **kwargs):
+    if created or not _changed(update_fields, {'name'}):
+        return
+    summaries = TripSummary.objects.using(using)
+    summaries.filter(origin_id=instance.pk) \
+        .update(origin_name=instance.name)
+    summaries.filter(destination_id=instance.pk) \
+        .update(destination_name=instance.name)
+
+
+@receiver(post_save, sender=Vehicle)
+def rename_summary_vehicle(sender, instance, created, update_fields, using,
+                           **kwargs):
+    if created or not _changed(update_fields, VEHICLE_FIELDS):
+        return
+    TripSummary.objects.using(using).filter(vehicle_id=instance.pk) \
+        .update(vehicle_name=vehicle_name(instance))
+
+
+@receiver(post_save, sender=get_user_model())
+def rename_summary_driver(sender, instance, created, update_fields, using,
+                          **kwargs):
+    if created or not _changed(update_fields, DRIVER_FIELDS):
+        return
+    TripSummary.objects.using(using).filter(user_id=instance.pk) \
+        .update(driver_name=driver_name(instance))
@@ -1,12 +1,15 @@
-from datetime import date
+from datetime import date, timedelta
 from rest_framework import serializers
 
 from vehicles.models import Vehicle
 from vehicles.serializers import VehicleSerializer
+from places.cache import place_cache
 from places.models import Place
 from places.serializers import PlaceSerializer
+from shared.compiled import CompiledListSerializer
+from shared.serializers import SparseFieldsetsMixin
 from users.serializers import UserSerializer
-from .models import Trip
+from .models import ArchivedTrip, Booking, Trip, TripSummary
 
 
 class UserFilteredPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
@@ -21,12 +24,14 @@ class UserFilteredPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
         queryset = super(
             UserFilteredPrimaryKeyRelatedField,
             self).get_queryset()
-        if not request or not queryset:
+        if not request or queryset is None:
             return None
         return queryset.filter(user=request.user)
 
 
-class TripSerializer(serializers.HyperlinkedModelSerializer):
+class TripSerializer(
+        SparseFieldsetsMixin,
+        serializers.HyperlinkedModelSerializer):
     origin_id = serializers.PrimaryKeyRelatedField(
         queryset=Place.objects.all(),
         source='origin',
@@ -68,6 +73,7 @@ class TripSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = Trip
+        list_serializer_class = CompiledListSerializer
         fields = [
             'id',
             'url',
@@ -81,3 +87,186 @@ class TripSerializer(serializers.HyperlinkedModelSerializer):
             'vehicle',
             'driver',
         ]
+
+
+class TripSummarySerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(view_name='trip-detail')
+
+    class Meta:
+        model = TripSummary
+        list_serializer_class = CompiledListSerializer
+        fields = [
+            'id',
+            'url',
+            'trip_date',
+            'num_seats',
+            'origin_id',
+            'origin_name',
+            'destination_id',
+            'destination_name',
+            'vehicle_id',
+            'vehicle_name',
+            'user_id',
+            'driver_name',
+        ]
+
+
+def recurrence_dates(start_date, end_date, weekdays, **kwargs):
+    """
+    Returns the dates from `start_date` to `end_date`, inclusive, that fall
+    on one of `weekdays`.
+    """
+    weekdays = set(weekdays)
+    dates = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays:
+            dates.append(day)
+        day += timedelta(days=1)
+    return dates
+
+
+class ArchivedTripSerializer(
+        SparseFieldsetsMixin,
+        serializers.ModelSerializer):
+    origin = PlaceSerializer(read_only=True)
+    destination = PlaceSerializer(read_only=True)
+    vehicle = VehicleSerializer(read_only=True)
+    driver = UserSerializer(source='user', read_only=True)
+
+    class Meta:
+        model = ArchivedTrip
+        list_serializer_class = CompiledListSerializer
+        fields = [
+            'id',
+            'trip_date',
+            'num_seats',
+            'origin',
+            'destination',
+            'vehicle',
+            'driver',
+            'archived_at',
+        ]
+
+
+class RecurrenceSerializer(serializers.Serializer):
+    """
+    A weekly schedule, e.g. weekdays for 8 weeks from `start_date`.
+    """
+    start_date = serializers.DateField()
+    end_date = serializers.DateField(required=False)
+    weeks = serializers.IntegerField(
+        min_value=1, max_value=52, required=False)
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        min_length=1,
+        default=[0, 1, 2, 3, 4],
+        help_text='Days of the week, 0 is Monday'
+    )
+
+    def validate(self, data):
+        if ('end_date' in data) == ('weeks' in data):
+            raise serializers.ValidationError(
+                'Provide either end_date or weeks')
+        if 'weeks' in data:
+            data['end_date'] = data['start_date'] + \
+                timedelta(weeks=data['weeks'], days=-1)
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError(
+                'End date cannot be before start date')
+        return data
+
+
+class TripBulkSerializer(serializers.Serializer):
+    """
+    Dates for a bulk trip creation, either listed or as a recurrence.
+
+    The trip itself (origin, destination, vehicle and seats) is validated
+    separately, once, by `TripSerializer`.
+    """
+    max_trips = 200
+
+    dates = serializers.ListField(
+        child=serializers.DateField(),
+        min_length=1,
+        required=False
+    )
+    recurrence = RecurrenceSerializer(required=False)
+
+    def validate(self, data):
+        if ('dates' in data) == ('recurrence' in data):
+            raise serializers.ValidationError(
+                'Provide either dates or recurrence')
+        if 'recurrence' in data:
+            data['dates'] = recurrence_dates(**data['recurrence'])
+        if not data['dates']:
+            raise serializers.ValidationError(
+                'The recurrence does not include any dates')
+        if len(data['dates']) > self.max_trips:
+            raise serializers.ValidationError(
+                f'Cannot create more than {self.max_trips} trips at once')
+        return data
+
+    def get_item_errors(self):
+        """
+        Returns `{index: [errors]}` for the dates that cannot be used.
+        """
+        errors = {}
+        seen = set()
+        for index, trip_date in enumerate(self.validated_data['dates']):
+            item_errors = []
+            if trip_date < date.today():
+                item_errors.append('Trip date cannot be in the past')
+            if trip_date in seen:
+                item_errors.append('Duplicate trip date')
+            seen.add(trip_date)
+            if item_errors:
+                errors[index] = item_errors
+        return errors
+
+
+class BookingSerializer(serializers.ModelSerializer):
+    seats = serializers.IntegerField(min_value=1, default=1)
+
+    class Meta:
+        model = Booking
+        fields = [
+            'id',
+            'trip',
+            'seats',
+            'created_at',
+        ]
+        read_only_fields = [
+            'trip',
+            'created_at',
+        ]
+
+
+class RouteSearchSerializer(serializers.Serializer):
+    """
+    Query parameters of a route search.
+    """
+    origin = serializers.CharField()
+    destination = serializers.CharField()
+    date = serializers.DateField(default=date.today)
+    seats = serializers.IntegerField(min_value=1, default=1)
+    max_layover = serializers.IntegerField(
+        min_value=0, max_value=7, default=1)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class RouteFeedSerializer(serializers.Serializer):
+    """
+    Query parameters of a route feed, whose places are validated to the
+    ids of the places of that name.
+    """
+    origin = serializers.CharField()
+    destination = serializers.CharField()
+
+    def validate_place(self, value):
+        place_ids = place_cache.resolve(value)
+        if not place_ids:
+            raise serializers.ValidationError(f'Unknown place "{value}"')
+        return place_ids
+
+    validate_origin = validate_destination = validate_place
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after a trip's `num_seats` changes through a queryset update, which
+# does not send `post_save`, on the database `using`.
+seats_changed = Signal(providing_args=['trip_id', 'using'])
@@ -0,0 +1,73 @@
+from django.apps import apps as global_apps
+from django.db import transaction
+
+# a user's changes to other fields, e.g. `last_login`, leave summaries be
+DRIVER_FIELDS = {'username', 'first_name', 'last_name'}
+VEHICLE_FIELDS = {'make', 'model'}
+
+
+def driver_name(user):
+    return f'{user.first_name} {user.last_name}'.strip() or user.username
+
+
+def vehicle_name(vehicle):
+    return f'{vehicle.make} {vehicle.model}'
+
+
+def build_summary(trip, apps=global_apps):
+    TripSummary = apps.get_model('trips', 'TripSummary')
+    return TripSummary(
+        id=trip.id,
+        trip_date=trip.trip_date,
+        num_seats=trip.num_seats,
+        origin_id=trip.origin_id,
+        origin_name=trip.origin.name,
+        destination_id=trip.destination_id,
+        destination_name=trip.destination.name,
+        vehicle_id=trip.vehicle_id,
+        vehicle_name=vehicle_name(trip.vehicle),
+        user_id=trip.user_id,
+        driver_name=driver_name(trip.user)
+    )
+
+
+def save_summary(trip, created=False, using='default'):
+    """
+    Writes the summary of `trip`, in the current transaction, inserting it
+    without first trying an update when the trip was just `created`.
+    """
+    build_summary(trip).save(using=using, force_insert=created)
+
+
+def save_summaries(trips, using='default'):
+    """
+    Inserts the summaries of newly created `trips` with one query.
+    """
+    TripSummary = global_apps.get_model('trips', 'TripSummary')
+    TripSummary.objects.using(using).bulk_create(
+        [build_summary(trip) for trip in trips])
+
+
+def rebuild_summaries(using='default', apps=global_apps, batch_size=1000):
+    """
+    Recreates the summary of every trip, archived ones aside. Returns the
+    number of summaries.
+    """
+    Trip = apps.get_model('trips', 'Trip')
+    TripSummary = apps.get_model('trips', 'TripSummary')
+    trips = Trip._base_manager.using(using) \
+        .select_related('origin', 'destination', 'vehicle', 'user') \
+        .order_by('id')
+    count = 0
+    with transaction.atomic(using=using):
+        TripSummary._base_manager.using(using).all().delete()
+        batch = []
+        for trip in trips.iterator(chunk_size=batch_size):
+            batch.append(build_summary(trip, apps))
+            if len(batch) == batch_size:
+                TripSummary.objects.using(using).bulk_create(batch)
+                count += len(batch)
+                batch = []
+        TripSummary.objects.using(using).bulk_create(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,20 @@
+from django.core.mail import send_mail
+
+from taskqueue.registry import task
+from . import archive
+
+
+@task(name='trips.notify_passenger')
+def notify_passenger(email, subject, message):
+    """
+    Emails a passenger about a change to a trip they booked.
+    """
+    send_mail(subject, message, None, [email])
+
+
+@task(name='trips.archive_trips', priority=-10)
+def archive_trips(days=None):
+    """
+    Moves trips older than `TRIP_ARCHIVE_AFTER_DAYS` days to the archive.
+    """
+    archive.archive_trips(archive.archive_cutoff(days))
@@ -1,15 +1,39 @@
-from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import StringIO
 import json
+import threading
+from unittest import mock
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core import mail
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection, OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
+from places.cache import place_cache
 from places.models import Place
+from shared.pubsub import get_broker
+from shared.testing import QueryCountTestMixin
+from shared.throttling import get_counter_store
+from taskqueue.models import Task
+from taskqueue.worker import work
 from vehicles.models import Vehicle
-from .models import Trip
+from .archive import archive_trips
+from .matching import RouteGraph, TripEdge, route_graph
+from .models import ArchivedTrip, Booking, Trip, TripSummary
+from .serializers import TripSerializer
+from .signals import seats_changed
+from .summaries import rebuild_summaries
 
 User = get_user_model()
 
@@ -102,6 +126,9 @@ class TripTests(TestCase):
 
 class TripApiTest(APITestCase):
 
+    def setUp(self):
+        get_counter_store().clear()
+
     def test_get_trips(self):
         create_data()
         user = User.objects.get(pk=1)
@@ -127,11 +154,15 @@ class TripApiTest(APITestCase):
                 "num_seats": 1,
                 "origin": {
                     "id": 1,
-                    "name": "Origin"
+                    "name": "Origin",
+                    "latitude": None,
+                    "longitude": None
                 },
                 "destination": {
                     "id": 2,
-                    "name": "Destination"
+                    "name": "Destination",
+                    "latitude": None,
+                    "longitude": None
                 },
                 "vehicle": {
                     "id": 1,
@@ -140,6 +171,7 @@ class TripApiTest(APITestCase):
                     "model": "Model",
                     "reg_number": "1234",
                     "image": None,
+                    "image_variants": None,
                     "owner_url": "http://testserver/api/v1/users/1/"
                 },
                 "driver": {
@@ -150,7 +182,8 @@ class TripApiTest(APITestCase):
                     "gender": "wont-say",
                     "birth_date": None,
                     "url": "http://testserver/api/v1/users/1/",
-                    "profile_pic": None
+                    "profile_pic": None,
+                    "profile_pic_variants": None
                 }
             }
 
@@ -427,3 +460,1330 @@ class TripApiTest(APITestCase):
         response = self.client.get(
             f'/api/v1/trips/?trip_date={tomorrow.strftime(date_format)}')
         self.assertEqual(len(json.loads(response.content)), 0)
+
+
+class TripQueryCountTest(QueryCountTestMixin, APITestCase):
+
+    def setUp(self):
+        get_counter_store().clear()
+
+    def create_trips(self, count):
+        # every trip gets its own driver, vehicle and places so that any
+        # lazy relation access shows up as an extra query per row
+        for _ in range(count):
+            index = Trip.objects.count()
+            user = User.objects.create_user(
+                username=f'driver{index}',
+                email=f'driver{index}@test.com',
+                password='testpass123'
+            )
+            vehicle = Vehicle.objects.create(
+                make='Make',
+                model='Model',
+                reg_number=f'{index}',
+                user=user
+            )
+            Trip(
+                user=user,
+                origin=Place.objects.create(name=f'Origin {index}'),
+                destination=Place.objects.create(name=f'Destination {index}'),
+                vehicle=vehicle,
+                trip_date=date.today()
+            ).save()
+
+    def test_list_trips_query_count_is_constant(self):
+        num_queries = self.assertConstantQueryCount(
+            self.create_trips,
+            lambda: self.client.get('/api/v1/trips/')
+        )
+        self.assertEqual(num_queries, 1)
+
+    def test_filtered_list_query_count_is_constant(self):
+        self.assertConstantQueryCount(
+            self.create_trips,
+            lambda: self.client.get(
+                f'/api/v1/trips/?trip_date={date.today()}&num_seats=1')
+        )
+
+    def test_get_trip_single_query(self):
+        self.create_trips(1)
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/trips/1/')
+
+
+class TripPaginationTest(APITestCase):
+
+    def setUp(self):
+        get_counter_store().clear()
+        create_data()
+        user = User.objects.get(pk=1)
+        vehicle = Vehicle.objects.get(pk=1)
+        origin = Place.objects.get(pk=1)
+        destination = Place.objects.get(pk=2)
+        # several trips share a date so pages have to split ties
+        for days in [2, 0, 1, 0, 2, 1, 0]:
+            Trip(
+                user=user,
+                origin=origin,
+                destination=destination,
+                vehicle=vehicle,
+                trip_date=date.today() + relativedelta(days=days),
+                num_seats=days + 1
+            ).save()
+
+    def get_all_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            content = json.loads(response.content)
+            ids.extend(trip['id'] for trip in content['results'])
+            url = content['next']
+        return ids
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/v1/trips/')
+        self.assertEqual(len(json.loads(response.content)), 7)
+
+    def test_pages_follow_trip_date_and_id(self):
+        ids = self.get_all_pages('/api/v1/trips/?page_size=3')
+        expected = list(Trip.objects.order_by(
+            'trip_date', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link(self):
+        response = self.client.get('/api/v1/trips/?page_size=3')
+        first_page = json.loads(response.content)
+        self.assertIsNone(first_page['previous'])
+
+        response = self.client.get(first_page['next'])
+        second_page = json.loads(response.content)
+
+        response = self.client.get(second_page['previous'])
+        self.assertEqual(
+            json.loads(response.content)['results'],
+            first_page['results']
+        )
+
+    def test_pages_with_filter(self):
+        ids = self.get_all_pages('/api/v1/trips/?page_size=2&num_seats=2')
+        expected = list(Trip.objects.filter(num_seats__gte=2).order_by(
+            'trip_date', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/trips/?cursor=invalid')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_is_single_query(self):
+        response = self.client.get('/api/v1/trips/?page_size=3')
+        next_url = json.loads(response.content)['next']
+        with self.assertNumQueries(1):
+            self.client.get(next_url)
+
+
+def create_trip(num_seats=1):
+    driver = User.objects.create_user(
+        username='driver',
+        email='driver@test.com',
+        password='testpass123'
+    )
+    trip = Trip(
+        user=driver,
+        origin=Place.objects.create(name='Origin'),
+        destination=Place.objects.create(name='Destination'),
+        vehicle=Vehicle.objects.create(
+            make='Make',
+            model='Model',
+            reg_number='1234',
+            user=driver
+        ),
+        trip_date=date.today(),
+        num_seats=num_seats
+    )
+    trip.save()
+    return trip
+
+
+class BookingApiTest(APITestCase):
+
+    def setUp(self):
+        get_counter_store().clear()
+        self.trip = create_trip(num_seats=3)
+        self.passenger = User.objects.create_user(
+            username='passenger',
+            email='passenger@test.com',
+            password='testpass123'
+        )
+        self.url = f'/api/v1/trips/{self.trip.pk}/book/'
+
+    def test_book_trip(self):
+        self.client.force_authenticate(user=self.passenger)
+        response = self.client.post(self.url, {'seats': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        content = json.loads(response.content)
+        self.assertEqual(content['trip'], self.trip.pk)
+        self.assertEqual(content['seats'], 2)
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.num_seats, 1)
+        booking = Booking.objects.get()
+        self.assertEqual(booking.user, self.passenger)
+
+    def test_book_defaults_to_one_seat(self):
+        self.client.force_authenticate(user=self.passenger)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.num_seats, 2)
+
+    def test_book_more_than_available(self):
+        self.client.force_authenticate(user=self.passenger)
+        response = self.client.post(self.url, {'seats': 4})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.num_seats, 3)
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_book_invalid_seats(self):
+        self.client.force_authenticate(user=self.passenger)
+        response = self.client.post(self.url, {'seats': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_book_own_trip(self):
+        self.client.force_authenticate(user=self.trip.user)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_book_unauthenticated(self):
+        response = self.client.post(self.url)
+        self.assertIn(response.status_code, [
+            status.HTTP_401_UNAUTHORIZED,
+            status.HTTP_403_FORBIDDEN,
+        ])
+        self.assertEqual(Booking.objects.count(), 0)
+
+
+class BookingConcurrencyTest(TransactionTestCase):
+    num_seats = 50
+    num_passengers = 300
+    max_attempts = 10
+
+    def setUp(self):
+        get_counter_store().clear()
+
+    def book(self, passenger, url):
+        client = APIClient()
+        client.force_authenticate(user=passenger)
+        try:
+            for _ in range(self.max_attempts):
+                try:
+                    return client.post(url).status_code
+                except OperationalError:
+                    # the database stayed locked past its busy timeout,
+                    # the passenger tries again
+                    continue
+            self.fail(f'Database locked for {self.max_attempts} attempts')
+        finally:
+            connection.close()
+
+    def test_concurrent_bookings_never_overbook(self):
+        trip = create_trip(num_seats=self.num_seats)
+        passengers = [
+            User.objects.create_user(
+                username=f'passenger{index}',
+                email=f'passenger{index}@test.com'
+            )
+            for index in range(self.num_passengers)
+        ]
+        url = f'/api/v1/trips/{trip.pk}/book/'
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            statuses = list(executor.map(
+                lambda passenger: self.book(passenger, url), passengers))
+
+        trip.refresh_from_db()
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), self.num_seats)
+        self.assertEqual(
+            statuses.count(status.HTTP_409_CONFLICT),
+            self.num_passengers - self.num_seats
+        )
+        self.assertEqual(trip.num_seats, 0)
+        self.assertEqual(
+            Booking.objects.filter(trip=trip).count(), self.num_seats)
+        self.assertEqual(TripSummary.objects.get(id=trip.pk).num_seats, 0)
+
+
+class TripResponseCacheTest(APITestCase):
+
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        self.trip = create_trip(num_seats=2)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/api/v1/trips/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/api/v1/trips/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/v1/trips/')
+        response = self.client.get(
+            '/api/v1/trips/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_response_skips_database(self):
+        expected = json.loads(self.client.get('/api/v1/trips/').content)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/trips/')
+        self.assertEqual(json.loads(response.content), expected)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.client.get('/api/v1/trips/')
+        response = self.client.get('/api/v1/trips/?num_seats=3')
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_write_invalidates(self):
+        response = self.client.get('/api/v1/trips/')
+        etag = response['ETag']
+
+        Place.objects.filter(pk=self.trip.origin.pk).update(name='Ignored')
+        response = self.client.get('/api/v1/trips/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        origin = self.trip.origin
+        origin.name = 'Renamed'
+        origin.save()
+        response = self.client.get('/api/v1/trips/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            json.loads(response.content)[0]['origin']['name'], 'Renamed')
+
+    def test_booking_invalidates(self):
+        etag = self.client.get('/api/v1/trips/')['ETag']
+        passenger = User.objects.create_user(
+            username='passenger',
+            email='passenger@test.com'
+        )
+        Booking.objects.book(self.trip, passenger)
+        response = self.client.get('/api/v1/trips/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)[0]['num_seats'], 1)
+
+    def test_login_does_not_invalidate(self):
+        etag = self.client.get('/api/v1/trips/')['ETag']
+        user = self.trip.user
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        response = self.client.get('/api/v1/trips/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_next_day_invalidates(self):
+        response = self.client.get('/api/v1/trips/')
+
+        class Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return date.today() + timedelta(days=1)
+
+        with mock.patch('shared.caching.date', Tomorrow):
+            with CaptureQueriesContext(connection) as queries:
+                tomorrow = self.client.get(
+                    '/api/v1/trips/',
+                    HTTP_IF_NONE_MATCH=response['ETag'],
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+        self.assertEqual(tomorrow.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(tomorrow['ETag'], response['ETag'])
+        self.assertTrue(queries)
+
+    def test_authenticated_requests_are_not_cached(self):
+        self.client.force_authenticate(user=self.trip.user)
+        response = self.client.get('/api/v1/trips/')
+        self.assertNotIn('ETag', response)
+
+
+class TripBulkApiTest(APITestCase):
+
+    def setUp(self):
+        get_counter_store().clear()
+        create_data()
+        self.user = User.objects.get(pk=1)
+        self.client.force_authenticate(user=self.user)
+        self.trip = {
+            'origin_id': 1,
+            'destination_id': 2,
+            'vehicle_id': 1,
+            'num_seats': 3,
+        }
+
+    def test_bulk_create_dates(self):
+        dates = [
+            str(date.today() + relativedelta(days=days))
+            for days in [1, 2, 5]
+        ]
+        # place and vehicle lookups, then one insert of the trips and one of
+        # their summaries however many dates
+        with self.assertNumQueries(9):
+            response = self.client.post('/api/v1/trips/bulk/', {
+                **self.trip,
+                'dates': dates,
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        content = json.loads(response.content)
+        self.assertEqual([trip['trip_date'] for trip in content], dates)
+        self.assertEqual(
+            [trip['id'] for trip in content],
+            list(Trip.objects.order_by('id').values_list('id', flat=True))
+        )
+        self.assertEqual(content[0]['origin']['name'], 'Origin')
+        self.assertEqual(content[0]['driver']['username'], 'vince')
+        self.assertTrue(all(
+            trip.num_seats == 3 and trip.user == self.user
+            for trip in Trip.objects.all()
+        ))
+
+    def test_bulk_create_recurrence(self):
+        # next Monday, so the schedule is never partly in the past
+        start = date.today() + relativedelta(days=7 - date.today().weekday())
+        response = self.client.post('/api/v1/trips/bulk/', {
+            **self.trip,
+            'recurrence': {
+                'start_date': str(start),
+                'weeks': 8,
+                'weekdays': [0, 1, 2, 3, 4],
+            },
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Trip.objects.count(), 40)
+        self.assertEqual(
+            {trip.trip_date.weekday() for trip in Trip.objects.all()},
+            {0, 1, 2, 3, 4}
+        )
+
+    def test_bulk_create_item_errors(self):
+        today = date.today()
+        yesterday = today + relativedelta(days=-1)
+        response = self.client.post('/api/v1/trips/bulk/', {
+            **self.trip,
+            'dates': [str(today), str(yesterday), str(today)],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(json.loads(response.content), {
+            'errors': [
+                {
+                    'index': 1,
+                    'trip_date': str(yesterday),
+                    'errors': ['Trip date cannot be in the past'],
+                },
+                {
+                    'index': 2,
+                    'trip_date': str(today),
+                    'errors': ['Duplicate trip date'],
+                },
+            ]
+        })
+        self.assertEqual(Trip.objects.count(), 0)
+
+    def test_bulk_create_invalid_trip(self):
+        response = self.client.post('/api/v1/trips/bulk/', {
+            **self.trip,
+            'destination_id': 1,
+            'dates': [str(date.today())],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Trip.objects.count(), 0)
+
+    def test_bulk_create_requires_dates_or_recurrence(self):
+        response = self.client.post(
+            '/api/v1/trips/bulk/', self.trip, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_unauthenticated(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post('/api/v1/trips/bulk/', {
+            **self.trip,
+            'dates': [str(date.today())],
+        }, format='json')
+        self.assertIn(response.status_code, [
+            status.HTTP_401_UNAUTHORIZED,
+            status.HTTP_403_FORBIDDEN,
+        ])
+
+
+class TripExportTest(APITestCase):
+
+    def setUp(self):
+        get_counter_store().clear()
+        self.trip = create_trip(num_seats=3)
+        self.passenger = User.objects.create_user(
+            username='passenger',
+            email='passenger@test.com'
+        )
+        Booking.objects.book(self.trip, self.passenger, 2)
+
+    def get_export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        response, content = self.get_export('/api/v1/trips/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="trips.csv"'
+        )
+        self.assertEqual(content.splitlines(), [
+            'id,trip_date,num_seats,origin,destination,driver,'
+            'vehicle_make,vehicle_model,vehicle_reg_number',
+            f'{self.trip.pk},{date.today()},1,Origin,Destination,driver,'
+            'Make,Model,1234',
+        ])
+
+    def test_export_ndjson_with_filter(self):
+        response, content = self.get_export(
+            '/api/v1/trips/export/?output=ndjson&origin=origin')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line)['id'] for line in content.splitlines()],
+            [self.trip.pk]
+        )
+
+        _, content = self.get_export(
+            '/api/v1/trips/export/?output=ndjson&origin=nowhere')
+        self.assertEqual(content, '')
+
+    def test_export_accepts_csv(self):
+        response = self.client.get(
+            '/api/v1/trips/export/', HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_export_invalid_output(self):
+        response = self.client.get('/api/v1/trips/export/?output=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_bookings(self):
+        self.client.force_authenticate(user=self.passenger)
+        _, content = self.get_export(
+            '/api/v1/trips/export/?dataset=bookings&output=ndjson')
+        booking = json.loads(content)
+        self.assertEqual(booking['passenger'], 'passenger')
+        self.assertEqual(booking['seats'], 2)
+        self.assertEqual(booking['trip_id'], self.trip.pk)
+
+    def test_export_bookings_only_own(self):
+        other = User.objects.create_user(
+            username='other',
+            email='other@test.com'
+        )
+        self.client.force_authenticate(user=other)
+        _, content = self.get_export(
+            '/api/v1/trips/export/?dataset=bookings')
+        self.assertEqual(content.splitlines()[1:], [])
+
+    def test_export_bookings_unauthenticated(self):
+        response = self.client.get('/api/v1/trips/export/?dataset=bookings')
+        self.assertIn(response.status_code, [
+            status.HTTP_401_UNAUTHORIZED,
+            status.HTTP_403_FORBIDDEN,
+        ])
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_trips', '--output=ndjson', stdout=out)
+        self.assertEqual(
+            json.loads(out.getvalue())['origin'], 'Origin')
+
+        out = StringIO()
+        call_command(
+            'export_trips', '--bookings', '--destination=destination',
+            stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+class TripProximitySearchTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        trip = create_trip()
+        Place.objects.filter(pk=trip.origin_id).update(
+            latitude=-25.7479, longitude=28.2293)
+        Place.objects.filter(pk=trip.destination_id).update(
+            latitude=-33.9249, longitude=18.4241)
+        place_cache.invalidate()
+
+    def get_ids(self, query):
+        response = self.client.get(f'/api/v1/trips/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [trip['id'] for trip in json.loads(response.content)]
+
+    def test_near(self):
+        self.assertEqual(self.get_ids('near=-26.2041,28.0473&radius=60'), [1])
+        self.assertEqual(self.get_ids('near=-26.2041,28.0473&radius=40'), [])
+        # trips are matched on their origin only
+        self.assertEqual(self.get_ids('near=-33.9249,18.4241'), [])
+
+    def test_default_radius(self):
+        self.assertEqual(self.get_ids('near=-25.80,28.25'), [1])
+
+    def test_many_places(self):
+        # more places in range than SQLite allows parameters
+        Place.objects.bulk_create(
+            Place(
+                name=f'Place {index}',
+                name_key=f'place {index}',
+                latitude=-25.7479 + index / 10000,
+                longitude=28.2293
+            )
+            for index in range(1200)
+        )
+        place_cache.invalidate()
+        self.assertEqual(self.get_ids('near=-25.80,28.25&radius=200'), [1])
+        # the trip's origin is 27 km away, among 500 places within 20
+        self.assertEqual(self.get_ids('near=-25.50,28.2293&radius=20'), [])
+        self.assertEqual(
+            set(Place.objects.within(-25.50, 28.2293, 20)
+                .values_list('id', flat=True)),
+            {place.id for _, place in place_cache.near(-25.50, 28.2293, 20)}
+        )
+
+    def test_invalid(self):
+        for query in ['near=abc', 'near=100,0', 'near=0,0&radius=500',
+                      'near=0,0&radius=0']:
+            response = self.client.get(f'/api/v1/trips/?{query}')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+
+class RouteGraphTest(TestCase):
+    def setUp(self):
+        self.today = date.today()
+
+    def edge(self, trip_id, origin_id, destination_id, days=0, num_seats=2):
+        return TripEdge(
+            trip_id, origin_id, destination_id,
+            self.today + timedelta(days=days), num_seats)
+
+    def get_routes(self, graph, origin_id, destination_id, **kwargs):
+        itineraries = graph.itineraries(
+            [origin_id], [destination_id], self.today, **kwargs)
+        return [[edge.id for edge in itinerary] for itinerary in itineraries]
+
+    def test_direct_and_connecting_trips(self):
+        graph = RouteGraph([
+            self.edge(1, 'A', 'C', days=3),
+            self.edge(2, 'A', 'B', days=0),
+            self.edge(3, 'B', 'C', days=1),
+            self.edge(4, 'B', 'C', days=3),
+            self.edge(5, 'D', 'C', days=0),
+        ])
+        # ranked by arrival, then by number of trips
+        self.assertEqual(
+            self.get_routes(graph, 'A', 'C', max_layover=3),
+            [[2, 3], [1], [2, 4]])
+        self.assertEqual(
+            self.get_routes(graph, 'A', 'C', max_layover=1), [[2, 3], [1]])
+
+    def test_connections_keep_time_order(self):
+        graph = RouteGraph([
+            self.edge(1, 'A', 'B', days=2),
+            self.edge(2, 'B', 'C', days=1),
+        ])
+        self.assertEqual(self.get_routes(graph, 'A', 'C'), [])
+
+    def test_seats(self):
+        graph = RouteGraph([
+            self.edge(1, 'A', 'B', num_seats=3),
+            self.edge(2, 'B', 'C', num_seats=1),
+        ])
+        self.assertEqual(self.get_routes(graph, 'A', 'C', seats=1), [[1, 2]])
+        self.assertEqual(self.get_routes(graph, 'A', 'C', seats=2), [])
+        graph.set_seats(2, 2)
+        self.assertEqual(self.get_routes(graph, 'A', 'C', seats=2), [[1, 2]])
+
+    def test_incremental_updates(self):
+        graph = RouteGraph([self.edge(1, 'A', 'B')])
+        graph.add(self.edge(2, 'B', 'C'))
+        self.assertEqual(self.get_routes(graph, 'A', 'C'), [[1, 2]])
+        # moving a trip replaces its edge
+        graph.add(self.edge(2, 'B', 'C', days=5))
+        self.assertEqual(self.get_routes(graph, 'A', 'C'), [])
+        graph.remove(2)
+        graph.remove(2)
+        self.assertEqual(len(graph), 1)
+        self.assertNotIn('B', graph.outgoing)
+
+
+class RouteSearchApiTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        place_cache.invalidate()
+        route_graph.invalidate()
+        self.driver = User.objects.create_user(
+            username='driver', email='driver@test.com')
+        self.vehicle = Vehicle.objects.create(
+            make='Make', model='Model', reg_number='1234', user=self.driver)
+        self.places = {
+            name: Place.objects.create(name=name)
+            for name in ['Pretoria', 'Johannesburg', 'Durban']
+        }
+        self.today = date.today()
+        self.create_trip('Pretoria', 'Johannesburg', 0)
+        self.create_trip('Johannesburg', 'Durban', 1)
+        self.create_trip('Pretoria', 'Durban', 3)
+
+    def create_trip(self, origin, destination, days, num_seats=2):
+        return Trip.objects.create(
+            user=self.driver,
+            vehicle=self.vehicle,
+            origin=self.places[origin],
+            destination=self.places[destination],
+            trip_date=self.today + timedelta(days=days),
+            num_seats=num_seats
+        )
+
+    def get_routes(self, query='origin=pretoria&destination=durban'):
+        response = self.client.get(f'/api/v1/trips/routes/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            [leg['id'] for leg in itinerary['legs']]
+            for itinerary in json.loads(response.content)
+        ]
+
+    def test_routes(self):
+        response = self.client.get(
+            '/api/v1/trips/routes/?origin=pretoria&destination=durban')
+        content = json.loads(response.content)
+        self.assertEqual(len(content), 2)
+        self.assertEqual(content[0]['transfers'], 1)
+        self.assertEqual(content[0]['departure_date'], str(self.today))
+        self.assertEqual(
+            content[0]['arrival_date'], str(self.today + timedelta(days=1)))
+        self.assertEqual(
+            content[0]['legs'][1]['origin']['name'], 'Johannesburg')
+        self.assertEqual(content[1]['transfers'], 0)
+
+    def test_parameters(self):
+        self.assertEqual(self.get_routes(
+            'origin=pretoria&destination=durban&max_layover=0'), [[3]])
+        self.assertEqual(self.get_routes(
+            'origin=pretoria&destination=durban&seats=3'), [])
+        self.assertEqual(self.get_routes(
+            'origin=pretoria&destination=durban&limit=1'), [[1, 2]])
+        response = self.client.get('/api/v1/trips/routes/?origin=pretoria')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_graph_updated_without_reload(self):
+        self.get_routes()
+        graph = route_graph._graph
+
+        trip = self.create_trip('Pretoria', 'Johannesburg', 1)
+        # same arrival and number of trips, the shorter layover first
+        self.assertEqual(self.get_routes(), [[4, 2], [1, 2], [3]])
+
+        passenger = User.objects.create_user(
+            username='passenger', email='passenger@test.com')
+        Booking.objects.book(Trip.objects.get(pk=2), passenger, seats=2)
+        self.assertEqual(self.get_routes(), [[3]])
+
+        trip.delete()
+        Trip.objects.get(pk=3).delete()
+        self.assertEqual(self.get_routes(), [])
+        self.assertIs(route_graph._graph, graph)
+
+
+class TripSparseFieldsetsTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        self.trip = create_trip()
+
+    def get(self, query):
+        response = self.client.get(f'/api/v1/trips/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_fields(self):
+        self.assertEqual(self.get('fields=id,trip_date,origin.name'), [{
+            'id': self.trip.id,
+            'trip_date': str(self.trip.trip_date),
+            'origin': {'name': 'Origin'},
+        }])
+
+    def test_expand(self):
+        self.assertEqual(
+            self.get('fields=id,origin,destination,vehicle,driver&expand='),
+            [{
+                'id': self.trip.id,
+                'origin': self.trip.origin_id,
+                'destination': self.trip.destination_id,
+                'vehicle': self.trip.vehicle_id,
+                'driver': self.trip.user_id,
+            }]
+        )
+        content = self.get('fields=origin,driver.username&expand=driver')
+        self.assertEqual(content, [{
+            'origin': self.trip.origin_id,
+            'driver': {'username': 'driver'},
+        }])
+
+    def test_joins_dropped(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get('expand=')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('JOIN', context.captured_queries[0]['sql'])
+
+        with CaptureQueriesContext(connection) as context:
+            self.get('expand=vehicle&fields=id,vehicle.make')
+        sql = context.captured_queries[0]['sql']
+        self.assertEqual(sql.count('JOIN'), 1)
+        self.assertIn('"vehicles_vehicle"."make"', sql)
+        self.assertNotIn('"vehicles_vehicle"."reg_number"', sql)
+
+    def test_write_fields_kept(self):
+        self.client.force_authenticate(user=self.trip.user)
+        response = self.client.post(
+            '/api/v1/trips/?fields=id&expand=',
+            {
+                'trip_date': str(date.today()),
+                'num_seats': 2,
+                'origin_id': self.trip.destination_id,
+                'destination_id': self.trip.origin_id,
+                'vehicle_id': self.trip.vehicle_id,
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(json.loads(response.content), {'id': 2})
+
+
+class TripCompiledSerializerTest(TestCase):
+    def setUp(self):
+        trip = create_trip()
+        self.trips = [trip, Trip.objects.create(
+            user=trip.user,
+            origin=trip.destination,
+            destination=trip.origin,
+            vehicle=trip.vehicle,
+            trip_date=trip.trip_date,
+            num_seats=3
+        )]
+
+    def render(self, query, compiled=True):
+        request = Request(APIRequestFactory().get(f'/api/v1/trips/?{query}'))
+        context = {'request': request}
+        if compiled:
+            return TripSerializer(self.trips, many=True, context=context).data
+        return ListSerializer(
+            self.trips,
+            child=TripSerializer(context=context),
+            context=context
+        ).data
+
+    def test_matches_serializer(self):
+        for query in [
+                '',
+                'fields=id,url,origin.name,vehicle.owner_url',
+                'expand=',
+                'expand=driver&fields=driver.username,vehicle']:
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.render(query),
+                    self.render(query, compiled=False)
+                )
+
+    def test_no_request(self):
+        self.assertEqual(
+            TripSerializer(self.trips, many=True, context={
+                'request': None}).data[0]['origin'],
+            {'id': self.trips[0].origin_id, 'name': 'Origin',
+             'latitude': None, 'longitude': None}
+        )
+
+
+@override_settings(EVENT_STREAM_TIMEOUT=0.3, EVENT_STREAM_HEARTBEAT=0.1)
+class TripFeedTest(TransactionTestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        place_cache.invalidate()
+        get_broker.cache_clear()
+        self.trip = create_trip(num_seats=3)
+        self.url = '/api/v1/trips/feed/?origin=origin&destination=destination'
+
+    def subscribe(self, **headers):
+        response = self.client.get(
+            self.url, HTTP_ACCEPT='text/event-stream', **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response
+
+    def read_events(self, response):
+        content = b''.join(response.streaming_content).decode()
+        events = []
+        for block in content.split('\n\n'):
+            fields = dict(
+                line.split(': ', 1) for line in block.splitlines()
+                if not line.startswith(':') and ': ' in line
+            )
+            if 'event' in fields:
+                events.append((fields['event'], json.loads(fields['data'])))
+        return events
+
+    def test_events(self):
+        response = self.subscribe()
+        Booking.objects.book(
+            self.trip,
+            User.objects.create_user(username='rider', email='r@test.com'),
+            2
+        )
+        trip_id = self.trip.id
+        self.trip.refresh_from_db()
+        self.trip.delete()
+        events = self.read_events(response)
+        self.assertEqual(
+            [(event, trip['num_seats']) for event, trip in events],
+            [('updated', 1), ('cancelled', 1)]
+        )
+        self.assertEqual(
+            events[0][1]['url'], f'http://testserver/api/v1/trips/{trip_id}/')
+
+    def test_other_routes_ignored(self):
+        response = self.subscribe()
+        Trip.objects.create(
+            user=self.trip.user,
+            vehicle=self.trip.vehicle,
+            origin=self.trip.destination,
+            destination=self.trip.origin,
+            trip_date=date.today()
+        )
+        self.assertEqual(self.read_events(response), [])
+
+    def test_route_changes(self):
+        response = self.subscribe()
+        self.trip.destination = Place.objects.create(name='Elsewhere')
+        self.trip.save()
+        events = self.read_events(response)
+        self.assertEqual(
+            [(event, trip['id']) for event, trip in events],
+            [('cancelled', self.trip.id)]
+        )
+
+        self.url = '/api/v1/trips/feed/?origin=origin&destination=elsewhere'
+        events = self.read_events(self.subscribe(HTTP_LAST_EVENT_ID='0'))
+        self.assertEqual(
+            [(event, trip['id']) for event, trip in events],
+            [('created', self.trip.id)]
+        )
+
+    def test_missed_events(self):
+        message = get_broker().publish('trips.route.0.0', {})
+        trip = Trip.objects.create(
+            user=self.trip.user,
+            vehicle=self.trip.vehicle,
+            origin=self.trip.origin,
+            destination=self.trip.destination,
+            trip_date=date.today(),
+            num_seats=4
+        )
+        events = self.read_events(
+            self.subscribe(HTTP_LAST_EVENT_ID=str(message.id)))
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], 'created')
+        self.assertEqual(events[0][1]['id'], trip.id)
+
+    def test_missing_route(self):
+        response = self.client.get('/api/v1/trips/feed/?origin=origin')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_place(self):
+        response = self.client.get(
+            '/api/v1/trips/feed/?origin=origin&destination=nowhere')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            json.loads(response.content),
+            {'destination': ['Unknown place "nowhere"']}
+        )
+
+
+class TripNotificationTest(TestCase):
+    def setUp(self):
+        self.trip = create_trip(num_seats=3)
+        self.passenger = User.objects.create_user(
+            username='rider', email='rider@test.com')
+        Booking.objects.book(self.trip, self.passenger)
+
+    def run_tasks(self):
+        work('test', threading.Event(), burst=True)
+
+    def test_cancelled(self):
+        self.trip.delete()
+        self.assertEqual(len(mail.outbox), 0)
+        self.run_tasks()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['rider@test.com'])
+        self.assertEqual(mail.outbox[0].subject, 'Your trip was cancelled')
+
+    def test_updated(self):
+        self.trip.trip_date += timedelta(days=1)
+        self.trip.save()
+        self.trip.num_seats = 1
+        self.trip.save(update_fields=['num_seats'])
+        self.run_tasks()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(str(self.trip.trip_date), mail.outbox[0].body)
+
+    def test_unchanged_route_is_not_notified(self):
+        self.trip.refresh_from_db()
+        self.trip.num_seats = 1
+        self.trip.save()
+        self.run_tasks()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(
+            Task.objects.filter(name='trips.notify_passenger').exists())
+
+
+class TripArchiveTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        place_cache.invalidate()
+        self.trip = create_trip(num_seats=3)
+        self.passenger = User.objects.create_user(
+            username='rider', email='rider@test.com')
+        self.booking = Booking.objects.book(self.trip, self.passenger)
+        self.past = date.today() - timedelta(days=60)
+        Trip.all_objects.update(trip_date=self.past)
+
+    def test_upcoming_only(self):
+        self.assertFalse(Trip.objects.exists())
+        self.assertEqual(Trip.all_objects.count(), 1)
+
+    def test_admin_lists_past_trips(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@test.com', password='testpass123')
+        self.client.force_login(admin)
+        response = self.client.get('/admin/trips/trip/')
+        self.assertContains(response, f'/admin/trips/trip/{self.trip.id}/')
+        response = self.client.get(f'/admin/trips/trip/{self.trip.id}/change/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(
+            f'/admin/trips/booking/{self.booking.id}/change/',
+            {'user': self.passenger.id, 'seats': 2}
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.seats, 2)
+        response = self.client.get('/api/v1/trips/')
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_archive(self):
+        self.assertEqual(archive_trips(), 1)
+        self.assertFalse(Trip.all_objects.exists())
+        self.assertFalse(Booking.objects.exists())
+
+        archived = ArchivedTrip.objects.get()
+        self.assertEqual(archived.id, self.trip.id)
+        self.assertEqual(archived.trip_date, self.past)
+        self.assertEqual(archived.num_seats, 2)
+        booking = archived.bookings.get()
+        self.assertEqual(booking.id, self.booking.id)
+        self.assertEqual(booking.user, self.passenger)
+        # archiving is not a cancellation
+        self.assertFalse(
+            Task.objects.filter(name='trips.notify_passenger').exists())
+
+    def test_recent_trips_kept(self):
+        self.assertEqual(archive_trips(self.past), 0)
+        self.assertEqual(Trip.all_objects.count(), 1)
+
+    def test_batches(self):
+        for _ in range(4):
+            Trip.all_objects.create(
+                user=self.trip.user,
+                origin=self.trip.origin,
+                destination=self.trip.destination,
+                vehicle=self.trip.vehicle,
+                trip_date=date.today()
+            )
+        Trip.all_objects.update(trip_date=self.past)
+        self.assertEqual(archive_trips(batch_size=2), 5)
+        self.assertEqual(ArchivedTrip.objects.count(), 5)
+
+    def test_history(self):
+        archive_trips()
+        response = self.client.get('/api/v1/trips/history/?origin=origin')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertIsNone(content['next'])
+        self.assertEqual(
+            [(trip['id'], trip['origin']['name'], trip['driver']['username'])
+             for trip in content['results']],
+            [(self.trip.id, 'Origin', 'driver')]
+        )
+        response = self.client.get(
+            '/api/v1/trips/history/?origin=destination')
+        self.assertEqual(json.loads(response.content)['results'], [])
+
+    def test_history_includes_trips_not_archived_yet(self):
+        yesterday = date.today() - timedelta(days=1)
+        recent = Trip.all_objects.create(
+            user=self.trip.user,
+            origin=self.trip.origin,
+            destination=self.trip.destination,
+            vehicle=self.trip.vehicle,
+            trip_date=date.today()
+        )
+        Trip.all_objects.filter(pk=recent.pk).update(trip_date=yesterday)
+        self.assertEqual(archive_trips(), 1)
+
+        response = self.client.get('/api/v1/trips/history/')
+        content = json.loads(response.content)
+        self.assertEqual(
+            [(trip['id'], trip['trip_date'], trip['archived_at'] is None)
+             for trip in content['results']],
+            [(self.trip.id, str(self.past), False),
+             (recent.id, str(yesterday), True)]
+        )
+
+        response = self.client.get('/api/v1/trips/history/?page_size=1')
+        content = json.loads(response.content)
+        self.assertEqual(
+            [trip['id'] for trip in content['results']], [self.trip.id])
+        response = self.client.get(content['next'])
+        content = json.loads(response.content)
+        self.assertEqual(
+            [trip['id'] for trip in content['results']], [recent.id])
+        self.assertIsNone(content['next'])
+
+        response = self.client.get('/api/v1/trips/export/?output=ndjson')
+        exported = [
+            json.loads(line)['id']
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(exported, [recent.id])
+
+    def test_daily_task(self):
+        call_command('run_workers', processes=1, burst=True, stdout=StringIO())
+        call_command('run_workers', processes=1, burst=True, stdout=StringIO())
+        self.assertEqual(ArchivedTrip.objects.count(), 1)
+        self.assertEqual(
+            Task.objects.filter(
+                name='trips.archive_trips', status=Task.DONE).count(),
+            1
+        )
+
+
+class TripSummaryTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        cache.clear()
+        place_cache.invalidate()
+        self.trip = create_trip(num_seats=3)
+
+    def assertSummary(self, **values):
+        summary = TripSummary.objects.values(*values).get(id=self.trip.id)
+        self.assertEqual(summary, values)
+
+    def test_created(self):
+        self.assertSummary(
+            trip_date=date.today(),
+            num_seats=3,
+            origin_id=self.trip.origin_id,
+            origin_name='Origin',
+            destination_name='Destination',
+            vehicle_name='Make Model',
+            user_id=self.trip.user_id,
+            driver_name='driver'
+        )
+
+    def test_trip_changes(self):
+        self.trip.trip_date = date.today() + timedelta(days=1)
+        self.trip.save()
+        Booking.objects.book(self.trip, User.objects.create_user(
+            username='rider', email='rider@test.com'), seats=2)
+        self.assertSummary(
+            trip_date=date.today() + timedelta(days=1), num_seats=1)
+
+        self.trip.delete()
+        self.assertFalse(TripSummary.objects.exists())
+
+    def test_renames(self):
+        self.trip.origin.name = 'Start'
+        self.trip.origin.save()
+        self.trip.destination.name = 'End'
+        self.trip.destination.save()
+        self.trip.vehicle.model = 'Other'
+        self.trip.vehicle.save()
+        self.trip.user.first_name = 'Vincent'
+        self.trip.user.last_name = 'Nyanga'
+        self.trip.user.save()
+        self.assertSummary(
+            origin_name='Start',
+            destination_name='End',
+            vehicle_name='Make Other',
+            driver_name='Vincent Nyanga'
+        )
+
+    def test_interleaved_bookings(self):
+        first, second = [
+            User.objects.create_user(
+                username=f'rider{index}', email=f'rider{index}@test.com')
+            for index in range(2)
+        ]
+
+        def book_second(sender, trip_id, **kwargs):
+            # the second booking commits while the first one's
+            # `seats_changed` receivers are still running
+            seats_changed.disconnect(book_second, sender=Trip)
+            Booking.objects.book(self.trip, second, seats=2)
+
+        seats_changed.connect(book_second, sender=Trip)
+        self.addCleanup(seats_changed.disconnect, book_second, sender=Trip)
+        Booking.objects.book(self.trip, first)
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.num_seats, 0)
+        self.assertSummary(num_seats=0)
+
+    def test_booked_seats_in_booking_transaction(self):
+        rider = User.objects.create_user(
+            username='rider', email='rider@test.com')
+        # no receiver reads the trip back after the booking commits
+        with mock.patch.object(seats_changed, 'send'):
+            Booking.objects.book(self.trip, rider, seats=2)
+        self.assertSummary(num_seats=1)
+
+    def test_rebuild(self):
+        TripSummary.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_trip_summaries', stdout=out)
+        self.assertIn('Rebuilt 1 trip summaries', out.getvalue())
+        self.assertSummary(origin_name='Origin', driver_name='driver')
+
+    def test_archived(self):
+        Trip.all_objects.update(trip_date=date.today() - timedelta(days=60))
+        rebuild_summaries()
+        archive_trips()
+        self.assertFalse(TripSummary.objects.exists())
+
+    def test_list(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/v1/trips/summaries/?origin=origin&num_seats=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), [{
+            'id': self.trip.id,
+            'url': f'http://testserver/api/v1/trips/{self.trip.id}/',
+            'trip_date': str(date.today()),
+            'num_seats': 3,
+            'origin_id': self.trip.origin_id,
+            'origin_name': 'Origin',
+            'destination_id': self.trip.destination_id,
+            'destination_name': 'Destination',
+            'vehicle_id': self.trip.vehicle_id,
+            'vehicle_name': 'Make Model',
+            'user_id': self.trip.user_id,
+            'driver_name': 'driver',
+        }])
+        summary_queries = [
+            query['sql'] for query in queries
+            if 'trips_tripsummary' in query['sql']
+        ]
+        self.assertEqual(len(summary_queries), 1)
+        self.assertNotIn('JOIN', summary_queries[0])
+
+        response = self.client.get(
+            '/api/v1/trips/summaries/?destination=origin')
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_paginated(self):
+        response = self.client.get('/api/v1/trips/summaries/?page_size=1')
+        content = json.loads(response.content)
+        self.assertIsNone(content['next'])
+        self.assertEqual(
+            [summary['id'] for summary in content['results']],
+            [self.trip.id]
+        )
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        'search': '2/min',
+        'writes': '1/min',
+        'bookings': '1/min',
+    },
+})
+class TripThrottleTest(APITestCase):
+    def setUp(self):
+        # every test client has the same address
+        get_counter_store().clear()
+        self.trip = create_trip(num_seats=3)
+        self.passenger = User.objects.create_user(
+            username='passenger',
+            email='passenger@test.com',
+            password='testpass123'
+        )
+
+    def test_search_per_address(self):
+        for _ in range(2):
+            response = self.client.get('/api/v1/trips/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/v1/trips/routes/')
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        response = self.client.get(
+            '/api/v1/trips/', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_search_per_user(self):
+        for _ in range(2):
+            self.client.get('/api/v1/trips/')
+        self.client.force_authenticate(user=self.passenger)
+        response = self.client.get('/api/v1/trips/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_is_not_throttled(self):
+        for _ in range(3):
+            response = self.client.get(f'/api/v1/trips/{self.trip.pk}/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bookings_and_writes(self):
+        self.client.force_authenticate(user=self.passenger)
+        url = f'/api/v1/trips/{self.trip.pk}/book/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(Booking.objects.count(), 1)
+
+        response = self.client.post('/api/v1/vehicles/', {
+            'make': 'Make',
+            'model': 'Model',
+            'reg_number': '5678',
+        })
+        self.assertNotEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post('/api/v1/vehicles/', {
+            'make': 'Make',
+            'model': 'Model',
+            'reg_number': '9012',
+        })
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -1,13 +1,46 @@
+from datetime import date
+from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions, status
+from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
+from places.cache import place_cache
+from places.models import Place
+from search.filters import FullTextSearchFilter
+from shared.caching import CachedResponseMixin
+from shared.events import EventStream, EventStreamResponse
 from shared.permissions import IsOwnerOrReadOnly
+from shared.pubsub import get_broker
+from shared.querysets import QueryPlanMixin
+from shared.renderers import PassthroughRenderer
+from vehicles.models import Vehicle
 
-from .models import Trip
-from .serializers import TripSerializer
+from .exports import FORMATS, booking_export, trip_export
+from .feed import route_channels
+from .matching import route_graph
+from .models import ArchivedTrip, Booking, Trip, TripSummary
+from .serializers import (
+    ArchivedTripSerializer,
+    BookingSerializer,
+    RouteFeedSerializer,
+    RouteSearchSerializer,
+    TripBulkSerializer,
+    TripSerializer,
+    TripSummarySerializer,
+)
 from .filters import TripFilter
+from .pagination import TripCursorPagination, TripHistoryPagination
 
 
-class TripViewSet(ModelViewSet):
+class TripViewSet(CachedResponseMixin, QueryPlanMixin, ModelViewSet):
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
     permission_classes = [
@@ -15,6 +48,274 @@ class TripViewSet(ModelViewSet):
         IsAuthenticatedOrReadOnly,
     ]
     filterset_class = TripFilter
+    pagination_class = TripCursorPagination
+    cache_models = (Trip, Place, Vehicle, get_user_model())
+    # only upcoming trips are listed
+    cache_daily = True
+    # set per action, see `ScopedCounterThrottle`
+    throttle_scope = None
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(
+        detail=True,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        throttle_scope='bookings',
+    )
+    def book(self, request, pk=None):
+        """
+        Books seats on a trip for the logged in user.
+        """
+        trip = self.get_object()
+        serializer = BookingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            booking = Booking.objects.book(
+                trip,
+                request.user,
+                serializer.validated_data['seats']
+            )
+        except ValidationError as error:
+            error_status = status.HTTP_400_BAD_REQUEST
+            if error.code == 'no_seats':
+                error_status = status.HTTP_409_CONFLICT
+            return Response({'detail': error.message}, status=error_status)
+        return Response(
+            BookingSerializer(booking).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk(self, request):
+        """
+        Creates the same trip on many dates, given either as `dates` or as
+        a weekly `recurrence`.
+
+        The trip is validated once, every date is checked on its own and
+        nothing is written unless all of them are valid.
+        """
+        bulk = TripBulkSerializer(data=request.data)
+        bulk.is_valid(raise_exception=True)
+        dates = bulk.validated_data['dates']
+
+        trip_fields = ['origin_id', 'destination_id', 'vehicle_id', 'num_seats']
+        template = self.get_serializer(data={
+            **{
+                field: request.data[field]
+                for field in trip_fields if field in request.data
+            },
+            'trip_date': date.today(),
+        })
+        template.is_valid(raise_exception=True)
+
+        item_errors = bulk.get_item_errors()
+        if item_errors:
+            return Response({
+                'errors': [
+                    {
+                        'index': index,
+                        'trip_date': dates[index],
+                        'errors': errors,
+                    }
+                    for index, errors in sorted(item_errors.items())
+                ]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        trip_data = dict(template.validated_data)
+        trip_data.pop('trip_date')
+        trips = Trip.objects.create_many([
+            Trip(user=request.user, trip_date=trip_date, **trip_data)
+            for trip_date in dates
+        ])
+        serializer = self.get_serializer(trips, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        renderer_classes=[JSONRenderer, PassthroughRenderer],
+    )
+    def export(self, request):
+        """
+        Streams every trip matching the `TripFilter` parameters as CSV or,
+        with `?output=ndjson`, as newline-delimited JSON.
+
+        `?dataset=bookings` exports the bookings on those trips instead,
+        limited to the bookings the logged in user made or drives.
+        """
+        output = request.query_params.get('output', 'csv')
+        if output not in FORMATS:
+            raise exceptions.ValidationError({
+                'output': f'Choose one of {", ".join(FORMATS)}'
+            })
+        # past trips too, until they are archived
+        trips = self.filter_queryset(Trip.all_objects.all())
+
+        dataset = request.query_params.get('dataset', 'trips')
+        if dataset == 'trips':
+            export = trip_export(trips, output)
+        elif dataset == 'bookings':
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            export = booking_export(trips, output, user=request.user)
+        else:
+            raise exceptions.ValidationError({
+                'dataset': 'Choose one of trips, bookings'
+            })
+
+        response = StreamingHttpResponse(
+            export, content_type=export.content_type)
+        response['Content-Disposition'] = \
+            f'attachment; filename="{dataset}.{output}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=['get'],
+        renderer_classes=[JSONRenderer, PassthroughRenderer],
+    )
+    def feed(self, request):
+        """
+        Streams the trips created, updated (e.g. their seats booked) and
+        cancelled from `origin` to `destination` as server-sent events,
+        instead of clients polling the trip list.
+
+        Clients reconnecting with a `Last-Event-ID` header, as
+        `EventSource` does, first receive the events they missed, as far
+        as the broker retains them. Unknown places are a bad request.
+        """
+        params = RouteFeedSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        channels = route_channels(
+            params.validated_data['origin'],
+            params.validated_data['destination']
+        )
+        try:
+            last_id = int(request.META['HTTP_LAST_EVENT_ID'])
+        except (KeyError, ValueError):
+            last_id = None
+
+        def render(message):
+            trip = dict(message.data['trip'])
+            trip['url'] = request.build_absolute_uri(
+                reverse('trip-detail', args=[trip['id']]))
+            return message.data['event'], trip
+
+        subscription = get_broker().subscribe(channels, last_id)
+        return EventStreamResponse(EventStream(subscription, render))
+
+    @action(detail=False, methods=['get'], throttle_scope='search')
+    def history(self, request):
+        """
+        Lists past trips, accepting the filters of the trip list and
+        always paginated.
+
+        The trip list only holds upcoming trips. Past trips stay in the
+        trip table until they are moved to the archive,
+        `TRIP_ARCHIVE_AFTER_DAYS` days after they took place, and are read
+        from both; `archived_at` is null for those not archived yet.
+        """
+        return self.cached_response(self.list_history, request)
+
+    def list_history(self, request):
+        related = ('origin', 'destination', 'vehicle', 'user')
+        querysets = [
+            TripFilter(
+                request.query_params,
+                queryset=queryset.select_related(*related),
+                request=request
+            ).qs
+            for queryset in [
+                ArchivedTrip.objects.all(),
+                Trip.all_objects.filter(trip_date__lt=date.today()),
+            ]
+        ]
+        paginator = TripHistoryPagination()
+        page = paginator.paginate_querysets(querysets, request, view=self)
+        for trip in page:
+            if not isinstance(trip, ArchivedTrip):
+                trip.archived_at = None
+        serializer = ArchivedTripSerializer(
+            page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], throttle_scope='search')
+    def summaries(self, request):
+        """
+        Lists upcoming trips, accepting the filters and pagination of the
+        trip list, with the names of their places, vehicle and driver in
+        place of nested objects.
+
+        Summaries are read from the `TripSummary` table alone, filters and
+        pages are index scans on it without joins.
+        """
+        return self.cached_response(self.list_summaries, request)
+
+    def list_summaries(self, request):
+        summaries = TripFilter(
+            request.query_params,
+            queryset=TripSummary.objects.filter(trip_date__gte=date.today()),
+            request=request
+        ).qs
+        # `TripFilter` is for trips, so only the full-text filter applies
+        summaries = FullTextSearchFilter().filter_queryset(
+            request, summaries, self)
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(summaries)
+        if page is not None:
+            serializer = TripSummarySerializer(
+                page, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+        serializer = TripSummarySerializer(
+            summaries, many=True, context=context)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], throttle_scope='search')
+    def routes(self, request):
+        """
+        Finds direct trips and two-trip connections from `origin` to
+        `destination`, leaving on or after `date`, with `seats` free seats
+        on every trip.
+
+        A connection's second trip leaves from where the first one arrives
+        within `max_layover` days. Results are ranked by arrival date, then
+        by number of trips, and served from the in-memory `route_graph`.
+        """
+        return self.cached_response(self.search_routes, request)
+
+    def search_routes(self, request):
+        search = RouteSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+
+        itineraries = route_graph.search(
+            place_cache.resolve(params['origin']),
+            place_cache.resolve(params['destination']),
+            params['date'],
+            params['seats'],
+            params['max_layover']
+        )[:params['limit']]
+
+        trip_ids = {edge.id for itinerary in itineraries for edge in itinerary}
+        trips = self.get_queryset().filter(id__in=trip_ids)
+        serialized = {
+            trip['id']: trip
+            for trip in self.get_serializer(trips, many=True).data
+        }
+        return Response([
+            {
+                'departure_date': itinerary[0].trip_date,
+                'arrival_date': itinerary[-1].trip_date,
+                'transfers': len(itinerary) - 1,
+                'legs': [serialized[edge.id] for edge in itinerary],
+            }
+            for itinerary in itineraries
+            # skip trips deleted by another process since the graph loaded
+            if all(edge.id in serialized for edge in itinerary)
+        ])
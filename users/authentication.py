@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.base import ModelState
+from rest_framework.authentication import TokenAuthentication
+
+
+def _clone(instance):
+    # a copy with its own `_state`, which `copy.copy` would share
+    clone = instance.__class__.__new__(instance.__class__)
+    clone.__dict__.update(
+        (name, value) for name, value in instance.__dict__.items()
+        if name != '_state'
+    )
+    clone._state = ModelState()
+    clone._state.db = instance._state.db
+    clone._state.adding = False
+    return clone
+
+
+USER_VERSION_KEY = 'token-user-version:{}'
+
+
+def get_user_version(user_id):
+    return cache.get(USER_VERSION_KEY.format(user_id))
+
+
+def bump_user_version(user_id):
+    """
+    Marks the cached tokens of the user as stale in every process sharing
+    the default cache.
+    """
+    key = USER_VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, random.getrandbits(48), None)
+
+
+class TokenCache:
+    """
+    Process-wide LRU cache of API tokens and their users.
+
+    Entries are dropped when their token is deleted, e.g. on logout, or
+    their user is saved or deleted in this process. Other processes notice
+    through a version per user in the default cache, which is checked on
+    every hit, so the cache saves database queries rather than cache
+    lookups. `TOKEN_CACHE_TTL` bounds how long an entry is kept anyway and
+    `TOKEN_CACHE_SIZE` how many tokens are kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_CACHE_TTL', 60)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_CACHE_SIZE', 10000)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, user, expires, version = entry
+            if time.monotonic() >= expires:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        if get_user_version(user.pk) != version:
+            self.discard(key)
+            return None
+        # every request gets its own copies to modify
+        token = _clone(token)
+        token.user = _clone(user)
+        return token
+
+    def set(self, token):
+        key = token.key
+        version = get_user_version(token.user_id)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (
+                _clone(token),
+                _clone(token.user),
+                time.monotonic() + self.ttl,
+                version
+            )
+            self._keys_by_user.setdefault(token.user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1].pk
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `TokenAuthentication` that looks tokens up in `token_cache` before
+    querying the `Token` and `User` tables.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            return token.user, token
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(token)
+        return user, token
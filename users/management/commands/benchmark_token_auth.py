@@ -0,0 +1,68 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from shared.benchmark import format_timing, measure, scratch_database
+from shared.synthetic import seed
+from users.authentication import CachedTokenAuthentication, token_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks authenticating API requests by token with and without '
+        'the token cache, in a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Requests authenticated per run')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f'Seeding {options["users"]} users...')
+            seed(users=options['users'], places=10, trips=0)
+            Token.objects.bulk_create([
+                Token(key=Token().generate_key(), user_id=user_id)
+                for user_id in get_user_model().objects
+                .values_list('id', flat=True)
+            ])
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(0)
+        keys = list(Token.objects.values_list('key', flat=True))
+        factory = APIRequestFactory()
+        requests = [
+            factory.get(
+                '/api/v1/trips/',
+                HTTP_AUTHORIZATION=f'Token {rng.choice(keys)}')
+            for _ in range(options['requests'])
+        ]
+        token_cache.clear()
+
+        for label, authenticator in [
+                ('token', TokenAuthentication()),
+                ('cached token', CachedTokenAuthentication())]:
+            def authenticate():
+                for request in requests:
+                    authenticator.authenticate(request)
+
+            timing = measure(authenticate, repeat=options['repeat'])
+            with CaptureQueriesContext(connection) as queries:
+                authenticate()
+            self.stdout.write(format_timing(
+                f'{label} ({options["requests"]} requests)', timing))
+            self.stdout.write(
+                f'{label:<40} '
+                f'{options["requests"] / timing["mean"] * 1000:10,.0f} '
+                f'requests/s   '
+                f'{len(queries) / len(requests):.2f} queries/request')
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.8 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_auto_20191117_1442'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_pic_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Profile picture with variants'),
+        ),
+    ]
@@ -44,6 +44,13 @@ class User(AbstractUser):
         blank=True
     )
 
+    profile_pic_variants_for = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name=_('Profile picture with variants')
+    )
+
     @property
     def full_name(self):
         return f'{self.first_name} {self.last_name}'
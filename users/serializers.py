@@ -4,8 +4,15 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from django.contrib.auth.models import User
 
+from shared.fields import ImageVariantsField
+from shared.compiled import CompiledListSerializer
+from shared.serializers import SparseFieldsetsMixin
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+
+class UserSerializer(
+        SparseFieldsetsMixin,
+        serializers.HyperlinkedModelSerializer):
+    profile_pic_variants = ImageVariantsField(source='profile_pic')
 
     def validate_birth_date(self, value):
         if value:
@@ -22,6 +29,7 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = get_user_model()
+        list_serializer_class = CompiledListSerializer
         fields = [
             'username',
             'email',
@@ -31,4 +39,5 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
             'birth_date',
             'url',
             'profile_pic',
+            'profile_pic_variants',
         ]
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from shared.images import schedule_variants
+from .authentication import bump_user_version, token_cache
+
+
+@receiver(post_save, sender=get_user_model())
+def generate_profile_pic_variants(sender, instance, **kwargs):
+    schedule_variants(instance.profile_pic)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def drop_cached_user_tokens(sender, instance, using=None, **kwargs):
+    token_cache.discard_user(instance.pk)
+    _bump_user_version_on_commit(instance.pk, using)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def drop_cached_token(sender, instance, using=None, **kwargs):
+    token_cache.discard(instance.key)
+    _bump_user_version_on_commit(instance.user_id, using)
+
+
+def _bump_user_version_on_commit(user_id, using):
+    # again on commit, in case another process cached the token from
+    # before it in between
+    bump_user_version(user_id)
+    transaction.on_commit(lambda: bump_user_version(user_id), using=using)
@@ -3,10 +3,20 @@ import json
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
+from shared.throttling import get_counter_store
+from .authentication import (
+    CachedTokenAuthentication,
+    bump_user_version,
+    token_cache,
+)
+
 
 class UserTests(TestCase):
     def test_create_user(self):
@@ -63,6 +73,9 @@ class UserTests(TestCase):
 
 
 class UserApiTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+
     def test_list_user(self):
         User = get_user_model()
         user = User.objects.create_user(
@@ -81,7 +94,8 @@ class UserApiTest(APITestCase):
             'gender': 'wont-say',
             'birth_date': None,
             'url': 'http://testserver/api/v1/users/1/',
-            'profile_pic': None
+            'profile_pic': None,
+            'profile_pic_variants': None
         }])
 
     def test_get_user(self):
@@ -102,7 +116,8 @@ class UserApiTest(APITestCase):
             'gender': 'wont-say',
             'birth_date': None,
             'url': 'http://testserver/api/v1/users/1/',
-            'profile_pic': None
+            'profile_pic': None,
+            'profile_pic_variants': None
         })
 
     def test_update_user_unauthenticated_forbidden(self):
@@ -177,7 +192,8 @@ class UserApiTest(APITestCase):
             'gender': 'male',
             'birth_date': None,
             'url': 'http://testserver/api/v1/users/1/',
-            'profile_pic': None
+            'profile_pic': None,
+            'profile_pic_variants': None
         })
 
     def test_delete_not_allowed(self):
@@ -192,3 +208,101 @@ class UserApiTest(APITestCase):
         self.client.force_authenticate(user=user)
         response = self.client.delete('/api/v1/users/1/')
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_sparse_fields(self):
+        User = get_user_model()
+        user = User.objects.create_user(
+            username='vince',
+            email='vince@test.com',
+            password='testpass123'
+        )
+        response = self.client.get('/api/v1/users/?fields=username,url')
+        self.assertEqual(json.loads(response.content), [{
+            'username': 'vince',
+            'url': 'http://testserver/api/v1/users/1/',
+        }])
+
+        self.client.force_authenticate(user=user)
+        response = self.client.patch(
+            '/api/v1/users/1/?fields=username', {'first_name': 'Vincent'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), {'username': 'vince'})
+        self.assertEqual(User.objects.get().first_name, 'Vincent')
+
+
+class TokenAuthenticationCacheTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='vince',
+            email='vince@test.com',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def token_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/users/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            query for query in queries
+            if 'authtoken_token' in query['sql']
+        ]
+
+    def test_token_is_looked_up_once(self):
+        self.assertEqual(len(self.token_queries()), 1)
+        self.assertEqual(self.token_queries(), [])
+
+    def test_cached_user_and_token(self):
+        self.client.get('/api/v1/users/')
+        user, token = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key)
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+        self.assertIs(token.user, user)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get('/api/v1/users/')
+        self.token.delete()
+        response = self.client.get('/api/v1/users/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_deleted_by_another_process_is_rejected(self):
+        self.client.get('/api/v1/users/')
+        # without the signals of this process
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM authtoken_token WHERE key = %s',
+                [self.token.key]
+            )
+        bump_user_version(self.user.pk)
+        response = self.client.get('/api/v1/users/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/v1/users/')
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/v1/users/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_expired_entries_are_looked_up_again(self):
+        self.token_queries()
+        self.assertEqual(len(self.token_queries()), 1)
+
+    @override_settings(TOKEN_CACHE_SIZE=2)
+    def test_least_recently_used_tokens_are_evicted(self):
+        User = get_user_model()
+        tokens = [self.token] + [
+            Token.objects.create(user=User.objects.create_user(
+                username=f'user{index}', password='testpass123'))
+            for index in range(2)
+        ]
+        for token in tokens:
+            token_cache.set(token)
+        self.assertEqual(len(token_cache), 2)
+        self.assertIsNone(token_cache.get(tokens[0].key))
+        self.assertIsNotNone(token_cache.get(tokens[2].key))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.8 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='image_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Image with variants'),
+        ),
+    ]
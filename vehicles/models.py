@@ -39,6 +39,13 @@ class Vehicle(models.Model):
         blank=True
     )
 
+    image_variants_for = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name=_('Image with variants')
+    )
+
     @property
     def vehicle_name(self):
         return f'{self.make} {self.model}'
@@ -1,8 +1,15 @@
 from rest_framework import serializers
 
+from shared.fields import ImageVariantsField
+from shared.compiled import CompiledListSerializer
+from shared.serializers import SparseFieldsetsMixin
 from .models import Vehicle
 
-class VehicleSerializer(serializers.HyperlinkedModelSerializer):
+class VehicleSerializer(
+        SparseFieldsetsMixin,
+        serializers.HyperlinkedModelSerializer):
+    image_variants = ImageVariantsField(source='image')
+
     owner_url = serializers.HyperlinkedRelatedField(
         source='user',
         view_name='user-detail',
@@ -10,6 +17,7 @@ class VehicleSerializer(serializers.HyperlinkedModelSerializer):
     )
     class Meta:
         model = Vehicle
+        list_serializer_class = CompiledListSerializer
         fields = [
             'id',
             'url',
@@ -17,5 +25,6 @@ class VehicleSerializer(serializers.HyperlinkedModelSerializer):
             'model',
             'reg_number',
             'image',
+            'image_variants',
             'owner_url',
-        ]
\ No newline at end of file
+        ]
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from shared.images import schedule_variants
+from .models import Vehicle
+
+
+@receiver(post_save, sender=Vehicle)
+def generate_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance.image)
@@ -1,8 +1,23 @@
+from io import BytesIO, StringIO
 import json
+import shutil
+import tempfile
+import threading
+from unittest import mock
 from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from shared.images import generate_variants
+from shared.testing import QueryCountTestMixin
+from shared.throttling import get_counter_store
+from taskqueue.models import Task
+from taskqueue.worker import work
 from .models import Vehicle
 
 
@@ -10,6 +25,9 @@ User = get_user_model()
 
 
 class VehicleApiTests(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+
     def test_list_vehicles(self):
         user = User.objects.create_user(
             username='vince',
@@ -34,6 +52,7 @@ class VehicleApiTests(APITestCase):
                 'model': 'Model',
                 'reg_number': '1234',
                 'image': None,
+                'image_variants': None,
                 'owner_url': 'http://testserver/api/v1/users/1/'
             }
         ])
@@ -68,6 +87,7 @@ class VehicleApiTests(APITestCase):
             'model': 'Model',
             'reg_number': '1234',
             'image': None,
+            'image_variants': None,
             'owner_url': 'http://testserver/api/v1/users/1/'
         })
 
@@ -155,6 +175,7 @@ class VehicleApiTests(APITestCase):
             'model': 'Model',
             'reg_number': '1235',
             'image': None,
+            'image_variants': None,
             'owner_url': 'http://testserver/api/v1/users/1/'
         })
 
@@ -216,3 +237,156 @@ class VehicleApiTests(APITestCase):
         response = self.client.delete('/api/v1/vehicles/1/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Vehicle.objects.all().count(), 0)
+
+
+class VehicleQueryCountTest(QueryCountTestMixin, APITestCase):
+
+    def setUp(self):
+        get_counter_store().clear()
+
+    def create_vehicles(self, count):
+        for _ in range(count):
+            index = Vehicle.objects.count()
+            user = User.objects.create_user(
+                username=f'owner{index}',
+                email=f'owner{index}@test.com',
+                password='testpass123'
+            )
+            Vehicle.objects.create(
+                make='Make',
+                model='Model',
+                reg_number=f'{index}',
+                user=user
+            )
+
+    def test_list_vehicles_query_count_is_constant(self):
+        num_queries = self.assertConstantQueryCount(
+            self.create_vehicles,
+            lambda: self.client.get('/api/v1/vehicles/')
+        )
+        self.assertEqual(num_queries, 1)
+
+
+class VehicleImageVariantsTest(APITestCase):
+    def setUp(self):
+        get_counter_store().clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        user = User.objects.create_user(
+            username='vince',
+            email='vince@test.com',
+            password='testpass123'
+        )
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 1200), 'red').save(buffer, 'JPEG')
+        self.vehicle = Vehicle(
+            make='Make',
+            model='Model',
+            reg_number='1234',
+            user=user,
+            image=SimpleUploadedFile('car.jpeg', buffer.getvalue())
+        )
+        self.vehicle.save()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_generate_variants(self):
+        storage = self.vehicle.image.storage
+        generate_variants(storage, self.vehicle.image.name)
+
+        for name, size in [
+                ('vehicles/car_thumb.webp', (128, 96)),
+                ('vehicles/car_thumb.jpeg', (128, 96)),
+                ('vehicles/car_medium.webp', (480, 360)),
+                ('vehicles/car_medium.jpeg', (480, 360))]:
+            with storage.open(name) as variant:
+                self.assertEqual(Image.open(variant).size, size)
+
+    def test_variants_generated_in_background(self):
+        task = Task.objects.get(name='images.generate_variants')
+        self.assertEqual(
+            json.loads(task.arguments)['name'], 'vehicles/car.jpeg')
+        storage = self.vehicle.image.storage
+        self.assertFalse(storage.exists('vehicles/car_thumb.webp'))
+
+        work('test', threading.Event(), burst=True)
+        self.assertTrue(storage.exists('vehicles/car_thumb.webp'))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.DONE)
+
+    def test_regenerate_replaces_variants(self):
+        storage = self.vehicle.image.storage
+        generate_variants(storage, self.vehicle.image.name)
+        generate_variants(storage, self.vehicle.image.name)
+        self.assertEqual(
+            sorted(storage.listdir('vehicles')[1]),
+            [
+                'car.jpeg',
+                'car_medium.jpeg',
+                'car_medium.webp',
+                'car_thumb.jpeg',
+                'car_thumb.webp',
+            ]
+        )
+
+    def test_variant_urls_before_generation(self):
+        response = self.client.get('/api/v1/vehicles/1/')
+        content = json.loads(response.content)
+        original = 'http://testserver/media/vehicles/car.jpeg'
+        self.assertEqual(content['image_variants'], {
+            'thumb': {'webp': original, 'jpeg': original},
+            'medium': {'webp': original, 'jpeg': original},
+        })
+
+    def test_backfill(self):
+        Task.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_image_variants', stdout=out)
+        self.assertIn('Queued variants of 1 images', out.getvalue())
+        work('test', threading.Event(), burst=True)
+        storage = self.vehicle.image.storage
+        self.assertTrue(storage.exists('vehicles/car_medium.jpeg'))
+
+        call_command('backfill_image_variants', stdout=out)
+        self.assertIn('Queued variants of 0 images', out.getvalue())
+
+    def test_backfill_records_existing_variants(self):
+        Task.objects.all().delete()
+        generate_variants(
+            self.vehicle.image.storage, self.vehicle.image.name)
+        out = StringIO()
+        call_command('backfill_image_variants', stdout=out)
+        self.assertIn('Queued variants of 0 images', out.getvalue())
+        self.vehicle.refresh_from_db()
+        self.assertEqual(
+            self.vehicle.image_variants_for, 'vehicles/car.jpeg')
+
+    def test_variant_urls_without_storage_lookups(self):
+        work('test', threading.Event(), burst=True)
+        with mock.patch.object(
+                FileSystemStorage, 'exists', side_effect=AssertionError):
+            response = self.client.get('/api/v1/vehicles/')
+        self.assertEqual(
+            json.loads(response.content)[0]['image_variants']['thumb']['webp'],
+            'http://testserver/media/vehicles/car_thumb.webp'
+        )
+
+    def test_variant_urls(self):
+        work('test', threading.Event(), burst=True)
+        response = self.client.get('/api/v1/vehicles/1/')
+        content = json.loads(response.content)
+        self.assertEqual(
+            content['image'], 'http://testserver/media/vehicles/car.jpeg')
+        self.assertEqual(content['image_variants'], {
+            'thumb': {
+                'webp': 'http://testserver/media/vehicles/car_thumb.webp',
+                'jpeg': 'http://testserver/media/vehicles/car_thumb.jpeg',
+            },
+            'medium': {
+                'webp': 'http://testserver/media/vehicles/car_medium.webp',
+                'jpeg': 'http://testserver/media/vehicles/car_medium.jpeg',
+            },
+        })
@@ -1,13 +1,17 @@
+from django.contrib.auth import get_user_model
 from rest_framework.viewsets import ModelViewSet
 from rest_framework import permissions
+from shared.caching import CachedResponseMixin
 from shared.permissions import IsOwnerOrReadOnly
+from shared.querysets import QueryPlanMixin
 from .models import Vehicle
 from .serializers import VehicleSerializer
 
 
-class VehicleViewSet(ModelViewSet):
+class VehicleViewSet(CachedResponseMixin, QueryPlanMixin, ModelViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
+    cache_models = (Vehicle, get_user_model())
 
     permission_classes = [
         IsOwnerOrReadOnly,